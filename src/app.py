@@ -5,24 +5,70 @@ Interface web pour analyser les images, visualiser les résultats et exporter le
 
 import gradio as gr
 from pathlib import Path
-from typing import Tuple, Optional, Dict, List
+from typing import Tuple, Optional, Dict, List, Iterator
 import time
+from datetime import datetime
 import os
-import shutil
-from glob import glob
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 # Imports des modules du projet
 from src.config import config
 from src.ontology_loader import OntologyLoader
 from src.llm_extractor import LLMExtractor
+from src import lemma_cache
 from src.similarity_calculator import SimilarityCalculator
 from src.ontology_matcher import OntologyMatcher
-from src.datavault_generator import DataVaultGenerator, DataVaultSchema
+from src.datavault_generator import DataVaultSchema, generate_schema, validate_schema
+from src.schema_store import SchemaStore
 from src.exporters.json_exporter import JSONExporter
 from src.exporters.rdf_exporter import RDFExporter
 from src.exporters.sql_exporter import SQLExporter
 
 
+# ========== INSTANCES PARTAGÉES ==========
+# Les objets coûteux (parsing RDF, sessions HTTP vers Ollama, index de vocabulaire)
+# sont construits une fois par configuration puis réutilisés entre les requêtes.
+# Gradio exécute les handlers dans un pool de threads : ces instances sont partagées
+# et ne doivent pas être modifiées par les handlers (seuils passés par appel, caches
+# internes protégés par le GIL ou par verrou).
+
+@lru_cache(maxsize=8)
+def _get_ontology_cached(ontology_path: str, mtime: float) -> OntologyLoader:
+    """Charge une ontologie (clé: chemin et date de modification du fichier)."""
+    return OntologyLoader(ontology_path)
+
+
+def _get_ontology(ontology_path: str) -> OntologyLoader:
+    """Retourne l'ontologie partagée pour ce fichier (rechargée s'il a été modifié)."""
+    return _get_ontology_cached(ontology_path, os.path.getmtime(ontology_path))
+
+
+@lru_cache(maxsize=8)
+def _get_similarity_calc(embedding_model: str, ollama_base_url: str, algorithm: str) -> SimilarityCalculator:
+    """Retourne le calculateur de similarité partagé pour cette configuration."""
+    return SimilarityCalculator(
+        embedding_model=embedding_model,
+        ollama_base_url=ollama_base_url,
+        algorithm=algorithm
+    )
+
+
+@lru_cache(maxsize=8)
+def _get_extractor(ollama_url: str, model: str, structured: bool) -> LLMExtractor:
+    """Retourne l'extracteur LLM partagé pour ce modèle."""
+    return LLMExtractor(ollama_url, model, structured=structured)
+
+
+@lru_cache(maxsize=8)
+def _get_matcher(ontology: OntologyLoader, similarity_calc: SimilarityCalculator) -> OntologyMatcher:
+    """Retourne le matcher partagé pour ce couple ontologie/calculateur (seuils passés par appel)."""
+    return OntologyMatcher(ontology, similarity_calc, config.get_thresholds())
+
+
 # ========== INITIALISATION GLOBALE ==========
 
 print("\n" + "=" * 60)
@@ -36,33 +82,60 @@ if not config.validate_paths():
 
 config.display_config()
 
-# Charger l'ontologie par défaut (sera rechargée dynamiquement selon la sélection)
-print("\n📚 Chargement de l'ontologie...")
-ontology = OntologyLoader(config.ONTOLOGY_PATH)
-ontology_stats = ontology.get_statistics()
-print(f"✅ Ontologie chargée avec succès")
-
-# Initialiser le calculateur de similarité par défaut (sera recréé avec les paramètres sélectionnés)
-print("\n🧠 Initialisation du calculateur de similarité...")
-similarity_calc = SimilarityCalculator(
-    embedding_model=config.EMBEDDING_MODEL,
-    ollama_base_url=config.OLLAMA_BASE_URL,
-    algorithm=config.SIMILARITY_ALGORITHM
-)
+# L'ontologie, le calculateur de similarité et l'extracteur sont construits à la
+# première requête (instances partagées ci-dessus) : l'interface démarre sans
+# attendre le parsing RDF ni Ollama.
+
+
+# Disponibilité des modèles LLaVA, mise à jour en arrière-plan : les handlers la
+# lisent sans appel HTTP à Ollama
+MODEL_HEALTH: Dict[str, bool] = {}
+_model_health_refresh = threading.Event()
 
-# Initialiser l'extracteur LLM
-print("\n🤖 Connexion à Ollama...")
-try:
-    llm_extractor = LLMExtractor(config.OLLAMA_BASE_URL, config.LLAVA_MODEL)
-    if not llm_extractor.check_model_availability():
-        print("⚠️  Le modèle LLaVA n'est pas disponible. Certaines fonctionnalités seront limitées.")
-except Exception as e:
-    print(f"⚠️  Impossible de se connecter à Ollama: {e}")
-    llm_extractor = None
 
-# Variables globales pour stocker les schémas générés
-last_schema: Optional[DataVaultSchema] = None
-batch_schemas: Dict[str, DataVaultSchema] = {}
+def _refresh_model_health():
+    """Interroge Ollama (/api/tags) et met à jour MODEL_HEALTH pour les modèles suivis."""
+    extractor = _get_extractor(config.OLLAMA_BASE_URL, config.LLAVA_MODEL, config.LLAVA_STRUCTURED_OUTPUT)
+    models = set(MODEL_HEALTH) | {config.LLAVA_MODEL}
+    try:
+        available_models = extractor.list_available_models()
+    except Exception:
+        for model in models:
+            MODEL_HEALTH[model] = False
+        raise
+    for model in models:
+        MODEL_HEALTH[model] = LLMExtractor.is_model_in(model, available_models)
+
+
+def _model_health_loop():
+    """Vérifie la disponibilité des modèles toutes les MODEL_HEALTH_INTERVAL secondes (thread de fond)."""
+    print("\n🤖 Connexion à Ollama...")
+    first_check = True
+    while True:
+        try:
+            _refresh_model_health()
+            if first_check:
+                if MODEL_HEALTH[config.LLAVA_MODEL]:
+                    print(f"✅ Modèle {config.LLAVA_MODEL} disponible")
+                else:
+                    print("⚠️  Le modèle LLaVA n'est pas disponible. Certaines fonctionnalités seront limitées.")
+        except Exception as e:
+            if first_check:
+                print(f"⚠️  Impossible de se connecter à Ollama: {e}")
+        first_check = False
+
+        # Attente de l'intervalle, ou réveil anticipé pour un modèle pas encore vérifié
+        _model_health_refresh.wait(config.MODEL_HEALTH_INTERVAL)
+        _model_health_refresh.clear()
+
+
+threading.Thread(target=_model_health_loop, name="ollama-model-health", daemon=True).start()
+
+# Schémas du dernier lot, sur disque (conservés après redémarrage pour l'export)
+batch_schemas = SchemaStore(Path(config.CACHE_DIR) / "batch_schemas.sqlite")
+
+# Nombre de schémas regroupés par écriture SQLite pendant un lot
+_SCHEMA_FLUSH_SIZE = 16
 
 
 # ========== FONCTIONS DE L'INTERFACE ==========
@@ -81,11 +154,15 @@ def analyze_image(
     threshold_entities: float,
     threshold_relations: float,
     threshold_attributes: float,
+    current_schema: Optional[DataVaultSchema] = None,
     progress=gr.Progress()
-) -> Tuple[str, str, str, str]:
+) -> Tuple[str, str, str, str, Optional[DataVaultSchema]]:
     """
     Analyse une image et retourne les résultats organisés par Hub.
 
+    Le schéma généré est renvoyé dans l'état de la session (gr.State) : chaque
+    utilisateur exporte son propre schéma, même avec plusieurs analyses simultanées.
+
     Args:
         image: Image uploadée
         selected_model: Modèle LLM à utiliser
@@ -94,18 +171,17 @@ def analyze_image(
         threshold_entities: Seuil pour entités
         threshold_relations: Seuil pour relations
         threshold_attributes: Seuil pour attributs
+        current_schema: Schéma de la session, conservé si l'analyse échoue
         progress: Gestionnaire de progression Gradio
 
     Returns:
-        Tuple (status_msg, lemmes_str, results_by_hub_str, stats_str)
+        Tuple (status_msg, lemmes_str, results_by_hub_str, stats_str, schéma de la session)
     """
-    global last_schema
-
     # Initialiser la progression immédiatement
     progress(0, desc="Démarrage de l'analyse...")
 
     if image is None:
-        return "❌ Aucune image fournie", "", "", ""
+        return "❌ Aucune image fournie", "", "", "", current_schema
 
     try:
         start_time = time.time()
@@ -113,35 +189,40 @@ def analyze_image(
         # ÉTAPE 1: Extraction de lemmes avec le modèle sélectionné
         progress(0.05, desc="Connexion au modèle LLM...")
         print(f"\n🔍 Analyse de l'image avec le modèle {selected_model}...")
-        current_extractor = LLMExtractor(config.OLLAMA_BASE_URL, selected_model)
+        current_extractor = _get_extractor(config.OLLAMA_BASE_URL, selected_model, config.LLAVA_STRUCTURED_OUTPUT)
 
-        # Vérifier la disponibilité (mais continuer même si la vérification échoue)
+        # Vérifier la disponibilité (mais continuer même si la vérification échoue) :
+        # état tenu à jour par le thread de fond, rafraîchi tout de suite pour un nouveau modèle
         progress(0.1, desc="Vérification du modèle...")
-        is_available = current_extractor.check_model_availability()
+        is_available = MODEL_HEALTH.get(selected_model)
+        if is_available is None:
+            MODEL_HEALTH[selected_model] = is_available = True
+            _model_health_refresh.set()
         if not is_available:
             print(f"⚠️  La vérification du modèle a échoué, mais on essaie quand même...")
 
         progress(0.2, desc="Extraction des lemmes...")
-        lemmas = current_extractor.extract_lemmas(image)
+        lemmas = lemma_cache.get_or_compute(
+            selected_model,
+            image,
+            lambda: current_extractor.extract_lemmas(image),
+            structured=config.LLAVA_STRUCTURED_OUTPUT
+        )
 
         if not lemmas:
-            return "⚠️  Aucun lemme extrait", "", "", ""
+            return "⚠️  Aucun lemme extrait", "", "", "", current_schema
 
         progress(0.4, desc=f"{len(lemmas)} lemmes extraits, chargement ontologie...")
 
         # ÉTAPE 2: Charger l'ontologie sélectionnée
         available_ontologies = config.get_available_ontologies()
         ontology_path = available_ontologies.get(selected_ontology, config.ONTOLOGY_PATH)
-        current_ontology = OntologyLoader(ontology_path)
+        current_ontology = _get_ontology(ontology_path)
         print(f"📚 Ontologie chargée: {selected_ontology}")
 
         # ÉTAPE 3: Initialiser le calculateur de similarité avec l'algorithme sélectionné
         progress(0.45, desc="Initialisation du calculateur de similarité...")
-        current_similarity_calc = SimilarityCalculator(
-            embedding_model=config.EMBEDDING_MODEL,
-            ollama_base_url=config.OLLAMA_BASE_URL,
-            algorithm=selected_similarity
-        )
+        current_similarity_calc = _get_similarity_calc(config.EMBEDDING_MODEL, config.OLLAMA_BASE_URL, selected_similarity)
         print(f"📊 Algorithme de similarité: {selected_similarity}")
 
         # ÉTAPE 4: Classification ontologique
@@ -152,21 +233,19 @@ def analyze_image(
             "attributes": threshold_attributes
         }
 
-        matcher = OntologyMatcher(current_ontology, current_similarity_calc, thresholds)
-        hubs, links, satellites = matcher.classify_lemmas(lemmas, "uploaded_image")
+        # Scores mis en cache par le matcher (par ensemble de lemmes) : un changement
+        # de seuils seul ne relance pas le calcul de similarité
+        matcher = _get_matcher(current_ontology, current_similarity_calc)
+        hubs, links, satellites = matcher.classify_lemmas(lemmas, "uploaded_image", thresholds=thresholds)
 
         progress(0.8, desc="Génération du schéma Data Vault...")
 
         # ÉTAPE 5: Génération schéma Data Vault
-        generator = DataVaultGenerator()
-        schema = generator.generate_schema(hubs, links, satellites, "uploaded_image", lemmas)
+        schema = generate_schema(hubs, links, satellites, "uploaded_image", lemmas)
 
         # Valider le schéma
         progress(0.9, desc="Validation du schéma...")
-        errors = generator.validate_schema(schema)
-
-        # Stocker le schéma pour l'export
-        last_schema = schema
+        errors = validate_schema(schema)
 
         progress(0.95, desc="Formatage des résultats...")
 
@@ -185,7 +264,8 @@ def analyze_image(
         similarity_names = {
             "hybrid": "Hybride (Jaro-Winkler + Embeddings)",
             "lexical": "Lexical (Jaro-Winkler)",
-            "semantic": "Sémantique (Embeddings)"
+            "semantic": "Sémantique (Embeddings)",
+            "token_ratio": "Tokens (WRatio)"
         }
 
         stats_str = f"""
@@ -214,11 +294,12 @@ def analyze_image(
 
         progress(1.0, desc="Analyse terminée")
 
-        return "✅ **Analyse terminée avec succès**", lemmas_str, results_by_hub_str, stats_str
+        # Schéma renvoyé dans l'état de la session pour l'export
+        return "✅ **Analyse terminée avec succès**", lemmas_str, results_by_hub_str, stats_str, schema
 
     except Exception as e:
         progress(1.0, desc="Erreur lors de l'analyse")
-        return f"❌ Erreur lors de l'analyse: {str(e)}", "", "", ""
+        return f"❌ Erreur lors de l'analyse: {str(e)}", "", "", "", current_schema
 
 
 def process_multiple_images(
@@ -230,10 +311,13 @@ def process_multiple_images(
     threshold_relations: float,
     threshold_attributes: float,
     progress=gr.Progress()
-) -> Tuple[str, str]:
+) -> Iterator[Tuple[str, str]]:
     """
     Traite plusieurs images uploadées.
 
+    Générateur : le statut et le résumé sont renvoyés après chaque image,
+    pour que l'interface affiche les résultats au fil du traitement.
+
     Args:
         uploaded_files: Liste des fichiers images uploadés
         selected_model: Modèle LLM à utiliser
@@ -244,16 +328,20 @@ def process_multiple_images(
         threshold_attributes: Seuil pour attributs
         progress: Gestionnaire de progression Gradio
 
-    Returns:
+    Yields:
         Tuple (status_msg, results_summary)
     """
-    global batch_schemas
-
     # Initialiser la progression immédiatement
     progress(0, desc="Démarrage du traitement par lot...")
 
     if not uploaded_files:
-        return "❌ Aucun fichier uploadé", ""
+        yield "❌ Aucun fichier uploadé", ""
+        return
+
+    # Schémas générés mais pas encore écrits dans batch_schemas
+    pending_schemas: Dict[str, DataVaultSchema] = {}
+    # Lemmes extraits en arrière-plan (fermé en sortie pour annuler l'extraction restante)
+    extracted: Iterator = iter(())
 
     try:
         # Convertir en liste si un seul fichier
@@ -264,10 +352,11 @@ def process_multiple_images(
         image_files = [f for f in uploaded_files if f is not None]
 
         if not image_files:
-            return "❌ Aucune image valide uploadée", ""
+            yield "❌ Aucune image valide uploadée", ""
+            return
 
         total_images = len(image_files)
-        print(f"\n📁 Traitement de {total_images} images uploadées")
+        print(f"\n📁 Traitement de {total_images} images uploadées", flush=True)
 
         progress(0.05, desc=f"Préparation pour traiter {total_images} images...")
 
@@ -275,19 +364,15 @@ def process_multiple_images(
         progress(0.1, desc="Chargement de l'ontologie...")
         available_ontologies = config.get_available_ontologies()
         ontology_path = available_ontologies.get(selected_ontology, config.ONTOLOGY_PATH)
-        current_ontology = OntologyLoader(ontology_path)
+        current_ontology = _get_ontology(ontology_path)
 
         # Initialiser le calculateur de similarité une seule fois
         progress(0.15, desc="Initialisation du calculateur de similarité...")
-        current_similarity_calc = SimilarityCalculator(
-            embedding_model=config.EMBEDDING_MODEL,
-            ollama_base_url=config.OLLAMA_BASE_URL,
-            algorithm=selected_similarity
-        )
+        current_similarity_calc = _get_similarity_calc(config.EMBEDDING_MODEL, config.OLLAMA_BASE_URL, selected_similarity)
 
         # Initialiser l'extracteur LLM
         progress(0.2, desc="Connexion au modèle LLM...")
-        current_extractor = LLMExtractor(config.OLLAMA_BASE_URL, selected_model)
+        current_extractor = _get_extractor(config.OLLAMA_BASE_URL, selected_model, config.LLAVA_STRUCTURED_OUTPUT)
 
         # Thresholds
         thresholds = {
@@ -296,8 +381,14 @@ def process_multiple_images(
             "attributes": threshold_attributes
         }
 
-        # Réinitialiser les schémas batch
-        batch_schemas = {}
+        # Matcher commun à tout le lot (ontologie, calculateur et seuils identiques
+        # pour chaque image ; aucun état conservé entre deux appels)
+        matcher = _get_matcher(current_ontology, current_similarity_calc)
+        # Date de génération commune à tous les schémas du lot
+        batch_timestamp = datetime.now().isoformat()
+
+        # Réinitialiser les schémas batch (écrits par paquets de _SCHEMA_FLUSH_SIZE)
+        batch_schemas.clear()
 
         # Variables pour statistiques globales
         total_hubs = 0
@@ -306,80 +397,159 @@ def process_multiple_images(
         successful_images = 0
         failed_images = 0
 
-        # Dictionnaire pour stocker les lemmes de chaque image
+        # Dictionnaires pour stocker les lemmes et les statistiques de chaque image
         image_lemmas = {}
+        per_image_stats: Dict[str, Dict] = {}
 
         start_time = time.time()
 
-        # Traiter chaque image
-        for idx, image_file in enumerate(image_files, 1):
-            # Obtenir le chemin du fichier uploadé
-            image_path = image_file if isinstance(image_file, str) else image_file.name
-            image_name = os.path.basename(image_path)
-
-            # Mise à jour de la progression (de 0.2 à 0.95)
-            progress_base = 0.2 + ((idx - 1) / total_images) * 0.75
+        # Chemins et noms des fichiers uploadés
+        image_paths = [f if isinstance(f, str) else f.name for f in image_files]
+        image_names = [os.path.basename(path) for path in image_paths]
+
+        # Lemmes déjà en cache disque (même image, même modèle)
+        extraction_results = [
+            lemma_cache.get(selected_model, path, config.LLAVA_STRUCTURED_OUTPUT) for path in image_paths
+        ]
+        missing = [i for i, lemmas in enumerate(extraction_results) if lemmas is None]
+
+        # Extraction des lemmes manquants : requêtes envoyées en parallèle à Ollama
+        # (limitées à OLLAMA_NUM_PARALLEL requêtes simultanées), en arrière-plan pendant
+        # la classification des images déjà extraites
+        progress(0.25, desc=f"🔍 Extraction des lemmes de {len(missing)} images ({config.OLLAMA_NUM_PARALLEL} en parallèle)...")
+        if missing:
+            yield f"⏳ **Extraction des lemmes** ({len(missing)}/{total_images} images à analyser)", ""
+            extracted = current_extractor.iter_batch_extract([image_paths[i] for i in missing], config.OLLAMA_NUM_PARALLEL)
+
+        # Classification et génération des schémas pour chaque image
+        for idx, (image_path, image_name) in enumerate(zip(image_paths, image_names), 1):
+            # Mise à jour de la progression (de 0.25 à 0.95)
+            progress_base = 0.25 + ((idx - 1) / total_images) * 0.7
             progress(progress_base, desc=f"📸 Image {idx}/{total_images}: {image_name}")
 
+            lemmas = extraction_results[idx - 1]
+            if lemmas is None:
+                # Attendre l'extraction de cette image (les suivantes continuent en parallèle)
+                lemmas = next(extracted)
+                if not isinstance(lemmas, Exception):
+                    lemma_cache.put(selected_model, image_path, lemmas, config.LLAVA_STRUCTURED_OUTPUT)
+
             try:
-                # Extraction de lemmes
-                progress(progress_base + 0.1 * 0.75 / total_images, desc=f"🔍 Extraction lemmes: {image_name}")
-                lemmas = current_extractor.extract_lemmas(image_path)
+                if isinstance(lemmas, Exception):
+                    raise lemmas
 
                 if not lemmas:
-                    print(f"⚠️  Aucun lemme extrait pour {image_name}")
+                    print(f"⚠️  Aucun lemme extrait pour {image_name}", flush=True)
                     failed_images += 1
                     image_lemmas[image_name] = []
-                    continue
-
-                # Stocker les lemmes
-                image_lemmas[image_name] = lemmas
-                print(f"✅ {image_name}: {len(lemmas)} lemmes extraits")
+                else:
+                    # Stocker les lemmes
+                    image_lemmas[image_name] = lemmas
+                    print(f"✅ {image_name}: {len(lemmas)} lemmes extraits", flush=True)
+
+                    # Classification ontologique
+                    progress(progress_base + 0.3 * 0.7 / total_images, desc=f"🏷️  Classification: {image_name}")
+                    hubs, links, satellites = matcher.classify_lemmas(lemmas, image_name, thresholds=thresholds)
+
+                    # Génération schéma Data Vault
+                    progress(progress_base + 0.6 * 0.7 / total_images, desc=f"💾 Génération schéma: {image_name}")
+                    schema = generate_schema(hubs, links, satellites, image_name, lemmas, timestamp=batch_timestamp)
+
+                    # Stocker le schéma
+                    pending_schemas[image_name] = schema
+                    if len(pending_schemas) >= _SCHEMA_FLUSH_SIZE:
+                        batch_schemas.update(pending_schemas)
+                        pending_schemas.clear()
+
+                    # Mettre à jour les statistiques (calculées une seule fois par schéma)
+                    stats = schema.get_statistics()
+                    per_image_stats[image_name] = stats
+                    total_hubs += stats["total_hubs"]
+                    total_links += stats["total_links"]
+                    total_satellites += stats["total_satellites"]
+                    successful_images += 1
+
+                    print(f"✅ {image_name}: {stats['total_hubs']} hubs, {stats['total_links']} links, {stats['total_satellites']} satellites", flush=True)
 
-                # Classification ontologique
-                progress(progress_base + 0.3 * 0.75 / total_images, desc=f"🏷️  Classification: {image_name}")
-                matcher = OntologyMatcher(current_ontology, current_similarity_calc, thresholds)
-                hubs, links, satellites = matcher.classify_lemmas(lemmas, image_name)
-
-                # Génération schéma Data Vault
-                progress(progress_base + 0.6 * 0.75 / total_images, desc=f"💾 Génération schéma: {image_name}")
-                generator = DataVaultGenerator()
-                schema = generator.generate_schema(hubs, links, satellites, image_name, lemmas)
+            except Exception as e:
+                print(f"❌ Erreur lors du traitement de {image_name}: {str(e)}", flush=True)
+                failed_images += 1
+                image_lemmas[image_name] = []
 
-                # Stocker le schéma
-                batch_schemas[image_name] = schema
+            # Résultats partiels affichés immédiatement dans l'interface
+            status_msg = f"⏳ **Traitement en cours** ({idx}/{total_images})\n\n{successful_images} images traitées avec succès"
+            yield status_msg, _format_batch_summary(
+                image_lemmas, per_image_stats, total_images, selected_model, selected_ontology, selected_similarity,
+                successful_images, failed_images, time.time() - start_time,
+                total_hubs, total_links, total_satellites
+            )
 
-                # Mettre à jour les statistiques
-                stats = schema.get_statistics()
-                total_hubs += stats["total_hubs"]
-                total_links += stats["total_links"]
-                total_satellites += stats["total_satellites"]
-                successful_images += 1
+        batch_schemas.update(pending_schemas)
+        pending_schemas.clear()
+        progress(1.0, desc="Traitement terminé")
 
-                print(f"✅ {image_name}: {stats['total_hubs']} hubs, {stats['total_links']} links, {stats['total_satellites']} satellites")
+        status_msg = f"✅ **Traitement terminé**\n\n{successful_images} images traitées avec succès sur {total_images}"
+        yield status_msg, _format_batch_summary(
+            image_lemmas, per_image_stats, total_images, selected_model, selected_ontology, selected_similarity,
+            successful_images, failed_images, time.time() - start_time,
+            total_hubs, total_links, total_satellites
+        )
 
-            except Exception as e:
-                print(f"❌ Erreur lors du traitement de {image_name}: {str(e)}")
-                failed_images += 1
-                image_lemmas[image_name] = []
-                continue
+    except Exception as e:
+        yield f"❌ Erreur lors du traitement: {str(e)}", ""
 
-        elapsed_time = time.time() - start_time
-        progress(0.95, desc="Génération du résumé des résultats...")
+    finally:
+        # Lot interrompu : ne plus envoyer d'images à Ollama, conserver les schémas déjà générés
+        close = getattr(extracted, "close", None)
+        if close is not None:
+            close()
+        batch_schemas.update(pending_schemas)
 
-        # (Le résumé sera généré ci-dessous)
 
-        progress(1.0, desc="Traitement terminé")
+def _format_batch_summary(
+    image_lemmas: Dict[str, List[str]],
+    per_image_stats: Dict[str, Dict],
+    total_images: int,
+    selected_model: str,
+    selected_ontology: str,
+    selected_similarity: str,
+    successful_images: int,
+    failed_images: int,
+    elapsed_time: float,
+    total_hubs: int,
+    total_links: int,
+    total_satellites: int
+) -> str:
+    """
+    Génère le résumé Markdown du traitement par lot (images déjà traitées).
 
-        # Mapper les valeurs pour l'affichage
-        similarity_names = {
-            "hybrid": "Hybride (Jaro-Winkler + Embeddings)",
-            "lexical": "Lexical (Jaro-Winkler)",
-            "semantic": "Sémantique (Embeddings)"
-        }
+    Args:
+        image_lemmas: Lemmes extraits par image traitée
+        per_image_stats: Statistiques Data Vault par image traitée avec succès
+        total_images: Nombre total d'images du lot
+        selected_model: Modèle LLM utilisé
+        selected_ontology: Fichier d'ontologie utilisé
+        selected_similarity: Algorithme de similarité utilisé
+        successful_images: Nombre d'images traitées avec succès
+        failed_images: Nombre d'images en erreur
+        elapsed_time: Temps écoulé depuis le début du lot
+        total_hubs: Nombre total de Hubs
+        total_links: Nombre total de Links
+        total_satellites: Nombre total de Satellites
 
-        # Générer le résumé
-        results_summary = f"""
+    Returns:
+        Résumé formaté en Markdown
+    """
+    # Mapper les valeurs pour l'affichage
+    similarity_names = {
+        "hybrid": "Hybride (Jaro-Winkler + Embeddings)",
+        "lexical": "Lexical (Jaro-Winkler)",
+        "semantic": "Sémantique (Embeddings)",
+        "token_ratio": "Tokens (WRatio)"
+    }
+
+    # Générer le résumé
+    results_summary = f"""
 ## Résultats du traitement par lot
 
 ### Configuration
@@ -392,7 +562,7 @@ def process_multiple_images(
 - Images traitées avec succès: {successful_images}/{total_images}
 - Images en erreur: {failed_images}/{total_images}
 - Temps total: {elapsed_time:.2f}s
-- Temps moyen par image: {elapsed_time/total_images:.2f}s
+- Temps moyen par image: {elapsed_time/max(len(image_lemmas), 1):.2f}s
 
 ### Éléments détectés (total)
 - Hubs (entités): {total_hubs}
@@ -402,43 +572,60 @@ def process_multiple_images(
 ### Détails par image
 """
 
-        # Ajouter les détails de chaque image
-        for image_name in image_lemmas.keys():
-            lemmas = image_lemmas.get(image_name, [])
-
-            results_summary += f"\n---\n\n### 📸 {image_name}\n\n"
+    # Ajouter les détails de chaque image
+    parts = [results_summary]
+    for image_name, lemmas in image_lemmas.items():
+        parts.append(f"\n---\n\n### 📸 {image_name}\n\n")
 
-            # Afficher les lemmes
-            if lemmas:
-                results_summary += f"**Lemmes extraits ({len(lemmas)}):**\n\n"
-                results_summary += "```\n" + ", ".join(lemmas) + "\n```\n\n"
-            else:
-                results_summary += "⚠️ Aucun lemme extrait\n\n"
+        # Afficher les lemmes
+        if lemmas:
+            parts.append(f"**Lemmes extraits ({len(lemmas)}):**\n\n")
+            parts.append("```\n" + ", ".join(lemmas) + "\n```\n\n")
+        else:
+            parts.append("⚠️ Aucun lemme extrait\n\n")
 
-            # Afficher les statistiques si le schéma existe
-            if image_name in batch_schemas:
-                schema = batch_schemas[image_name]
-                stats = schema.get_statistics()
-                results_summary += f"""**Résultats Data Vault:**
+        # Afficher les statistiques si le schéma existe
+        stats = per_image_stats.get(image_name)
+        if stats is not None:
+            parts.append(f"""**Résultats Data Vault:**
 - Hubs (entités): {stats['total_hubs']}
 - Links (relations): {stats['total_links']}
 - Satellites (attributs): {stats['total_satellites']}
 - Confiance moyenne: Hubs {stats['average_confidence']['hubs']:.2%}, Links {stats['average_confidence']['links']:.2%}, Satellites {stats['average_confidence']['satellites']:.2%}
-"""
-            else:
-                results_summary += "❌ Traitement échoué\n"
+""")
+        else:
+            parts.append("❌ Traitement échoué\n")
 
-        status_msg = f"✅ **Traitement terminé**\n\n{successful_images} images traitées avec succès sur {total_images}"
+    return "".join(parts)
 
-        return status_msg, results_summary
 
-    except Exception as e:
-        return f"❌ Erreur lors du traitement: {str(e)}", ""
+# Exporteurs du traitement par lot : (instance, extension) par format
+_BATCH_EXPORTERS = {
+    "JSON": (JSONExporter(), "json"),
+    "RDF/Turtle": (RDFExporter(), "ttl"),
+    "SQL": (SQLExporter(), "sql"),
+}
+
+
+def _export_one(image_name: str, schema: DataVaultSchema, export_format: str) -> Tuple[str, bytes]:
+    """
+    Sérialise le schéma d'une image dans le format demandé.
+
+    Args:
+        image_name: Nom de l'image source
+        schema: Schéma Data Vault à exporter
+        export_format: Format d'export ("JSON", "RDF/Turtle", "SQL")
+
+    Returns:
+        Tuple (nom_dans_l_archive, contenu)
+    """
+    exporter, extension = _BATCH_EXPORTERS[export_format]
+    return f"{Path(image_name).stem}.{extension}", exporter.serialize(schema)
 
 
 def export_batch_results(export_format: str) -> Tuple[str, Optional[str]]:
     """
-    Exporte tous les schémas du traitement par lot.
+    Exporte tous les schémas du traitement par lot dans une archive zip.
 
     Args:
         export_format: Format d'export ("JSON", "RDF", "SQL")
@@ -446,52 +633,49 @@ def export_batch_results(export_format: str) -> Tuple[str, Optional[str]]:
     Returns:
         Tuple (message, chemin_fichier)
     """
-    global batch_schemas
-
     if not batch_schemas:
         return "❌ Aucun schéma à exporter. Traitez d'abord un répertoire d'images.", None
 
+    if export_format not in _BATCH_EXPORTERS:
+        return "❌ Format d'export invalide", None
+
     try:
         export_dir = Path(config.EXPORT_PATH)
         export_dir.mkdir(parents=True, exist_ok=True)
 
         timestamp = time.strftime("%Y%m%d_%H%M%S")
-        batch_dir = export_dir / f"batch_{timestamp}"
-        batch_dir.mkdir(exist_ok=True)
-
+        zip_path = export_dir / f"batch_{timestamp}.zip"
+
+        # Sérialisation en parallèle, écriture directe dans l'archive (pas de
+        # répertoire intermédiaire relu ensuite par make_archive)
+        # (chaque thread relit son schéma depuis le stockage SQLite ; au plus
+        # 2 × workers tâches en vol pour que la mémoire ne croisse pas avec le lot)
+        image_names = batch_schemas.keys()
+        max_workers = min(8, len(image_names))
+        pending: deque = deque()
         exported_count = 0
 
-        for image_name, schema in batch_schemas.items():
-            # Nettoyer le nom de fichier
-            clean_name = Path(image_name).stem
-
-            if export_format == "JSON":
-                exporter = JSONExporter()
-                output_path = batch_dir / f"{clean_name}.json"
-                exporter.export(schema, str(output_path))
-
-            elif export_format == "RDF/Turtle":
-                exporter = RDFExporter()
-                output_path = batch_dir / f"{clean_name}.ttl"
-                exporter.export(schema, str(output_path), format="turtle")
-
-            elif export_format == "SQL":
-                exporter = SQLExporter()
-                output_path = batch_dir / f"{clean_name}.sql"
-                exporter.export(schema, str(output_path))
+        def _write_oldest():
+            arcname, content = pending.popleft().result()
+            zf.writestr(arcname, content)
 
-            else:
-                return "❌ Format d'export invalide", None
-
-            exported_count += 1
-
-        message = f"✅ Export {export_format} réussi\n\n{exported_count} fichiers exportés dans:\n📁 {batch_dir}"
+        with open(zip_path, 'wb', buffering=1024 * 1024) as zip_file, \
+                zipfile.ZipFile(zip_file, 'w', zipfile.ZIP_DEFLATED, compresslevel=3) as zf, \
+                ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for image_name in image_names:
+                if len(pending) >= 2 * max_workers:
+                    _write_oldest()
+                    exported_count += 1
+                pending.append(executor.submit(
+                    lambda name: _export_one(name, batch_schemas[name], export_format), image_name
+                ))
+            while pending:
+                _write_oldest()
+                exported_count += 1
 
-        # Créer un fichier zip pour faciliter le téléchargement
-        zip_path = str(batch_dir) + ".zip"
-        shutil.make_archive(str(batch_dir), 'zip', batch_dir)
+        message = f"✅ Export {export_format} réussi\n\n{exported_count} fichiers exportés dans:\n📁 {zip_path}"
 
-        return message, zip_path
+        return message, str(zip_path)
 
     except Exception as e:
         return f"❌ Erreur lors de l'export: {str(e)}", None
@@ -512,8 +696,7 @@ def _format_results_by_hub(hubs: list, links: list, satellites: list) -> str:
     if not hubs:
         return "Aucune entité détectée"
 
-    output = "## Structure Data Vault\n\n"
-    output += "```\n"
+    parts = ["## Structure Data Vault\n\n", "```\n"]
 
     # Identifier le hub plante et le hub problème
     hub_plante = None
@@ -530,60 +713,53 @@ def _format_results_by_hub(hubs: list, links: list, satellites: list) -> str:
     for sat in satellites:
         satellites_by_hub.setdefault(sat.hub_key, []).append(sat)
 
-    # Fonction helper pour afficher les satellites d'un hub
-    def _format_satellites(hub, indent="   "):
-        lines = ""
+    # Fonction helper pour ajouter les satellites d'un hub
+    def _append_satellites(hub, indent="   "):
         for sat in satellites_by_hub.get(hub.hub_key, []):
             if sat.confidence_score < 1.0:
-                lines += f"{indent}SATELLITE {sat.attribute_name} (score: {sat.confidence_score:.2f}): {sat.attribute_value}\n"
+                parts.append(f"{indent}SATELLITE {sat.attribute_name} (score: {sat.confidence_score:.2f}): {sat.attribute_value}\n")
             else:
-                lines += f"{indent}SATELLITE {sat.attribute_name}: {sat.attribute_value}\n"
-        return lines
+                parts.append(f"{indent}SATELLITE {sat.attribute_name}: {sat.attribute_value}\n")
 
     # Afficher le Hub plante avec ses satellites
     if hub_plante:
-        output += f"HUB plante: {hub_plante.business_key}\n"
-        plant_sats = _format_satellites(hub_plante)
-        if plant_sats:
-            output += plant_sats
-        output += "\n"
+        parts.append(f"HUB plante: {hub_plante.business_key}\n")
+        _append_satellites(hub_plante)
+        parts.append("\n")
 
     # Afficher le Link
     if links:
         link = links[0]
-        output += f"   LINK relation: {link.relation_type}\n\n"
+        parts.append(f"   LINK relation: {link.relation_type}\n\n")
 
     # Afficher le Hub problème avec ses satellites
     if hub_probleme:
-        output += f"   HUB {hub_probleme.entity_type}: {hub_probleme.business_key}\n"
-        problem_sats = _format_satellites(hub_probleme, "   ")
-        if problem_sats:
-            output += problem_sats
-        output += "\n"
+        parts.append(f"   HUB {hub_probleme.entity_type}: {hub_probleme.business_key}\n")
+        _append_satellites(hub_probleme, "   ")
+        parts.append("\n")
 
     # Afficher le résumé du Link créé
     if hub_plante and hub_probleme and links:
         link = links[0]
-        output += f"   LINK créé: {hub_plante.business_key} --{link.relation_type}--> {hub_probleme.business_key}\n"
+        parts.append(f"   LINK créé: {hub_plante.business_key} --{link.relation_type}--> {hub_probleme.business_key}\n")
 
-    output += "```\n"
+    parts.append("```\n")
 
-    return output
+    return "".join(parts)
 
 
-def export_schema(export_format: str) -> Tuple[str, Optional[str]]:
+def export_schema(export_format: str, schema: Optional[DataVaultSchema]) -> Tuple[str, Optional[str]]:
     """
-    Exporte le dernier schéma généré.
+    Exporte le dernier schéma généré dans la session.
 
     Args:
         export_format: Format d'export ("JSON", "RDF", "SQL")
+        schema: Schéma de la session (gr.State), None si aucune analyse
 
     Returns:
         Tuple (message, chemin_fichier)
     """
-    global last_schema
-
-    if last_schema is None:
+    if schema is None:
         return "❌ Aucun schéma à exporter. Analysez d'abord une image.", None
 
     try:
@@ -596,19 +772,19 @@ def export_schema(export_format: str) -> Tuple[str, Optional[str]]:
         if export_format == "JSON":
             exporter = JSONExporter()
             output_path = export_dir / f"schema_{timestamp}.json"
-            exporter.export(last_schema, str(output_path))
+            exporter.export(schema, str(output_path))
             message = f"✅ Export JSON réussi"
 
         elif export_format == "RDF/Turtle":
             exporter = RDFExporter()
             output_path = export_dir / f"schema_{timestamp}.ttl"
-            exporter.export(last_schema, str(output_path), format="turtle")
+            exporter.export(schema, str(output_path), format="turtle")
             message = f"✅ Export RDF/Turtle réussi"
 
         elif export_format == "SQL":
             exporter = SQLExporter()
             output_path = export_dir / f"schema_{timestamp}.sql"
-            exporter.export(last_schema, str(output_path))
+            exporter.export(schema, str(output_path))
             message = f"✅ Export SQL réussi"
 
         else:
@@ -620,9 +796,10 @@ def export_schema(export_format: str) -> Tuple[str, Optional[str]]:
         return f"❌ Erreur lors de l'export: {str(e)}", None
 
 
-def get_ontology_info() -> str:
-    """Retourne les informations sur l'ontologie."""
-    stats = ontology.get_statistics()
+@lru_cache(maxsize=1)
+def _ontology_info_cached(ontology_path: str, mtime: float) -> str:
+    """Construit la fiche Markdown de l'ontologie (clé: chemin et date de modification du fichier)."""
+    stats = _get_ontology(ontology_path).get_statistics()
 
     info = f"""
 # Ontologie - Plantes Agricoles du Burkina Faso
@@ -646,11 +823,24 @@ Maïs, Oignon, Tomate
 
 ### Fichier
 
-`{config.ONTOLOGY_PATH}`
+`{ontology_path}`
 """
     return info
 
 
+def get_ontology_info() -> str:
+    """Retourne les informations sur l'ontologie (calculées une fois par version du fichier)."""
+    return _ontology_info_cached(config.ONTOLOGY_PATH, os.path.getmtime(config.ONTOLOGY_PATH))
+
+
+def refresh_ontology_info() -> str:
+    """Vide les caches d'ontologie (fiche, graphe, liste des fichiers) et recalcule la fiche."""
+    _ontology_info_cached.cache_clear()
+    _get_ontology_cached.cache_clear()
+    config.refresh_ontologies()
+    return get_ontology_info()
+
+
 # ========== CONSTRUCTION DE L'INTERFACE GRADIO ==========
 
 # Thème personnalisé sobre et moderne
@@ -684,6 +874,9 @@ with gr.Blocks(title="Extraction de Connaissances - Plantes", theme=theme, css="
     Maïs, Oignon, Tomate
     """)
 
+    # Dernier schéma analysé, propre à chaque session (analyses simultanées possibles)
+    schema_state = gr.State(None)
+
     # ========== ONGLET 1: ANALYSE ==========
     with gr.Tab("Analyse"):
         with gr.Row():
@@ -717,7 +910,8 @@ with gr.Blocks(title="Extraction de Connaissances - Plantes", theme=theme, css="
                             ("Lexical (Jaro-Winkler)", "lexical"),
                             ("Sémantique (Embeddings)", "semantic"),
                             ("Cosinus (N-grams)", "cosine"),
-                            ("Jaro-Winkler", "jaro_winkler")
+                            ("Jaro-Winkler", "jaro_winkler"),
+                            ("Tokens (WRatio)", "token_ratio")
                         ],
                         value=config.SIMILARITY_ALGORITHM,
                         label="Mesure de similarité",
@@ -754,8 +948,8 @@ with gr.Blocks(title="Extraction de Connaissances - Plantes", theme=theme, css="
             outputs=[status_box, lemmas_output, results_by_hub, stats_output]
         ).then(
             fn=analyze_image,
-            inputs=[image_input, model_selector, ontology_selector, similarity_selector, threshold_e, threshold_r, threshold_a],
-            outputs=[status_box, lemmas_output, results_by_hub, stats_output],
+            inputs=[image_input, model_selector, ontology_selector, similarity_selector, threshold_e, threshold_r, threshold_a, schema_state],
+            outputs=[status_box, lemmas_output, results_by_hub, stats_output, schema_state],
             show_progress="full"
         )
 
@@ -797,7 +991,8 @@ with gr.Blocks(title="Extraction de Connaissances - Plantes", theme=theme, css="
                             ("Lexical (Jaro-Winkler)", "lexical"),
                             ("Sémantique (Embeddings)", "semantic"),
                             ("Cosinus (N-grams)", "cosine"),
-                            ("Jaro-Winkler", "jaro_winkler")
+                            ("Jaro-Winkler", "jaro_winkler"),
+                            ("Tokens (WRatio)", "token_ratio")
                         ],
                         value=config.SIMILARITY_ALGORITHM,
                         label="Mesure de similarité",
@@ -849,7 +1044,12 @@ with gr.Blocks(title="Extraction de Connaissances - Plantes", theme=theme, css="
                 batch_threshold_a
             ],
             outputs=[batch_status_box, batch_results_output],
-            show_progress="full"
+            show_progress="full",
+            # Un seul lot à la fois (résultats partagés dans batch_schemas) ; le lot
+            # parallélise lui-même ses appels Ollama et laisse les autres créneaux
+            # de la file aux analyses d'image unique
+            concurrency_limit=1,
+            concurrency_id="batch"
         )
 
         # Section Export des résultats batch
@@ -872,7 +1072,10 @@ with gr.Blocks(title="Extraction de Connaissances - Plantes", theme=theme, css="
         batch_export_btn.click(
             fn=export_batch_results,
             inputs=[batch_export_format],
-            outputs=[batch_export_message, batch_export_file]
+            outputs=[batch_export_message, batch_export_file],
+            # Même créneau que le traitement : pas d'export d'un lot en cours d'écriture
+            concurrency_limit=1,
+            concurrency_id="batch"
         )
 
     # ========== ONGLET 3: EXPORT (Image unique) ==========
@@ -892,13 +1095,21 @@ with gr.Blocks(title="Extraction de Connaissances - Plantes", theme=theme, css="
 
         export_btn.click(
             fn=export_schema,
-            inputs=[export_format],
+            inputs=[export_format, schema_state],
             outputs=[export_message, export_file]
         )
 
     # ========== ONGLET 4: ONTOLOGIE ==========
     with gr.Tab("Ontologie"):
-        ontology_info = gr.Markdown(value=get_ontology_info())
+        # Fonction évaluée au chargement de la page, pas à la construction de l'interface
+        ontology_info = gr.Markdown(value=get_ontology_info)
+        refresh_ontology_btn = gr.Button("Actualiser les informations", size="sm")
+
+        refresh_ontology_btn.click(
+            fn=refresh_ontology_info,
+            inputs=None,
+            outputs=[ontology_info]
+        )
 
     # ========== ONGLET 5: INFORMATIONS ==========
     with gr.Tab("Info"):
@@ -943,6 +1154,13 @@ with gr.Blocks(title="Extraction de Connaissances - Plantes", theme=theme, css="
                 Version 1.0.0
                 """)
 
+# File d'attente configurée ici (et non au lancement) pour s'appliquer aussi à main.py :
+# plusieurs analyses s'exécutent en parallèle, en phase avec OLLAMA_NUM_PARALLEL
+app.queue(
+    default_concurrency_limit=config.GRADIO_CONCURRENCY,
+    max_size=config.GRADIO_MAX_QUEUE
+)
+
 # ========== LANCEMENT DE L'APPLICATION ==========
 
 if __name__ == "__main__":
@@ -950,7 +1168,7 @@ if __name__ == "__main__":
     print("🚀 Lancement de l'interface Gradio")
     print("=" * 60)
 
-    app.queue().launch(
+    app.launch(
         server_name=config.GRADIO_SERVER_NAME,
         server_port=config.GRADIO_SERVER_PORT,
         share=config.GRADIO_SHARE,
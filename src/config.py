@@ -4,23 +4,77 @@ Charge les paramètres depuis les variables d'environnement ou utilise les valeu
 """
 
 import os
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict
-from dotenv import load_dotenv
+from typing import Dict, Tuple
+
+# Tentative d'importation de python-dotenv (inutile quand l'environnement est fourni
+# directement, par exemple par Docker)
+try:
+    from dotenv import load_dotenv
+    DOTENV_AVAILABLE = True
+except ImportError:
+    load_dotenv = None
+    DOTENV_AVAILABLE = False
 
 # Charger le fichier .env si présent
-load_dotenv()
+if DOTENV_AVAILABLE:
+    load_dotenv()
+
+
+@lru_cache(maxsize=1)
+def _scan_ontologies(ontology_dir: str, mtime_ns: int) -> Tuple[Tuple[str, str], ...]:
+    """
+    Liste les fichiers .ttl d'un dossier (clé: chemin et date de modification du dossier).
 
+    Args:
+        ontology_dir: Dossier des ontologies
+        mtime_ns: Date de modification du dossier (invalide le cache à l'ajout d'un fichier)
 
+    Returns:
+        Tuple de couples (nom_fichier, chemin_complet), non modifiable
+    """
+    ontologies = []
+    # os.scandir: une seule lecture du dossier, sans objet Path par entrée
+    with os.scandir(ontology_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith(".ttl") and entry.is_file():
+                ontologies.append((entry.name, entry.path))
+    return tuple(ontologies)
+
+
+@dataclass(frozen=True, slots=True)
 class Config:
-    """Classe de configuration centralisée."""
+    """
+    Classe de configuration centralisée.
+
+    Les variables d'environnement sont lues une seule fois, à l'import ;
+    l'instance est figée (frozen) et ses champs sont stockés dans des slots.
+    """
 
     # Répertoire racine du projet
-    BASE_DIR = Path(__file__).parent.parent
+    BASE_DIR: Path = Path(__file__).parent.parent
 
     # Configuration Ollama
     OLLAMA_BASE_URL: str = os.getenv("OLLAMA_BASE_URL", "http://ollama:11434")
     LLAVA_MODEL: str = os.getenv("LLAVA_MODEL", "llava:13b")
+    # Requêtes simultanées envoyées à Ollama (à aligner sur OLLAMA_NUM_PARALLEL du serveur)
+    OLLAMA_NUM_PARALLEL: int = int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))
+    # Sortie structurée (JSON contraint par schéma) au lieu de la liste de lemmes texte
+    LLAVA_STRUCTURED_OUTPUT: bool = os.getenv("LLAVA_STRUCTURED_OUTPUT", "false").lower() == "true"
+    # Durée de maintien du modèle en mémoire côté Ollama entre deux requêtes
+    OLLAMA_KEEP_ALIVE: str = os.getenv("OLLAMA_KEEP_ALIVE", "10m")
+    # Nombre max de tokens générés par réponse ; 0 = illimité (défaut : la section
+    # ANALYSE précède la ligne de lemmes, un plafond bas peut la couper)
+    LLAVA_NUM_PREDICT: int = int(os.getenv("LLAVA_NUM_PREDICT", "0"))
+    # Plus grand côté (pixels) des images envoyées au LLM ; 0 = image d'origine
+    # (672 pour LLaVA 1.6, 336 suffit pour les modèles LLaVA 1.5)
+    MAX_IMAGE_EDGE: int = int(os.getenv("MAX_IMAGE_EDGE", "672"))
+    # Intervalle (secondes) de vérification en arrière-plan des modèles disponibles
+    MODEL_HEALTH_INTERVAL: float = float(os.getenv("MODEL_HEALTH_INTERVAL", "10"))
+    # Mémoire max (Mo) des images encodées gardées pour les requêtes suivantes
+    MAX_IMAGE_CACHE_MB: int = int(os.getenv("MAX_IMAGE_CACHE_MB", "256"))
 
     # Chemins de données
     ONTOLOGY_DIR: Path = BASE_DIR / "data" / "ontology"
@@ -37,6 +91,10 @@ class Config:
         str(BASE_DIR / "exports")
     )
 
+    # Cache disque (lemmes extraits, etc.)
+    CACHE_DIR: str = os.getenv("CACHE_DIR", str(BASE_DIR / ".cache"))
+    MAX_CACHE_MB: int = int(os.getenv("MAX_CACHE_MB", "256"))
+
     # Seuils de similarité par défaut
     THRESHOLD_ENTITIES: float = float(os.getenv("THRESHOLD_ENTITIES", "0.75"))
     THRESHOLD_RELATIONS: float = float(os.getenv("THRESHOLD_RELATIONS", "0.70"))
@@ -46,49 +104,59 @@ class Config:
     GRADIO_SERVER_PORT: int = int(os.getenv("GRADIO_SERVER_PORT", "7860"))
     GRADIO_SERVER_NAME: str = os.getenv("GRADIO_SERVER_NAME", "0.0.0.0")
     GRADIO_SHARE: bool = os.getenv("GRADIO_SHARE", "false").lower() == "true"
+    # Requêtes traitées simultanément par handler et taille max de la file d'attente
+    GRADIO_CONCURRENCY: int = int(os.getenv("GRADIO_CONCURRENCY", "4"))
+    GRADIO_MAX_QUEUE: int = int(os.getenv("GRADIO_MAX_QUEUE", "32"))
 
     # Modèle d'embeddings (Ollama)
     EMBEDDING_MODEL: str = os.getenv(
         "EMBEDDING_MODEL",
         "nextfire/paraphrase-multilingual-minilm:l12-v2"
     )
+    # Cosinus sur embeddings quantifiés int8 avec SimSIMD (approximation ~1e-2)
+    SIMILARITY_INT8: bool = os.getenv("SIMILARITY_INT8", "false").lower() == "true"
 
     # Algorithme de similarité par défaut
     SIMILARITY_ALGORITHM: str = os.getenv("SIMILARITY_ALGORITHM", "hybrid")
 
-    @classmethod
-    def get_available_ontologies(cls) -> Dict[str, str]:
+    def get_available_ontologies(self) -> Dict[str, str]:
         """
         Retourne les ontologies disponibles dans le dossier data/ontology.
 
+        Le contenu du dossier est mis en cache : seul un stat() du dossier est
+        fait à chaque appel tant qu'aucun fichier n'y est ajouté ou supprimé.
+
         Returns:
-            Dict[str, str]: Dictionnaire {nom_fichier: chemin_complet}
+            Dict[str, str]: Dictionnaire {nom_fichier: chemin_complet} (copie modifiable)
         """
-        ontologies = {}
-        if cls.ONTOLOGY_DIR.exists():
-            for file_path in cls.ONTOLOGY_DIR.glob("*.ttl"):
-                ontologies[file_path.name] = str(file_path)
-        return ontologies
+        try:
+            mtime_ns = os.stat(self.ONTOLOGY_DIR).st_mtime_ns
+        except OSError:
+            return {}
+        return dict(_scan_ontologies(str(self.ONTOLOGY_DIR), mtime_ns))
 
     @classmethod
-    def get_thresholds(cls) -> Dict[str, float]:
+    def refresh_ontologies(cls):
+        """Vide le cache de la liste des ontologies (relu au prochain appel)."""
+        _scan_ontologies.cache_clear()
+
+    def get_thresholds(self) -> Dict[str, float]:
         """Retourne les seuils de similarité sous forme de dictionnaire."""
         return {
-            "entities": cls.THRESHOLD_ENTITIES,
-            "relations": cls.THRESHOLD_RELATIONS,
-            "attributes": cls.THRESHOLD_ATTRIBUTES
+            "entities": self.THRESHOLD_ENTITIES,
+            "relations": self.THRESHOLD_RELATIONS,
+            "attributes": self.THRESHOLD_ATTRIBUTES
         }
 
-    @classmethod
-    def validate_paths(cls) -> bool:
+    def validate_paths(self) -> bool:
         """
         Valide l'existence des chemins critiques.
 
         Returns:
             bool: True si tous les chemins existent, False sinon.
         """
-        ontology_path = Path(cls.ONTOLOGY_PATH)
-        images_path = Path(cls.IMAGES_PATH)
+        ontology_path = Path(self.ONTOLOGY_PATH)
+        images_path = Path(self.IMAGES_PATH)
 
         if not ontology_path.exists():
             print(f"⚠️  Fichier ontologie introuvable: {ontology_path}")
@@ -99,28 +167,36 @@ class Config:
             return False
 
         # Créer le dossier exports s'il n'existe pas
-        export_path = Path(cls.EXPORT_PATH)
+        export_path = Path(self.EXPORT_PATH)
         export_path.mkdir(parents=True, exist_ok=True)
 
         return True
 
-    @classmethod
-    def display_config(cls):
+    def display_config(self):
         """Affiche la configuration actuelle."""
-        print("=" * 60)
-        print("📋 CONFIGURATION DU SYSTÈME")
-        print("=" * 60)
-        print(f"🔗 Ollama URL: {cls.OLLAMA_BASE_URL}")
-        print(f"🤖 Modèle LLaVA: {cls.LLAVA_MODEL}")
-        print(f"📚 Ontologie: {cls.ONTOLOGY_PATH}")
-        print(f"🖼️  Images: {cls.IMAGES_PATH}")
-        print(f"💾 Exports: {cls.EXPORT_PATH}")
-        print(f"🎯 Seuils: Entités={cls.THRESHOLD_ENTITIES}, "
-              f"Relations={cls.THRESHOLD_RELATIONS}, "
-              f"Attributs={cls.THRESHOLD_ATTRIBUTES}")
-        print(f"🌐 Gradio: {cls.GRADIO_SERVER_NAME}:{cls.GRADIO_SERVER_PORT}")
-        print(f"🧠 Embeddings: {cls.EMBEDDING_MODEL}")
-        print("=" * 60)
+        # Rapport construit en mémoire puis écrit en une seule fois
+        lines = [
+            "=" * 60,
+            "📋 CONFIGURATION DU SYSTÈME",
+            "=" * 60,
+            f"🔗 Ollama URL: {self.OLLAMA_BASE_URL}",
+            f"🤖 Modèle LLaVA: {self.LLAVA_MODEL}",
+            f"⚡ Requêtes Ollama parallèles: {self.OLLAMA_NUM_PARALLEL}",
+            f"🧾 Sortie structurée JSON: {self.LLAVA_STRUCTURED_OUTPUT}",
+            f"📐 Taille max des images envoyées: {self.MAX_IMAGE_EDGE or 'originale'}",
+            f"📚 Ontologie: {self.ONTOLOGY_PATH}",
+            f"🖼️  Images: {self.IMAGES_PATH}",
+            f"💾 Exports: {self.EXPORT_PATH}",
+            f"🗄️  Cache: {self.CACHE_DIR} (max {self.MAX_CACHE_MB} Mo)",
+            f"🎯 Seuils: Entités={self.THRESHOLD_ENTITIES}, "
+            f"Relations={self.THRESHOLD_RELATIONS}, "
+            f"Attributs={self.THRESHOLD_ATTRIBUTES}",
+            f"🌐 Gradio: {self.GRADIO_SERVER_NAME}:{self.GRADIO_SERVER_PORT} "
+            f"(concurrence={self.GRADIO_CONCURRENCY}, file={self.GRADIO_MAX_QUEUE})",
+            f"🧠 Embeddings: {self.EMBEDDING_MODEL}",
+            "=" * 60,
+        ]
+        print("\n".join(lines))
 
 
 # Instance globale de configuration
@@ -3,18 +3,103 @@ Module de génération et validation du schéma Data Vault.
 Assemble les Hubs, Links et Satellites en un schéma cohérent.
 """
 
+from collections import Counter
 from dataclasses import dataclass, field
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set, Tuple
 from datetime import datetime
+from itertools import chain
+from operator import attrgetter
+import numpy as np
 from src.models.hub import Hub
 from src.models.link import Link
 from src.models.satellite import Satellite
 
 
-@dataclass
+# Accès aux attributs en C (plus rapide que h.attr dans les boucles de validation)
+_get_hub_key = attrgetter("hub_key")
+_get_link_key = attrgetter("link_key")
+_get_satellite_key = attrgetter("satellite_key")
+_get_confidence = attrgetter("confidence_score")
+_get_link_pair = attrgetter("hub_source_key", "hub_target_key")
+
+# Au-delà de ce nombre d'éléments, la vérification des scores est vectorisée avec NumPy
+_VECTORIZE_MIN_ITEMS = 256
+# Idem pour les statistiques (get_statistics)
+_VECTORIZE_STATS_MIN_ITEMS = 1024
+
+# Version du générateur inscrite dans les métadonnées des schémas
+GENERATOR_VERSION = "1.0.0"
+
+
+def _invalid_confidence_indices(items: list) -> List[int]:
+    """
+    Retourne les positions des éléments dont le score de confiance sort de [0, 1].
+
+    Args:
+        items: Hubs, Links ou Satellites
+
+    Returns:
+        Indices des scores invalides, dans l'ordre de la liste
+    """
+    if len(items) <= _VECTORIZE_MIN_ITEMS:
+        return [i for i, score in enumerate(map(_get_confidence, items)) if not 0 <= score <= 1]
+
+    scores = np.fromiter(map(_get_confidence, items), dtype=np.float64, count=len(items))
+    # ~(0 <= x <= 1) rejette aussi les NaN, comme la version Python
+    bad_mask = ~((scores >= 0) & (scores <= 1))
+    if not bad_mask.any():
+        return []
+    return np.flatnonzero(bad_mask).tolist()
+
+
+def _count_and_mean_confidence(items: list, attribute: str) -> Tuple[Dict[str, int], float]:
+    """
+    Compte les valeurs d'un attribut et calcule le score de confiance moyen, en une passe.
+
+    Args:
+        items: Hubs, Links ou Satellites
+        attribute: Attribut à compter (ex: "entity_type")
+
+    Returns:
+        Tuple (comptage par valeur, score de confiance moyen ou 0 si la liste est vide)
+    """
+    if len(items) >= _VECTORIZE_STATS_MIN_ITEMS:
+        # Grands schémas fusionnés : comptage et moyenne en code natif
+        counts = Counter(map(attrgetter(attribute), items))
+        scores = np.fromiter(map(_get_confidence, items), dtype=np.float64, count=len(items))
+        return dict(counts), float(scores.mean())
+
+    counts = Counter()
+    total = 0.0
+    for item in items:
+        counts[getattr(item, attribute)] += 1
+        total += item.confidence_score
+    return dict(counts), (total / len(items) if items else 0)
+
+
+def _has_duplicate(keys) -> bool:
+    """
+    Indique si un itérable contient une clé en double (arrêt au premier doublon).
+
+    Args:
+        keys: Itérable de clés
+
+    Returns:
+        True si une clé apparaît plusieurs fois
+    """
+    seen = set()
+    add = seen.add
+    for key in keys:
+        if key in seen:
+            return True
+        add(key)
+    return False
+
+
+@dataclass(slots=True)
 class DataVaultSchema:
     """
-    Schéma Data Vault complet.
+    Schéma Data Vault complet (slots : pas de __dict__ par instance).
 
     Attributes:
         hubs: Liste des Hubs (entités)
@@ -27,6 +112,42 @@ class DataVaultSchema:
     satellites: List[Satellite] = field(default_factory=list)
     metadata: Dict[str, Any] = field(default_factory=dict)
 
+    def valid_hub_keys(self) -> Set[str]:
+        """
+        Retourne l'ensemble des clés des Hubs du schéma.
+
+        Non mémorisé : la construction coûte autant que la vérification qui l'utilise,
+        et les Hubs peuvent être remplacés à tout moment.
+
+        Returns:
+            Ensemble des hub_key
+        """
+        return set(map(_get_hub_key, self.hubs))
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """État picklé : les champs du schéma."""
+        return {
+            "hubs": self.hubs,
+            "links": self.links,
+            "satellites": self.satellites,
+            "metadata": self.metadata
+        }
+
+    def __setstate__(self, state: Dict[str, Any]):
+        """
+        Restaure un schéma picklé.
+
+        Accepte aussi les schémas enregistrés avant le passage aux slots
+        (état = ancien __dict__).
+
+        Args:
+            state: Dictionnaire des champs du schéma
+        """
+        self.hubs = state.get("hubs", [])
+        self.links = state.get("links", [])
+        self.satellites = state.get("satellites", [])
+        self.metadata = state.get("metadata", {})
+
     def to_dict(self) -> dict:
         """
         Convertit le schéma en dictionnaire pour export.
@@ -48,25 +169,10 @@ class DataVaultSchema:
         Returns:
             Dictionnaire de statistiques
         """
-        # Compter les entités par type
-        entity_types = {}
-        for hub in self.hubs:
-            entity_types[hub.entity_type] = entity_types.get(hub.entity_type, 0) + 1
-
-        # Compter les relations par type
-        relation_types = {}
-        for link in self.links:
-            relation_types[link.relation_type] = relation_types.get(link.relation_type, 0) + 1
-
-        # Compter les attributs par nom
-        attribute_names = {}
-        for satellite in self.satellites:
-            attribute_names[satellite.attribute_name] = attribute_names.get(satellite.attribute_name, 0) + 1
-
-        # Calculer scores moyens
-        avg_hub_score = sum(h.confidence_score for h in self.hubs) / len(self.hubs) if self.hubs else 0
-        avg_link_score = sum(l.confidence_score for l in self.links) / len(self.links) if self.links else 0
-        avg_sat_score = sum(s.confidence_score for s in self.satellites) / len(self.satellites) if self.satellites else 0
+        # Comptage par type et score moyen, en une seule passe par collection
+        entity_types, avg_hub_score = _count_and_mean_confidence(self.hubs, "entity_type")
+        relation_types, avg_link_score = _count_and_mean_confidence(self.links, "relation_type")
+        attribute_names, avg_sat_score = _count_and_mean_confidence(self.satellites, "attribute_name")
 
         return {
             "total_hubs": len(self.hubs),
@@ -83,253 +189,259 @@ class DataVaultSchema:
         }
 
 
-class DataVaultGenerator:
+def generate_schema(
+    hubs: List[Hub],
+    links: List[Link],
+    satellites: List[Satellite],
+    source_image: str,
+    lemmas: List[str],
+    timestamp: Optional[str] = None
+) -> DataVaultSchema:
     """
-    Générateur et validateur de schémas Data Vault.
+    Génère un schéma Data Vault à partir des composants.
+
+    Args:
+        hubs: Liste des Hubs
+        links: Liste des Links
+        satellites: Liste des Satellites
+        source_image: Nom de l'image source
+        lemmas: Lemmes extraits originaux
+        timestamp: Date de génération ISO 8601 (ex: commune à un lot) ; maintenant si None
+
+    Returns:
+        Schéma Data Vault complet
+    """
+    # Créer métadonnées
+    metadata = {
+        "generated_at": timestamp or datetime.now().isoformat(),
+        "source_image": source_image,
+        "original_lemmas": lemmas,
+        "lemmas_count": len(lemmas),
+        "generator_version": GENERATOR_VERSION
+    }
+
+    # Créer le schéma
+    schema = DataVaultSchema(
+        hubs=hubs,
+        links=links,
+        satellites=satellites,
+        metadata=metadata
+    )
+
+    print(f"✅ Schéma Data Vault généré: "
+          f"{len(hubs)} Hubs, {len(links)} Links, {len(satellites)} Satellites")
+
+    return schema
+
+
+def validate_schema(schema: DataVaultSchema) -> List[str]:
     """
+    Valide l'intégrité du schéma Data Vault.
 
-    def __init__(self):
-        """Initialise le générateur."""
-        pass
+    Args:
+        schema: Schéma à valider
 
-    def generate_schema(
-        self,
-        hubs: List[Hub],
-        links: List[Link],
-        satellites: List[Satellite],
-        source_image: str,
-        lemmas: List[str]
-    ) -> DataVaultSchema:
-        """
-        Génère un schéma Data Vault à partir des composants.
+    Returns:
+        Liste d'erreurs/warnings (vide si tout est valide)
+    """
+    if not (schema.hubs or schema.links or schema.satellites):
+        # Schéma vide : seules les contraintes structurelles ont quelque chose à signaler
+        checks = (_check_structural_constraints,)
+    elif not (schema.links or schema.satellites):
+        # Aucune référence vers un Hub : intégrité référentielle inutile
+        checks = (
+            _check_key_uniqueness,
+            _check_confidence_scores,
+            _check_structural_constraints
+        )
+    else:
+        checks = (
+            _check_key_uniqueness,         # 1. Unicité des clés
+            _check_referential_integrity,  # 2. Intégrité référentielle
+            _check_confidence_scores,      # 3. Scores de confiance
+            _check_structural_constraints  # 4. Contraintes structurelles
+        )
 
-        Args:
-            hubs: Liste des Hubs
-            links: Liste des Links
-            satellites: Liste des Satellites
-            source_image: Nom de l'image source
-            lemmas: Lemmes extraits originaux
+    errors = list(chain.from_iterable(check(schema) for check in checks))
 
-        Returns:
-            Schéma Data Vault complet
-        """
-        # Créer métadonnées
-        metadata = {
-            "generated_at": datetime.now().isoformat(),
-            "source_image": source_image,
-            "original_lemmas": lemmas,
-            "lemmas_count": len(lemmas),
-            "generator_version": "1.0.0"
-        }
+    if errors:
+        print(f"⚠️  Validation: {len(errors)} problème(s) détecté(s)")
+        for error in errors:
+            print(f"   - {error}")
+    else:
+        print("✅ Schéma valide: toutes les vérifications passées")
 
-        # Créer le schéma
-        schema = DataVaultSchema(
-            hubs=hubs,
-            links=links,
-            satellites=satellites,
-            metadata=metadata
-        )
+    return errors
 
-        print(f"✅ Schéma Data Vault généré: "
-              f"{len(hubs)} Hubs, {len(links)} Links, {len(satellites)} Satellites")
 
-        return schema
+def _check_key_uniqueness(schema: DataVaultSchema) -> List[str]:
+    """Vérifie l'unicité des clés."""
+    errors = []
 
-    def validate_schema(self, schema: DataVaultSchema) -> List[str]:
-        """
-        Valide l'intégrité du schéma Data Vault.
+    # Vérifier Hubs
+    if _has_duplicate(map(_get_hub_key, schema.hubs)):
+        errors.append("ERREUR: Clés Hub en double détectées")
 
-        Args:
-            schema: Schéma à valider
+    # Vérifier Links
+    if _has_duplicate(map(_get_link_key, schema.links)):
+        errors.append("ERREUR: Clés Link en double détectées")
 
-        Returns:
-            Liste d'erreurs/warnings (vide si tout est valide)
-        """
-        errors = []
+    # Vérifier Satellites
+    if _has_duplicate(map(_get_satellite_key, schema.satellites)):
+        errors.append("ERREUR: Clés Satellite en double détectées")
 
-        # 1. Vérifier unicité des clés
-        errors.extend(self._check_key_uniqueness(schema))
+    return errors
 
-        # 2. Vérifier intégrité référentielle
-        errors.extend(self._check_referential_integrity(schema))
 
-        # 3. Vérifier scores de confiance
-        errors.extend(self._check_confidence_scores(schema))
+def _check_referential_integrity(schema: DataVaultSchema) -> List[str]:
+    """Vérifie l'intégrité référentielle."""
+    errors = []
 
-        # 4. Vérifier contraintes structurelles
-        errors.extend(self._check_structural_constraints(schema))
+    # Ensemble des clés hub valides
+    valid_hub_keys = schema.valid_hub_keys()
 
-        if errors:
-            print(f"⚠️  Validation: {len(errors)} problème(s) détecté(s)")
-            for error in errors:
-                print(f"   - {error}")
-        else:
-            print("✅ Schéma valide: toutes les vérifications passées")
+    # Vérifier que tous les Links référencent des Hubs existants
+    for link in schema.links:
+        if link.hub_source_key not in valid_hub_keys:
+            errors.append(f"WARNING: Link {link.link_key:.8}... "
+                        f"référence un Hub source invalide")
 
-        return errors
+        if link.hub_target_key not in valid_hub_keys:
+            errors.append(f"WARNING: Link {link.link_key:.8}... "
+                        f"référence un Hub target invalide")
 
-    def _check_key_uniqueness(self, schema: DataVaultSchema) -> List[str]:
-        """Vérifie l'unicité des clés."""
-        errors = []
+    # Vérifier que tous les Satellites référencent des Hubs existants
+    for satellite in schema.satellites:
+        if satellite.hub_key not in valid_hub_keys:
+            errors.append(f"WARNING: Satellite {satellite.satellite_key:.8}... "
+                        f"référence un Hub invalide")
 
-        # Vérifier Hubs
-        hub_keys = [h.hub_key for h in schema.hubs]
-        if len(hub_keys) != len(set(hub_keys)):
-            errors.append("ERREUR: Clés Hub en double détectées")
+    return errors
 
-        # Vérifier Links
-        link_keys = [l.link_key for l in schema.links]
-        if len(link_keys) != len(set(link_keys)):
-            errors.append("ERREUR: Clés Link en double détectées")
 
-        # Vérifier Satellites
-        satellite_keys = [s.satellite_key for s in schema.satellites]
-        if len(satellite_keys) != len(set(satellite_keys)):
-            errors.append("ERREUR: Clés Satellite en double détectées")
+def _check_confidence_scores(schema: DataVaultSchema) -> List[str]:
+    """Vérifie la validité des scores de confiance."""
+    errors = []
 
-        return errors
+    # Vérifier Hubs
+    for i in _invalid_confidence_indices(schema.hubs):
+        hub = schema.hubs[i]
+        errors.append(f"WARNING: Hub {hub.business_key} a un score invalide: {hub.confidence_score}")
 
-    def _check_referential_integrity(self, schema: DataVaultSchema) -> List[str]:
-        """Vérifie l'intégrité référentielle."""
-        errors = []
+    # Vérifier Links
+    for i in _invalid_confidence_indices(schema.links):
+        link = schema.links[i]
+        errors.append(f"WARNING: Link {link.link_key:.8}... a un score invalide: {link.confidence_score}")
 
-        # Créer un ensemble des clés hub valides
-        valid_hub_keys = {h.hub_key for h in schema.hubs}
+    # Vérifier Satellites
+    for i in _invalid_confidence_indices(schema.satellites):
+        satellite = schema.satellites[i]
+        errors.append(f"WARNING: Satellite {satellite.attribute_name} a un score invalide: {satellite.confidence_score}")
 
-        # Vérifier que tous les Links référencent des Hubs existants
-        for link in schema.links:
-            if link.hub_source_key not in valid_hub_keys:
-                errors.append(f"WARNING: Link {link.link_key[:8]}... "
-                            f"référence un Hub source invalide")
+    return errors
+
+
+def _check_structural_constraints(schema: DataVaultSchema) -> List[str]:
+    """
+    Vérifie les contraintes structurelles du schéma Data Vault.
+
+    Contraintes attendues avec la nouvelle logique:
+    - Au moins 1 Hub (la plante)
+    - Au maximum 2 Hubs (plante + maladie/ravageur)
+    - 0 ou 1 Link (relation plante-problème)
+    - Satellites >= 0 (attributs descriptifs)
+    """
+    errors = []
+
+    num_hubs = len(schema.hubs)
+    num_links = len(schema.links)
+    num_satellites = len(schema.satellites)
+
+    # Contrainte 1: Au moins 1 Hub requis
+    if num_hubs == 0:
+        errors.append("WARNING: Aucun Hub détecté. Au moins une plante devrait être identifiée.")
 
-            if link.hub_target_key not in valid_hub_keys:
-                errors.append(f"WARNING: Link {link.link_key[:8]}... "
-                            f"référence un Hub target invalide")
+    # Contrainte 2: Cohérence Link-Hub
+    # Un Link nécessite au moins 2 Hubs (source et target)
+    if num_links > 0 and num_hubs < 2:
+        errors.append(f"WARNING: {num_links} Link(s) détecté(s) mais seulement {num_hubs} Hub(s). "
+                    f"Un Link nécessite 2 Hubs.")
 
-        # Vérifier que tous les Satellites référencent des Hubs existants
-        for satellite in schema.satellites:
-            if satellite.hub_key not in valid_hub_keys:
-                errors.append(f"WARNING: Satellite {satellite.satellite_key[:8]}... "
-                            f"référence un Hub invalide")
+    # Contrainte 3: Maximum 1 Link entre 2 Hubs spécifiques
+    if num_links > 1:
+        pair_counts = Counter(map(_get_link_pair, schema.links))
+        if any(count > 1 for count in pair_counts.values()):
+            errors.append(f"WARNING: Links en double détectés entre les mêmes Hubs.")
 
-        return errors
+    return errors
 
-    def _check_confidence_scores(self, schema: DataVaultSchema) -> List[str]:
-        """Vérifie la validité des scores de confiance."""
-        errors = []
 
-        # Vérifier Hubs
+def merge_schemas(schemas: List[DataVaultSchema]) -> DataVaultSchema:
+    """
+    Fusionne plusieurs schémas Data Vault en un seul.
+
+    Args:
+        schemas: Liste de schémas à fusionner
+
+    Returns:
+        Schéma fusionné
+    """
+    # Dédupliquer par clé (dict ordonné : une seule recherche par élément)
+    merged_hubs_by_key: Dict[str, Hub] = {}
+    merged_links_by_key: Dict[str, Link] = {}
+
+    for schema in schemas:
+        # Fusionner Hubs
         for hub in schema.hubs:
-            if not 0 <= hub.confidence_score <= 1:
-                errors.append(f"WARNING: Hub {hub.business_key} a un score invalide: "
-                            f"{hub.confidence_score}")
+            merged_hubs_by_key.setdefault(hub.hub_key, hub)
 
-        # Vérifier Links
+        # Fusionner Links
         for link in schema.links:
-            if not 0 <= link.confidence_score <= 1:
-                errors.append(f"WARNING: Link {link.link_key[:8]}... a un score invalide: "
-                            f"{link.confidence_score}")
+            merged_links_by_key.setdefault(link.link_key, link)
 
-        # Vérifier Satellites
-        for satellite in schema.satellites:
-            if not 0 <= satellite.confidence_score <= 1:
-                errors.append(f"WARNING: Satellite {satellite.attribute_name} a un score invalide: "
-                            f"{satellite.confidence_score}")
+    merged_hubs = list(merged_hubs_by_key.values())
+    merged_links = list(merged_links_by_key.values())
+    # Fusionner Satellites (garder tous pour historique), liste construite en une fois
+    merged_satellites = list(chain.from_iterable(schema.satellites for schema in schemas))
 
-        return errors
+    # Créer métadonnées fusionnées
+    merged_metadata = {
+        "generated_at": datetime.now().isoformat(),
+        "merged_from": len(schemas),
+        "source_images": [s.metadata.get("source_image", "unknown") for s in schemas],
+        "generator_version": GENERATOR_VERSION
+    }
 
-    def _check_structural_constraints(self, schema: DataVaultSchema) -> List[str]:
-        """
-        Vérifie les contraintes structurelles du schéma Data Vault.
+    merged_schema = DataVaultSchema(
+        hubs=merged_hubs,
+        links=merged_links,
+        satellites=merged_satellites,
+        metadata=merged_metadata
+    )
 
-        Contraintes attendues avec la nouvelle logique:
-        - Au moins 1 Hub (la plante)
-        - Au maximum 2 Hubs (plante + maladie/ravageur)
-        - 0 ou 1 Link (relation plante-problème)
-        - Satellites >= 0 (attributs descriptifs)
-        """
-        errors = []
-
-        num_hubs = len(schema.hubs)
-        num_links = len(schema.links)
-        num_satellites = len(schema.satellites)
-
-        # Contrainte 1: Au moins 1 Hub requis
-        if num_hubs == 0:
-            errors.append("WARNING: Aucun Hub détecté. Au moins une plante devrait être identifiée.")
-
-        # Contrainte 2: Cohérence Link-Hub
-        # Un Link nécessite au moins 2 Hubs (source et target)
-        if num_links > 0 and num_hubs < 2:
-            errors.append(f"WARNING: {num_links} Link(s) détecté(s) mais seulement {num_hubs} Hub(s). "
-                        f"Un Link nécessite 2 Hubs.")
-
-        # Contrainte 3: Maximum 1 Link entre 2 Hubs spécifiques
-        if num_links > 1:
-            link_pairs = set()
-            for link in schema.links:
-                pair = (link.hub_source_key, link.hub_target_key)
-                if pair in link_pairs:
-                    errors.append(f"WARNING: Links en double détectés entre les mêmes Hubs.")
-                    break
-                link_pairs.add(pair)
-
-        return errors
-
-    def merge_schemas(self, schemas: List[DataVaultSchema]) -> DataVaultSchema:
-        """
-        Fusionne plusieurs schémas Data Vault en un seul.
+    print(f"🔗 {len(schemas)} schémas fusionnés: "
+          f"{len(merged_hubs)} Hubs, {len(merged_links)} Links, "
+          f"{len(merged_satellites)} Satellites")
 
-        Args:
-            schemas: Liste de schémas à fusionner
+    return merged_schema
 
-        Returns:
-            Schéma fusionné
-        """
-        merged_hubs = []
-        merged_links = []
-        merged_satellites = []
-
-        # Utiliser des sets pour dédupliquer par clé
-        seen_hub_keys = set()
-        seen_link_keys = set()
-        seen_satellite_keys = set()
-
-        for schema in schemas:
-            # Fusionner Hubs
-            for hub in schema.hubs:
-                if hub.hub_key not in seen_hub_keys:
-                    merged_hubs.append(hub)
-                    seen_hub_keys.add(hub.hub_key)
-
-            # Fusionner Links
-            for link in schema.links:
-                if link.link_key not in seen_link_keys:
-                    merged_links.append(link)
-                    seen_link_keys.add(link.link_key)
-
-            # Fusionner Satellites (garder tous pour historique)
-            for satellite in schema.satellites:
-                merged_satellites.append(satellite)
-                seen_satellite_keys.add(satellite.satellite_key)
-
-        # Créer métadonnées fusionnées
-        merged_metadata = {
-            "generated_at": datetime.now().isoformat(),
-            "merged_from": len(schemas),
-            "source_images": [s.metadata.get("source_image", "unknown") for s in schemas],
-            "generator_version": "1.0.0"
-        }
 
-        merged_schema = DataVaultSchema(
-            hubs=merged_hubs,
-            links=merged_links,
-            satellites=merged_satellites,
-            metadata=merged_metadata
-        )
+class DataVaultGenerator:
+    """
+    Générateur et validateur de schémas Data Vault.
 
-        print(f"🔗 {len(schemas)} schémas fusionnés: "
-              f"{len(merged_hubs)} Hubs, {len(merged_links)} Links, "
-              f"{len(merged_satellites)} Satellites")
+    Conservé pour compatibilité : les méthodes sont les fonctions du module
+    (sans état), qui peuvent aussi être importées directement.
+    """
+
+    def __init__(self):
+        """Initialise le générateur."""
+        pass
 
-        return merged_schema
+    generate_schema = staticmethod(generate_schema)
+    validate_schema = staticmethod(validate_schema)
+    merge_schemas = staticmethod(merge_schemas)
+    _check_key_uniqueness = staticmethod(_check_key_uniqueness)
+    _check_referential_integrity = staticmethod(_check_referential_integrity)
+    _check_confidence_scores = staticmethod(_check_confidence_scores)
+    _check_structural_constraints = staticmethod(_check_structural_constraints)
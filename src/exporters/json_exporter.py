@@ -4,11 +4,21 @@ Sérialise le schéma en format JSON structuré.
 """
 
 import json
+from collections.abc import Iterator
 from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Optional
 from datetime import datetime
 import numpy as np
 from src.datavault_generator import DataVaultSchema
 
+# Tentative d'importation d'orjson (sérialisation native, bien plus rapide que json)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
 
 class NumpyEncoder(json.JSONEncoder):
     """Encodeur JSON personnalisé pour gérer les types numpy."""
@@ -20,9 +30,141 @@ class NumpyEncoder(json.JSONEncoder):
             return float(obj)
         elif isinstance(obj, np.ndarray):
             return obj.tolist()
+        elif hasattr(obj, "to_dict"):
+            return obj.to_dict()
         return super().default(obj)
 
 
+def _orjson_default(obj):
+    """Convertit les types numpy et les objets Data Vault non gérés nativement par orjson."""
+    if isinstance(obj, np.integer):
+        return int(obj)
+    elif isinstance(obj, np.floating):
+        return float(obj)
+    elif isinstance(obj, np.ndarray):
+        return obj.tolist()
+    elif hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    raise TypeError(f"Type non sérialisable en JSON: {type(obj).__name__}")
+
+
+def _dumps_json(data: Any, indent: bool) -> bytes:
+    """
+    Sérialise une valeur en JSON UTF-8 (orjson si disponible, sinon json).
+
+    Args:
+        data: Données à sérialiser
+        indent: Indenter la sortie (2 espaces)
+
+    Returns:
+        Contenu JSON encodé en UTF-8
+    """
+    if ORJSON_AVAILABLE:
+        # Les dataclasses (Hub, Link, Satellite) passent par leur to_dict() (arrondis, dates ISO)
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATACLASS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_orjson_default, option=option)
+
+    return json.dumps(data, indent=2 if indent else None, ensure_ascii=False, cls=NumpyEncoder).encode('utf-8')
+
+
+def _schema_payload(schema: DataVaultSchema) -> dict:
+    """
+    Structure du schéma à sérialiser, sans matérialiser les listes de dictionnaires.
+
+    Les Hubs, Links et Satellites sont convertis un par un pendant la
+    sérialisation (même contenu que schema.to_dict()).
+
+    Args:
+        schema: Schéma Data Vault
+
+    Returns:
+        Dictionnaire {metadata, hubs, links, satellites}
+    """
+    return {
+        "metadata": schema.metadata,
+        "hubs": schema.hubs,
+        "links": schema.links,
+        "satellites": schema.satellites
+    }
+
+
+def _stream_json(data: dict, fp: BinaryIO, indent: bool):
+    """
+    Écrit un dictionnaire en JSON UTF-8 dans un fichier ouvert, clé par clé.
+
+    Les listes de premier niveau (Hubs, Links, Satellites) sont écrites élément
+    par élément : le JSON complet n'est jamais construit en mémoire. Elles
+    peuvent aussi être des itérateurs (générateurs), consommés au fil de
+    l'écriture. Le contenu produit est identique à celui de _dumps_json.
+
+    Args:
+        data: Données à sérialiser
+        fp: Fichier ouvert en écriture binaire
+        indent: Indenter la sortie (2 espaces)
+    """
+    # Séparateurs identiques à ceux de la sérialisation en un bloc
+    compact_stdlib = not indent and not ORJSON_AVAILABLE
+    key_sep = b": " if indent or compact_stdlib else b":"
+    item_sep = b", " if compact_stdlib else b","
+
+    fp.write(b"{")
+    for position, (key, value) in enumerate(data.items()):
+        if position:
+            fp.write(item_sep)
+        if indent:
+            fp.write(b"\n  ")
+        fp.write(_dumps_json(key, indent=False))
+        fp.write(key_sep)
+
+        if isinstance(value, (list, Iterator)):
+            fp.write(b"[")
+            written = False
+            for item in value:
+                if written:
+                    fp.write(item_sep)
+                if indent:
+                    # Les sauts de ligne ne sont que structurels (échappés dans les chaînes)
+                    fp.write(b"\n    " + _dumps_json(item, indent=True).replace(b"\n", b"\n    "))
+                else:
+                    fp.write(_dumps_json(item, indent=False))
+                written = True
+            if indent and written:
+                fp.write(b"\n  ")
+            fp.write(b"]")
+        elif indent:
+            fp.write(_dumps_json(value, indent=True).replace(b"\n", b"\n  "))
+        else:
+            fp.write(_dumps_json(value, indent=False))
+
+    if indent and data:
+        fp.write(b"\n")
+    fp.write(b"}")
+
+
+def _write_json(data: dict, output_path: Path, indent: bool):
+    """
+    Écrit un dictionnaire en JSON UTF-8, en flux.
+
+    Args:
+        data: Données à sérialiser
+        output_path: Chemin du fichier de sortie
+        indent: Indenter la sortie (2 espaces)
+    """
+    with open(output_path, 'wb', buffering=1024 * 1024) as fp:
+        _stream_json(data, fp, indent)
+
+
+def _export_metadata() -> dict:
+    """Métadonnées d'export ajoutées au JSON indenté."""
+    return {
+        "format": "json",
+        "exported_at": datetime.now().isoformat(),
+        "exporter_version": "1.0.0"
+    }
+
+
 class JSONExporter:
     """Exporteur JSON pour Data Vault."""
 
@@ -40,23 +182,70 @@ class JSONExporter:
         output_path = Path(output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
 
-        # Convertir le schéma en dictionnaire
-        schema_dict = schema.to_dict()
+        # Écrire le fichier JSON avec indentation (types numpy gérés), élément par élément
+        schema_dict = _schema_payload(schema)
+        schema_dict["export_metadata"] = _export_metadata()
+        _write_json(schema_dict, output_path, indent=True)
 
-        # Ajouter des métadonnées d'export
-        schema_dict["export_metadata"] = {
-            "format": "json",
-            "exported_at": datetime.now().isoformat(),
-            "exporter_version": "1.0.0"
-        }
+        print(f"📄 Export JSON réussi: {output_path}")
+        return str(output_path)
 
-        # Écrire le fichier JSON avec indentation et encodeur numpy
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(schema_dict, f, indent=2, ensure_ascii=False, cls=NumpyEncoder)
+    def stream_export(
+        self,
+        hubs: Iterable,
+        links: Iterable,
+        satellites: Iterable,
+        output_path: str,
+        metadata: Optional[dict] = None
+    ) -> str:
+        """
+        Exporte en JSON indenté des Hubs, Links et Satellites produits au fil de l'eau.
+
+        Les itérables (générateurs acceptés) sont consommés pendant l'écriture :
+        la mémoire utilisée ne dépend pas du nombre d'éléments. Même format que export().
+
+        Args:
+            hubs: Hubs à exporter
+            links: Links à exporter
+            satellites: Satellites à exporter
+            output_path: Chemin du fichier de sortie
+            metadata: Métadonnées du schéma
+
+        Returns:
+            Chemin du fichier créé
+        """
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+
+        _write_json({
+            "metadata": metadata or {},
+            "hubs": iter(hubs),
+            "links": iter(links),
+            "satellites": iter(satellites),
+            "export_metadata": _export_metadata()
+        }, output_path, indent=True)
 
         print(f"📄 Export JSON réussi: {output_path}")
         return str(output_path)
 
+    def serialize(self, schema: DataVaultSchema) -> bytes:
+        """
+        Sérialise le schéma en JSON indenté, sans écrire de fichier.
+
+        Args:
+            schema: Schéma Data Vault à sérialiser
+
+        Returns:
+            Contenu JSON encodé en UTF-8
+        """
+        # Structure du schéma (objets convertis à la volée par le sérialiseur)
+        schema_dict = _schema_payload(schema)
+
+        # Ajouter des métadonnées d'export
+        schema_dict["export_metadata"] = _export_metadata()
+
+        return _dumps_json(schema_dict, indent=True)
+
     def export_compact(self, schema: DataVaultSchema, output_path: str) -> str:
         """
         Exporte le schéma en format JSON compact (sans indentation).
@@ -71,10 +260,9 @@ class JSONExporter:
         output_path = Path(output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
 
-        schema_dict = schema.to_dict()
+        schema_dict = _schema_payload(schema)
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(schema_dict, f, ensure_ascii=False, cls=NumpyEncoder)
+        _write_json(schema_dict, output_path, indent=False)
 
         print(f"📄 Export JSON compact réussi: {output_path}")
         return str(output_path)
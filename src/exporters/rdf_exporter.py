@@ -3,11 +3,75 @@ Exporteur RDF/Turtle pour schémas Data Vault.
 Génère des triplets RDF à partir du schéma.
 """
 
+import io
+import math
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
+from typing import Dict, List, TextIO, Tuple
 from rdflib import Graph, Namespace, Literal, URIRef, RDF, RDFS, XSD
 from src.datavault_generator import DataVaultSchema
 
+# Échappements Turtle : caractères interdits dans une IRI <...> et dans une chaîne "..."
+_IRI_ESCAPES = {c: f"\\u{c:04X}" for c in (*range(0x21), *map(ord, '<>"{}|^`\\'))}
+_STRING_ESCAPES = {
+    **{c: f"\\u{c:04X}" for c in range(0x20)},
+    ord('\t'): '\\t', ord('\n'): '\\n', ord('\r'): '\\r',
+    ord('"'): '\\"', ord('\\'): '\\\\'
+}
+
+
+def _turtle_iri(value: str) -> str:
+    """IRI au format Turtle."""
+    return f"<{value.translate(_IRI_ESCAPES)}>"
+
+
+def _turtle_string(value: str) -> str:
+    """Chaîne littérale au format Turtle."""
+    return f'"{value.translate(_STRING_ESCAPES)}"'
+
+
+@lru_cache(maxsize=256, typed=True)
+def _turtle_float(value: float) -> str:
+    """Littéral xsd:float au format Turtle (même forme lexicale que rdflib : "1" pour un int)."""
+    if isinstance(value, int):
+        # Cache typé : 1 et 1.0 n'ont pas la même forme lexicale
+        return f'"{value!r}"^^xsd:float'
+    value = float(value)
+    if math.isnan(value):
+        lexical = "NaN"
+    elif math.isinf(value):
+        lexical = "INF" if value > 0 else "-INF"
+    else:
+        lexical = repr(value)
+    return f'"{lexical}"^^xsd:float'
+
+
+@lru_cache(maxsize=256)
+def _turtle_datetime(value: datetime) -> str:
+    """Littéral xsd:dateTime au format Turtle."""
+    return f'"{value.isoformat()}"^^xsd:dateTime'
+
+
+def _write_turtle_subject(out: TextIO, subject: str, rdf_type: str, predicates: List[Tuple[str, str]]) -> int:
+    """
+    Écrit un sujet et ses propriétés en un bloc Turtle.
+
+    Args:
+        out: Flux de sortie
+        subject: IRI du sujet (déjà au format Turtle)
+        rdf_type: Classe du sujet (nom préfixé)
+        predicates: Couples (prédicat préfixé, objet au format Turtle)
+
+    Returns:
+        Nombre de triplets écrits
+    """
+    out.write(f"{subject} a {rdf_type}")
+    for predicate, obj in predicates:
+        out.write(f" ;\n    {predicate} {obj}")
+    out.write(" .\n\n")
+    return len(predicates) + 1
+
 
 class RDFExporter:
     """Exporteur RDF/Turtle pour Data Vault."""
@@ -38,63 +102,219 @@ class RDFExporter:
         output_path = Path(output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
 
+        if format == "turtle":
+            # Turtle écrit directement depuis le schéma, sans graphe rdflib intermédiaire
+            with open(output_path, 'w', encoding='utf-8', newline='\n') as f:
+                num_triples = self._write_turtle(schema, f)
+        else:
+            g = self.build_graph(schema)
+
+            # Sérialiser le graphe
+            g.serialize(destination=str(output_path), format=format, encoding='utf-8')
+            num_triples = len(g)
+
+        print(f"🔗 Export RDF/{format} réussi: {output_path}")
+        print(f"   {num_triples} triplets générés")
+
+        return str(output_path)
+
+    def serialize(self, schema: DataVaultSchema, format: str = "turtle") -> bytes:
+        """
+        Sérialise le schéma en RDF, sans écrire de fichier.
+
+        Args:
+            schema: Schéma Data Vault à sérialiser
+            format: Format RDF ("turtle", "xml", "n3", "nt")
+
+        Returns:
+            Contenu RDF encodé en UTF-8
+        """
+        if format == "turtle":
+            return self.to_turtle(schema).encode('utf-8')
+        return self.build_graph(schema).serialize(format=format, encoding='utf-8')
+
+    def to_turtle(self, schema: DataVaultSchema) -> str:
+        """
+        Génère le Turtle du schéma directement, sans construire de graphe rdflib.
+
+        Mêmes triplets que build_graph ; seule la mise en forme diffère de la
+        sérialisation rdflib.
+
+        Args:
+            schema: Schéma Data Vault à convertir
+
+        Returns:
+            Document Turtle
+        """
+        buf = io.StringIO()
+        self._write_turtle(schema, buf)
+        return buf.getvalue()
+
+    def _write_turtle(self, schema: DataVaultSchema, out: TextIO) -> int:
+        """
+        Écrit le Turtle du schéma dans un flux texte, sujet par sujet.
+
+        Args:
+            schema: Schéma Data Vault à convertir
+            out: Flux de sortie (fichier ou io.StringIO)
+
+        Returns:
+            Nombre de triplets écrits
+        """
+        out.write(f"@prefix dv: {_turtle_iri(str(self.ns))} .\n"
+                  f"@prefix dvschema: {_turtle_iri(str(self.dv_ns))} .\n"
+                  f"@prefix xsd: {_turtle_iri(str(XSD))} .\n\n")
+
+        # IRI des Hubs formatées une seule fois, réutilisées par les Links et Satellites
+        hub_iris = {hub.hub_key: _turtle_iri(f"{self.base_uri}hub/{hub.hub_key}") for hub in schema.hubs}
+
+        def hub_iri(hub_key: str) -> str:
+            return hub_iris.get(hub_key) or _turtle_iri(f"{self.base_uri}hub/{hub_key}")
+
+        num_triples = 0
+        for hub in schema.hubs:
+            num_triples += _write_turtle_subject(out, hub_iris[hub.hub_key], "dvschema:Hub", [
+                ("dvschema:businessKey", _turtle_string(hub.business_key)),
+                ("dvschema:entityType", _turtle_string(hub.entity_type)),
+                ("dvschema:ontologyURI", _turtle_iri(hub.ontology_uri)),
+                ("dvschema:confidenceScore", _turtle_float(hub.confidence_score)),
+                ("dvschema:loadDate", _turtle_datetime(hub.load_date)),
+                ("dvschema:recordSource", _turtle_string(hub.record_source)),
+            ])
+
+        for link in schema.links:
+            num_triples += _write_turtle_subject(out, _turtle_iri(f"{self.base_uri}link/{link.link_key}"), "dvschema:Link", [
+                ("dvschema:relationType", _turtle_string(link.relation_type)),
+                ("dvschema:hubSource", hub_iri(link.hub_source_key)),
+                ("dvschema:hubTarget", hub_iri(link.hub_target_key)),
+                ("dvschema:confidenceScore", _turtle_float(link.confidence_score)),
+                ("dvschema:loadDate", _turtle_datetime(link.load_date)),
+                ("dvschema:recordSource", _turtle_string(link.record_source)),
+            ])
+
+        for satellite in schema.satellites:
+            sat_iri = _turtle_iri(f"{self.base_uri}satellite/{satellite.satellite_key}")
+            num_triples += _write_turtle_subject(out, sat_iri, "dvschema:Satellite", [
+                ("dvschema:hubKey", hub_iri(satellite.hub_key)),
+                ("dvschema:attributeName", _turtle_string(satellite.attribute_name)),
+                ("dvschema:attributeValue", _turtle_string(satellite.attribute_value)),
+                ("dvschema:confidenceScore", _turtle_float(satellite.confidence_score)),
+                ("dvschema:loadDate", _turtle_datetime(satellite.load_date)),
+                ("dvschema:recordSource", _turtle_string(satellite.record_source)),
+                ("dvschema:hashDiff", _turtle_string(satellite.hash_diff)),
+            ])
+
+        # Métadonnées du schéma
+        num_triples += _write_turtle_subject(out, _turtle_iri(f"{self.base_uri}schema"), "dvschema:DataVaultSchema", [
+            ("dvschema:exportedAt", _turtle_datetime(datetime.now())),
+            ("dvschema:totalHubs", str(len(schema.hubs))),
+            ("dvschema:totalLinks", str(len(schema.links))),
+            ("dvschema:totalSatellites", str(len(schema.satellites))),
+        ])
+
+        return num_triples
+
+    def build_graph(self, schema: DataVaultSchema) -> Graph:
+        """
+        Construit le graphe RDF du schéma.
+
+        Args:
+            schema: Schéma Data Vault à convertir
+
+        Returns:
+            Graphe rdflib
+        """
         # Créer le graphe RDF
         g = Graph()
         g.bind("dv", self.ns)
         g.bind("dvschema", self.dv_ns)
 
+        # URI des Hubs construites une seule fois, réutilisées par les Links et Satellites
+        hub_uris = {}
+        dv = self.dv_ns
+
+        # Littéraux de dates et de scores partagés : peu de valeurs distinctes par schéma
+        # (date de chargement commune à l'analyse, scores 1.0 des correspondances exactes)
+        date_literals: Dict[datetime, Literal] = {}
+        # (clé typée : 1 et 1.0 n'ont pas la même forme lexicale)
+        score_literals: Dict[Tuple[type, float], Literal] = {}
+
+        def date_literal(value: datetime) -> Literal:
+            literal = date_literals.get(value)
+            if literal is None:
+                literal = date_literals[value] = Literal(value.isoformat(), datatype=XSD.dateTime)
+            return literal
+
+        def score_literal(value: float) -> Literal:
+            key = (type(value), value)
+            literal = score_literals.get(key)
+            if literal is None:
+                literal = score_literals[key] = Literal(value, datatype=XSD.float)
+            return literal
+
+        # Triplets accumulés puis insérés en une fois (addN) plutôt que g.add un par un
+        quads = []
+
         # Ajouter les triplets pour les Hubs
         for hub in schema.hubs:
-            hub_uri = URIRef(self.ns[f"hub/{hub.hub_key}"])
+            hub_uri = hub_uris[hub.hub_key] = self._hub_uri(hub.hub_key)
 
-            g.add((hub_uri, RDF.type, self.dv_ns.Hub))
-            g.add((hub_uri, self.dv_ns.businessKey, Literal(hub.business_key)))
-            g.add((hub_uri, self.dv_ns.entityType, Literal(hub.entity_type)))
-            g.add((hub_uri, self.dv_ns.ontologyURI, URIRef(hub.ontology_uri)))
-            g.add((hub_uri, self.dv_ns.confidenceScore, Literal(hub.confidence_score, datatype=XSD.float)))
-            g.add((hub_uri, self.dv_ns.loadDate, Literal(hub.load_date.isoformat(), datatype=XSD.dateTime)))
-            g.add((hub_uri, self.dv_ns.recordSource, Literal(hub.record_source)))
+            quads.extend((
+                (hub_uri, RDF.type, dv.Hub, g),
+                (hub_uri, dv.businessKey, Literal(hub.business_key), g),
+                (hub_uri, dv.entityType, Literal(hub.entity_type), g),
+                (hub_uri, dv.ontologyURI, URIRef(hub.ontology_uri), g),
+                (hub_uri, dv.confidenceScore, score_literal(hub.confidence_score), g),
+                (hub_uri, dv.loadDate, date_literal(hub.load_date), g),
+                (hub_uri, dv.recordSource, Literal(hub.record_source), g),
+            ))
 
         # Ajouter les triplets pour les Links
         for link in schema.links:
             link_uri = URIRef(self.ns[f"link/{link.link_key}"])
-            source_uri = URIRef(self.ns[f"hub/{link.hub_source_key}"])
-            target_uri = URIRef(self.ns[f"hub/{link.hub_target_key}"])
+            source_uri = hub_uris.get(link.hub_source_key) or self._hub_uri(link.hub_source_key)
+            target_uri = hub_uris.get(link.hub_target_key) or self._hub_uri(link.hub_target_key)
 
-            g.add((link_uri, RDF.type, self.dv_ns.Link))
-            g.add((link_uri, self.dv_ns.relationType, Literal(link.relation_type)))
-            g.add((link_uri, self.dv_ns.hubSource, source_uri))
-            g.add((link_uri, self.dv_ns.hubTarget, target_uri))
-            g.add((link_uri, self.dv_ns.confidenceScore, Literal(link.confidence_score, datatype=XSD.float)))
-            g.add((link_uri, self.dv_ns.loadDate, Literal(link.load_date.isoformat(), datatype=XSD.dateTime)))
-            g.add((link_uri, self.dv_ns.recordSource, Literal(link.record_source)))
+            quads.extend((
+                (link_uri, RDF.type, dv.Link, g),
+                (link_uri, dv.relationType, Literal(link.relation_type), g),
+                (link_uri, dv.hubSource, source_uri, g),
+                (link_uri, dv.hubTarget, target_uri, g),
+                (link_uri, dv.confidenceScore, score_literal(link.confidence_score), g),
+                (link_uri, dv.loadDate, date_literal(link.load_date), g),
+                (link_uri, dv.recordSource, Literal(link.record_source), g),
+            ))
 
         # Ajouter les triplets pour les Satellites
         for satellite in schema.satellites:
             sat_uri = URIRef(self.ns[f"satellite/{satellite.satellite_key}"])
-            hub_uri = URIRef(self.ns[f"hub/{satellite.hub_key}"])
+            hub_uri = hub_uris.get(satellite.hub_key) or self._hub_uri(satellite.hub_key)
 
-            g.add((sat_uri, RDF.type, self.dv_ns.Satellite))
-            g.add((sat_uri, self.dv_ns.hubKey, hub_uri))
-            g.add((sat_uri, self.dv_ns.attributeName, Literal(satellite.attribute_name)))
-            g.add((sat_uri, self.dv_ns.attributeValue, Literal(satellite.attribute_value)))
-            g.add((sat_uri, self.dv_ns.confidenceScore, Literal(satellite.confidence_score, datatype=XSD.float)))
-            g.add((sat_uri, self.dv_ns.loadDate, Literal(satellite.load_date.isoformat(), datatype=XSD.dateTime)))
-            g.add((sat_uri, self.dv_ns.recordSource, Literal(satellite.record_source)))
-            g.add((sat_uri, self.dv_ns.hashDiff, Literal(satellite.hash_diff)))
+            quads.extend((
+                (sat_uri, RDF.type, dv.Satellite, g),
+                (sat_uri, dv.hubKey, hub_uri, g),
+                (sat_uri, dv.attributeName, Literal(satellite.attribute_name), g),
+                (sat_uri, dv.attributeValue, Literal(satellite.attribute_value), g),
+                (sat_uri, dv.confidenceScore, score_literal(satellite.confidence_score), g),
+                (sat_uri, dv.loadDate, date_literal(satellite.load_date), g),
+                (sat_uri, dv.recordSource, Literal(satellite.record_source), g),
+                (sat_uri, dv.hashDiff, Literal(satellite.hash_diff), g),
+            ))
 
         # Ajouter métadonnées du schéma
         schema_uri = URIRef(self.ns["schema"])
-        g.add((schema_uri, RDF.type, self.dv_ns.DataVaultSchema))
-        g.add((schema_uri, self.dv_ns.exportedAt, Literal(datetime.now().isoformat(), datatype=XSD.dateTime)))
-        g.add((schema_uri, self.dv_ns.totalHubs, Literal(len(schema.hubs), datatype=XSD.integer)))
-        g.add((schema_uri, self.dv_ns.totalLinks, Literal(len(schema.links), datatype=XSD.integer)))
-        g.add((schema_uri, self.dv_ns.totalSatellites, Literal(len(schema.satellites), datatype=XSD.integer)))
+        quads.extend((
+            (schema_uri, RDF.type, dv.DataVaultSchema, g),
+            (schema_uri, dv.exportedAt, Literal(datetime.now().isoformat(), datatype=XSD.dateTime), g),
+            (schema_uri, dv.totalHubs, Literal(len(schema.hubs), datatype=XSD.integer), g),
+            (schema_uri, dv.totalLinks, Literal(len(schema.links), datatype=XSD.integer), g),
+            (schema_uri, dv.totalSatellites, Literal(len(schema.satellites), datatype=XSD.integer), g),
+        ))
 
-        # Sérialiser le graphe
-        g.serialize(destination=str(output_path), format=format, encoding='utf-8')
+        g.addN(quads)
 
-        print(f"🔗 Export RDF/{format} réussi: {output_path}")
-        print(f"   {len(g)} triplets générés")
+        return g
 
-        return str(output_path)
+    def _hub_uri(self, hub_key: str) -> URIRef:
+        """Construit l'URI d'un Hub à partir de sa clé."""
+        return URIRef(self.ns[f"hub/{hub_key}"])
@@ -3,10 +3,15 @@ Exporteur SQL pour schémas Data Vault.
 Génère des scripts SQL (CREATE TABLE + INSERT) pour PostgreSQL.
 """
 
+import io
 from pathlib import Path
 from datetime import datetime
+from typing import Iterable, TextIO
 from src.datavault_generator import DataVaultSchema
 
+# Nombre max de lignes par INSERT multi-lignes (requêtes de taille raisonnable pour le serveur)
+_INSERT_BATCH_SIZE = 1000
+
 
 class SQLExporter:
     """Exporteur SQL pour Data Vault (dialecte PostgreSQL)."""
@@ -25,33 +30,69 @@ class SQLExporter:
         output_path = Path(output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
 
-        sql_statements = []
+        # Écrire le fichier SQL (sections écrites directement, sans script complet en mémoire)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            self._write_sql(schema, f)
+
+        print(f"💾 Export SQL réussi: {output_path}")
+        return str(output_path)
+
+    def serialize(self, schema: DataVaultSchema) -> bytes:
+        """
+        Sérialise le schéma en script SQL, sans écrire de fichier.
+
+        Args:
+            schema: Schéma Data Vault à sérialiser
+
+        Returns:
+            Script SQL encodé en UTF-8
+        """
+        return self.to_sql(schema).encode('utf-8')
+
+    def to_sql(self, schema: DataVaultSchema) -> str:
+        """
+        Génère le script SQL complet du schéma.
+
+        Args:
+            schema: Schéma Data Vault à convertir
 
+        Returns:
+            Script SQL (CREATE TABLE, INSERT, index)
+        """
+        buf = io.StringIO()
+        self._write_sql(schema, buf)
+        return buf.getvalue()
+
+    def _write_sql(self, schema: DataVaultSchema, out: TextIO):
+        """
+        Écrit le script SQL complet dans un flux texte, section par section.
+
+        Args:
+            schema: Schéma Data Vault à convertir
+            out: Flux de sortie (fichier ou io.StringIO)
+        """
         # En-tête
-        sql_statements.append(self._generate_header(schema))
+        out.write(self._generate_header(schema))
+        out.write("\n\n")
 
         # CREATE TABLE statements
-        sql_statements.append(self._generate_create_tables())
+        out.write(self._generate_create_tables())
+        out.write("\n\n")
 
         # INSERT statements pour Hubs
-        sql_statements.append(self._generate_hub_inserts(schema.hubs))
+        self._write_hub_inserts(out, schema.hubs)
+        out.write("\n\n")
 
         # INSERT statements pour Links
-        sql_statements.append(self._generate_link_inserts(schema.links))
+        self._write_link_inserts(out, schema.links)
+        out.write("\n\n")
 
         # INSERT statements pour Satellites
-        sql_statements.append(self._generate_satellite_inserts(schema.satellites))
+        self._write_satellite_inserts(out, schema.satellites)
+        out.write("\n\n")
 
         # Créer indexes
-        sql_statements.append(self._generate_indexes())
-
-        # Écrire le fichier SQL
-        sql_content = "\n\n".join(sql_statements)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(sql_content)
-
-        print(f"💾 Export SQL réussi: {output_path}")
-        return str(output_path)
+        out.write(self._generate_indexes())
 
     def _generate_header(self, schema: DataVaultSchema) -> str:
         """Génère l'en-tête SQL."""
@@ -107,63 +148,90 @@ CREATE TABLE IF NOT EXISTS dv_satellites (
     hash_diff VARCHAR(32) NOT NULL
 );"""
 
-    def _generate_hub_inserts(self, hubs) -> str:
-        """Génère les INSERT statements pour les Hubs."""
+    def _write_hub_inserts(self, out: TextIO, hubs):
+        """Écrit les INSERT multi-lignes pour les Hubs."""
         if not hubs:
-            return "-- No Hubs to insert"
-
-        statements = ["-- ============================================================",
-                     "-- INSERT HUBS",
-                     "-- ============================================================",
-                     ""]
-
-        for hub in hubs:
-            sql = f"""INSERT INTO dv_hubs (hub_key, business_key, entity_type, ontology_uri, confidence_score, load_date, record_source)
-VALUES ('{hub.hub_key}', '{self._escape_sql(hub.business_key)}', '{hub.entity_type}',
-        '{hub.ontology_uri}', {hub.confidence_score:.4f},
-        '{hub.load_date.isoformat()}', '{self._escape_sql(hub.record_source)}');"""
-            statements.append(sql)
-
-        return "\n".join(statements)
-
-    def _generate_link_inserts(self, links) -> str:
-        """Génère les INSERT statements pour les Links."""
+            out.write("-- No Hubs to insert")
+            return
+
+        rows = (
+            f"""    ('{hub.hub_key}', '{self._escape_sql(hub.business_key)}', '{self._escape_sql(hub.entity_type)}',
+     '{self._escape_sql(hub.ontology_uri)}', {hub.confidence_score:.4f},
+     '{hub.load_date.isoformat()}', '{self._escape_sql(hub.record_source)}')"""
+            for hub in hubs
+        )
+        self._write_multi_row_inserts(
+            out, "HUBS", "dv_hubs",
+            "hub_key, business_key, entity_type, ontology_uri, confidence_score, load_date, record_source",
+            rows
+        )
+
+    def _write_link_inserts(self, out: TextIO, links):
+        """Écrit les INSERT multi-lignes pour les Links."""
         if not links:
-            return "-- No Links to insert"
-
-        statements = ["-- ============================================================",
-                     "-- INSERT LINKS",
-                     "-- ============================================================",
-                     ""]
+            out.write("-- No Links to insert")
+            return
+
+        rows = (
+            f"""    ('{link.link_key}', '{link.hub_source_key}', '{link.hub_target_key}',
+     '{self._escape_sql(link.relation_type)}', {link.confidence_score:.4f},
+     '{link.load_date.isoformat()}', '{self._escape_sql(link.record_source)}')"""
+            for link in links
+        )
+        self._write_multi_row_inserts(
+            out, "LINKS", "dv_links",
+            "link_key, hub_source_key, hub_target_key, relation_type, confidence_score, load_date, record_source",
+            rows
+        )
+
+    def _write_satellite_inserts(self, out: TextIO, satellites):
+        """Écrit les INSERT multi-lignes pour les Satellites."""
+        if not satellites:
+            out.write("-- No Satellites to insert")
+            return
+
+        rows = (
+            f"""    ('{satellite.satellite_key}', '{satellite.hub_key}',
+     '{self._escape_sql(satellite.attribute_name)}', '{self._escape_sql(satellite.attribute_value)}',
+     {satellite.confidence_score:.4f}, '{satellite.load_date.isoformat()}',
+     '{self._escape_sql(satellite.record_source)}', '{satellite.hash_diff}')"""
+            for satellite in satellites
+        )
+        self._write_multi_row_inserts(
+            out, "SATELLITES", "dv_satellites",
+            "satellite_key, hub_key, attribute_name, attribute_value, confidence_score, load_date, record_source, hash_diff",
+            rows
+        )
 
-        for link in links:
-            sql = f"""INSERT INTO dv_links (link_key, hub_source_key, hub_target_key, relation_type, confidence_score, load_date, record_source)
-VALUES ('{link.link_key}', '{link.hub_source_key}', '{link.hub_target_key}',
-        '{self._escape_sql(link.relation_type)}', {link.confidence_score:.4f},
-        '{link.load_date.isoformat()}', '{self._escape_sql(link.record_source)}');"""
-            statements.append(sql)
+    @staticmethod
+    def _write_multi_row_inserts(out: TextIO, title: str, table: str, columns: str, rows: Iterable[str]):
+        """
+        Écrit des lignes VALUES en INSERT multi-lignes (un par lot de _INSERT_BATCH_SIZE).
 
-        return "\n".join(statements)
+        ON CONFLICT DO NOTHING : une clé en double (ex: deux Satellites créés dans la même
+        seconde) ignore la ligne seule au lieu de faire échouer tout le lot.
 
-    def _generate_satellite_inserts(self, satellites) -> str:
-        """Génère les INSERT statements pour les Satellites."""
-        if not satellites:
-            return "-- No Satellites to insert"
-
-        statements = ["-- ============================================================",
-                     "-- INSERT SATELLITES",
-                     "-- ============================================================",
-                     ""]
-
-        for satellite in satellites:
-            sql = f"""INSERT INTO dv_satellites (satellite_key, hub_key, attribute_name, attribute_value, confidence_score, load_date, record_source, hash_diff)
-VALUES ('{satellite.satellite_key}', '{satellite.hub_key}',
-        '{self._escape_sql(satellite.attribute_name)}', '{self._escape_sql(satellite.attribute_value)}',
-        {satellite.confidence_score:.4f}, '{satellite.load_date.isoformat()}',
-        '{self._escape_sql(satellite.record_source)}', '{satellite.hash_diff}');"""
-            statements.append(sql)
-
-        return "\n".join(statements)
+        Args:
+            out: Flux de sortie
+            title: Titre de la section (commentaire)
+            table: Table cible
+            columns: Liste des colonnes
+            rows: Tuples VALUES déjà formatés
+        """
+        out.write("-- ============================================================\n"
+                  f"-- INSERT {title}\n"
+                  "-- ============================================================\n")
+
+        for index, row in enumerate(rows):
+            if index % _INSERT_BATCH_SIZE == 0:
+                # Nouveau lot : fermer l'INSERT précédent
+                if index:
+                    out.write("\nON CONFLICT DO NOTHING;")
+                out.write(f"\nINSERT INTO {table} ({columns})\nVALUES\n")
+            else:
+                out.write(",\n")
+            out.write(row)
+        out.write("\nON CONFLICT DO NOTHING;")
 
     def _generate_indexes(self) -> str:
         """Génère les CREATE INDEX statements."""
@@ -0,0 +1,170 @@
+"""
+Cache mémoire des images envoyées au LLM.
+Une image est lue, hachée, réduite et encodée une seule fois ; le résultat est
+partagé entre les requêtes Gradio simultanées (threads d'un même processus).
+Taille bornée par MAX_IMAGE_CACHE_MB. L'empreinte seule (clé du cache de lemmes)
+se calcule sans réduction ni encodage : un succès du cache de lemmes n'en paie pas le coût.
+"""
+
+import base64
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Tuple
+from src.config import config
+
+# Tentative d'importation de Pillow (réduction des images avant envoi)
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    Image = None
+    PIL_AVAILABLE = False
+
+
+class ImageEntry(NamedTuple):
+    """Image prête à être envoyée au LLM."""
+    key: str        # Empreinte BLAKE2b (128 bits) du fichier d'origine
+    payload: str    # Image réduite encodée en base64
+
+
+# Entrées par (chemin absolu, date de modification, taille, taille max), ordre LRU
+_entries: "OrderedDict[Tuple[str, int, int, int], ImageEntry]" = OrderedDict()
+_total_bytes = 0
+_lock = threading.Lock()
+
+# Empreintes par (chemin absolu, date de modification, taille), ordre LRU
+_KEY_CACHE_SIZE = 4096
+_keys: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+
+# Taille des blocs lus pour calculer l'empreinte
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _remember_key(file_id: Tuple[str, int, int], key: str):
+    """Mémorise l'empreinte d'un fichier (appelée avec _lock tenu)."""
+    _keys[file_id] = key
+    _keys.move_to_end(file_id)
+    while len(_keys) > _KEY_CACHE_SIZE:
+        _keys.popitem(last=False)
+
+
+def content_key(image_path: str) -> str:
+    """
+    Retourne l'empreinte BLAKE2b (128 bits) du contenu d'une image.
+
+    Seuls les octets du fichier sont hachés (ni décodage, ni réduction, ni base64) ;
+    le résultat est mémorisé par (chemin, date de modification, taille).
+
+    Args:
+        image_path: Chemin vers l'image
+
+    Returns:
+        Empreinte en hexadécimal (identique à ImageEntry.key)
+    """
+    stat = os.stat(image_path)
+    file_id = (os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size)
+
+    with _lock:
+        key = _keys.get(file_id)
+        if key is not None:
+            _keys.move_to_end(file_id)
+            return key
+
+    digest = hashlib.blake2b(digest_size=16)
+    with open(image_path, 'rb') as img_file:
+        for chunk in iter(lambda: img_file.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    key = digest.hexdigest()
+
+    with _lock:
+        _remember_key(file_id, key)
+    return key
+
+
+def _downscale_image(image_bytes: bytes, max_edge: int) -> bytes:
+    """
+    Réduit une image pour que son plus grand côté ne dépasse pas max_edge.
+
+    LLaVA redimensionne de toute façon l'image à sa résolution d'entrée :
+    l'envoyer déjà réduite allège la requête sans changer le résultat.
+
+    Args:
+        image_bytes: Contenu du fichier image
+        max_edge: Taille max du plus grand côté en pixels (0 = pas de réduction)
+
+    Returns:
+        JPEG réduit (qualité 85), ou le contenu d'origine si déjà assez petit
+    """
+    if not PIL_AVAILABLE or max_edge <= 0:
+        return image_bytes
+
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            if max(img.size) <= max_edge:
+                return image_bytes
+            img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+            buffer = io.BytesIO()
+            img.save(buffer, format='JPEG', quality=85)
+            return buffer.getvalue()
+    except Exception as e:
+        print(f"⚠️  Réduction de l'image impossible, envoi de l'original: {e}")
+        return image_bytes
+
+
+def load(image_path: str) -> ImageEntry:
+    """
+    Retourne l'empreinte et l'image encodée (lue une seule fois, puis servie depuis la mémoire).
+
+    La date de modification et la taille font partie de la clé : une image
+    réécrite sur disque est relue au lieu de servir une version périmée.
+
+    Args:
+        image_path: Chemin vers l'image
+
+    Returns:
+        ImageEntry (empreinte du fichier d'origine, image réduite en base64)
+    """
+    global _total_bytes
+
+    stat = os.stat(image_path)
+    cache_key = (os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size, config.MAX_IMAGE_EDGE)
+
+    with _lock:
+        entry = _entries.get(cache_key)
+        if entry is not None:
+            _entries.move_to_end(cache_key)
+            return entry
+
+    with open(image_path, 'rb') as img_file:
+        image_bytes = img_file.read()
+    entry = ImageEntry(
+        key=hashlib.blake2b(image_bytes, digest_size=16).hexdigest(),
+        payload=base64.b64encode(_downscale_image(image_bytes, config.MAX_IMAGE_EDGE)).decode('ascii')
+    )
+
+    max_bytes = config.MAX_IMAGE_CACHE_MB * 1024 * 1024
+    with _lock:
+        _remember_key(cache_key[:3], entry.key)
+        if cache_key not in _entries:
+            _entries[cache_key] = entry
+            _total_bytes += len(entry.payload)
+        # Éviction des images les moins récemment utilisées
+        while _total_bytes > max_bytes and _entries:
+            _, evicted = _entries.popitem(last=False)
+            _total_bytes -= len(evicted.payload)
+
+    return entry
+
+
+def clear():
+    """Vide le cache d'images."""
+    global _total_bytes
+    with _lock:
+        _entries.clear()
+        _keys.clear()
+        _total_bytes = 0
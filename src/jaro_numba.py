@@ -0,0 +1,182 @@
+"""
+Noyau Jaro-Winkler compilé avec Numba (optionnel).
+Calcule en une passe la matrice de similarité lexicale lemmes × termes,
+avec les mêmes scores que jellyfish.jaro_winkler_similarity.
+"""
+
+from functools import lru_cache
+from typing import List, Tuple
+import numpy as np
+
+# Tentative d'importation de Numba (compilation JIT du noyau)
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    njit = None
+    HAVE_NUMBA = False
+
+
+def pack_strings(strings: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convertit une liste de chaînes en matrice de codes de caractères.
+
+    Args:
+        strings: Chaînes à convertir
+
+    Returns:
+        Tuple (codes uint32 de forme (n, longueur_max) complétés par des zéros, longueurs)
+    """
+    lens = np.fromiter((len(s) for s in strings), dtype=np.int64, count=len(strings))
+    width = int(lens.max()) if len(strings) else 0
+    codes = np.zeros((len(strings), max(width, 1)), dtype=np.uint32)
+    for i, s in enumerate(strings):
+        if s:
+            codes[i, :len(s)] = np.frombuffer(s.encode('utf-32-le'), dtype=np.uint32)
+    return codes, lens
+
+
+@lru_cache(maxsize=8)
+def _pack_terms(terms: Tuple[str, ...]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Tables de codes des termes (vocabulaire constant d'un appel à l'autre, avec cache LRU).
+
+    Args:
+        terms: Termes normalisés (tuple, pour être hachable)
+
+    Returns:
+        Tuple (codes, longueurs) comme pack_strings
+    """
+    return pack_strings(list(terms))
+
+
+if HAVE_NUMBA:
+
+    @njit(cache=True, nogil=True)
+    def _jaro_winkler_pair(a, la, b, lb, a_flags, b_flags):
+        """Jaro-Winkler de deux chaînes codées (même algorithme que jellyfish)."""
+        if la == 0 or lb == 0:
+            return 0.0
+
+        search_range = max(la, lb) // 2 - 1
+        if search_range < 0:
+            search_range = 0
+
+        for i in range(la):
+            a_flags[i] = False
+        for j in range(lb):
+            b_flags[j] = False
+
+        # Caractères communs dans la fenêtre de recherche
+        common = 0
+        for i in range(la):
+            low = max(0, i - search_range)
+            high = min(i + search_range, lb - 1)
+            for j in range(low, high + 1):
+                if not b_flags[j] and b[j] == a[i]:
+                    a_flags[i] = True
+                    b_flags[j] = True
+                    common += 1
+                    break
+
+        if common == 0:
+            return 0.0
+
+        # Transpositions
+        k = 0
+        transpositions = 0
+        for i in range(la):
+            if a_flags[i]:
+                j = k
+                while j < lb:
+                    if b_flags[j]:
+                        k = j + 1
+                        break
+                    j += 1
+                if a[i] != b[j]:
+                    transpositions += 1
+        transpositions //= 2
+
+        c = float(common)
+        weight = (c / la + c / lb + (c - transpositions) / c) / 3.0
+
+        # Bonus Winkler sur le préfixe commun (4 caractères max)
+        if weight > 0.7:
+            prefix_max = min(min(la, lb), 4)
+            prefix = 0
+            while prefix < prefix_max and a[prefix] == b[prefix]:
+                prefix += 1
+            if prefix:
+                weight += prefix * 0.1 * (1.0 - weight)
+
+        return weight
+
+    @njit(cache=True, nogil=True)
+    def _contains(a, la, b, lb):
+        """Indique si la chaîne codée b est une sous-chaîne de a."""
+        if lb > la:
+            return False
+        for start in range(la - lb + 1):
+            found = True
+            for k in range(lb):
+                if a[start + k] != b[k]:
+                    found = False
+                    break
+            if found:
+                return True
+        return False
+
+    # Pas de parallel=True : le noyau est appelé depuis plusieurs threads Gradio à la fois
+    # (déjà concurrents), et la couche workqueue de Numba interrompt le processus si deux
+    # threads entrent simultanément dans une région parallèle
+    @njit(cache=True, nogil=True)
+    def _jaro_winkler_matrix(a_codes, a_lens, b_codes, b_lens, with_bonus):
+        n = a_codes.shape[0]
+        m = b_codes.shape[0]
+        out = np.zeros((n, m), dtype=np.float64)
+        for i in range(n):
+            a = a_codes[i]
+            la = a_lens[i]
+            a_flags = np.zeros(a_codes.shape[1], dtype=np.bool_)
+            b_flags = np.zeros(b_codes.shape[1], dtype=np.bool_)
+            for j in range(m):
+                b = b_codes[j]
+                lb = b_lens[j]
+                score = _jaro_winkler_pair(a, la, b, lb, a_flags, b_flags)
+
+                if with_bonus and la > 0 and lb > 0:
+                    # Bonus pour préfixe commun (3 premiers caractères identiques)
+                    if la >= 3 and lb >= 3 and a[0] == b[0] and a[1] == b[1] and a[2] == b[2]:
+                        score = min(1.0, score * 1.1)
+                    # Bonus pour inclusion
+                    if _contains(b, lb, a, la) or _contains(a, la, b, lb):
+                        score = min(1.0, score * 1.15)
+
+                out[i, j] = score
+        return out
+
+
+def jaro_winkler_matrix(lemmas: List[str], terms: List[str], with_bonus: bool = False) -> np.ndarray:
+    """
+    Calcule la matrice Jaro-Winkler lemmes × termes (chaînes déjà normalisées).
+
+    Args:
+        lemmas: Chaînes lignes
+        terms: Chaînes colonnes
+        with_bonus: Appliquer les bonus préfixe/inclusion de la similarité lexicale
+
+    Returns:
+        Matrice (len(lemmas), len(terms)) de scores [0, 1]
+    """
+    if not HAVE_NUMBA:
+        raise RuntimeError("Numba n'est pas installé. Installation: pip install numba")
+
+    a_codes, a_lens = pack_strings(lemmas)
+    # Le vocabulaire ontologique est le même à chaque appel : codé une seule fois
+    b_codes, b_lens = _pack_terms(tuple(terms))
+    return _jaro_winkler_matrix(a_codes, a_lens, b_codes, b_lens, with_bonus)
+
+
+# Compilation anticipée à l'import (évite la latence JIT à la première requête)
+if HAVE_NUMBA:
+    jaro_winkler_matrix(["warm"], ["up"], with_bonus=True)
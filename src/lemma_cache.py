@@ -0,0 +1,195 @@
+"""
+Cache disque des lemmes extraits par le LLM.
+Évite de relancer l'inférence LLaVA sur une image déjà analysée avec le même modèle
+(cas fréquent lors de l'ajustement des seuils dans l'interface).
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, List, Optional
+from src.config import config
+from src import image_store
+
+# Verrou protégeant l'éviction et le compteur de taille (les handlers Gradio s'exécutent dans des threads)
+_eviction_lock = threading.Lock()
+# Taille estimée du cache (octets) ; None tant que le répertoire n'a pas été parcouru.
+# Le parcours complet n'a lieu qu'au premier put puis quand l'estimation dépasse MAX_CACHE_MB.
+_estimated_bytes: Optional[int] = None
+# Une éviction ramène le cache à cette fraction de MAX_CACHE_MB : les écritures suivantes
+# ne déclenchent pas un nouveau parcours à chaque put une fois la limite atteinte
+_EVICTION_TARGET_RATIO = 0.9
+
+
+def image_key(image_path: str) -> str:
+    """
+    Calcule l'empreinte du contenu d'une image.
+
+    Hachage des octets bruts du fichier : l'image n'est réduite et encodée
+    (image_store.load) que si l'extraction a lieu, c'est-à-dire en cas d'absence du cache.
+
+    Args:
+        image_path: Chemin vers l'image
+
+    Returns:
+        Empreinte BLAKE2b (128 bits) en hexadécimal
+    """
+    return image_store.content_key(image_path)
+
+
+def _entry_path(model: str, key: str, structured: bool) -> Path:
+    """Retourne le chemin du fichier de cache pour un modèle et une image."""
+    model_dir = re.sub(r'[^\w.-]', '_', model)
+    suffix = "_json" if structured else ""
+    return Path(config.CACHE_DIR) / "lemmas" / model_dir / f"{key}{suffix}.json"
+
+
+def get(model: str, image_path: str, structured: bool = False) -> Optional[List[str]]:
+    """
+    Retourne les lemmes en cache pour une image, ou None.
+
+    Args:
+        model: Nom du modèle LLM
+        image_path: Chemin vers l'image
+        structured: Mode sortie JSON utilisé pour l'extraction
+
+    Returns:
+        Liste de lemmes, ou None si absente du cache
+    """
+    path = _entry_path(model, image_key(image_path), structured)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            lemmas = json.load(f)
+        # Date d'accès pour l'éviction LRU
+        os.utime(path)
+        return lemmas
+    except (OSError, ValueError):
+        return None
+
+
+def put(model: str, image_path: str, lemmas: List[str], structured: bool = False):
+    """
+    Enregistre les lemmes extraits d'une image (écriture atomique).
+
+    Args:
+        model: Nom du modèle LLM
+        image_path: Chemin vers l'image
+        lemmas: Lemmes extraits
+        structured: Mode sortie JSON utilisé pour l'extraction
+    """
+    if not lemmas:
+        return
+
+    path = _entry_path(model, image_key(image_path), structured)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        data = json.dumps(lemmas, ensure_ascii=False).encode('utf-8')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️  Écriture du cache de lemmes impossible: {e}")
+        return
+
+    _record_write(len(data))
+
+
+def _record_write(size: int):
+    """
+    Ajoute une écriture à la taille estimée du cache et n'évince que si elle dépasse la limite.
+
+    Args:
+        size: Taille (octets) de l'entrée écrite
+    """
+    global _estimated_bytes
+    with _eviction_lock:
+        if _estimated_bytes is not None:
+            # Estimation haute : une entrée réécrite est comptée deux fois (parcours simplement avancé)
+            _estimated_bytes += size
+            if _estimated_bytes <= config.MAX_CACHE_MB * 1024 * 1024:
+                return
+        _estimated_bytes = _evict()
+
+
+def get_or_compute(
+    model: str,
+    image_path: str,
+    fn: Callable[[], List[str]],
+    structured: bool = False
+) -> List[str]:
+    """
+    Retourne les lemmes en cache, ou les calcule avec fn puis les enregistre.
+
+    Args:
+        model: Nom du modèle LLM
+        image_path: Chemin vers l'image
+        fn: Fonction d'extraction appelée en cas d'absence du cache
+        structured: Mode sortie JSON utilisé pour l'extraction
+
+    Returns:
+        Liste de lemmes
+    """
+    lemmas = get(model, image_path, structured)
+    if lemmas is not None:
+        print(f"♻️  Lemmes lus depuis le cache disque ({os.path.basename(image_path)})")
+        return lemmas
+
+    lemmas = fn()
+    put(model, image_path, lemmas, structured)
+    return lemmas
+
+
+def _evict() -> int:
+    """
+    Supprime les entrées les moins récemment utilisées au-delà de MAX_CACHE_MB,
+    jusqu'à redescendre à _EVICTION_TARGET_RATIO de la limite.
+
+    Appelée avec _eviction_lock tenu.
+
+    Returns:
+        Taille totale (octets) du cache après éviction
+    """
+    max_bytes = config.MAX_CACHE_MB * 1024 * 1024
+    root = Path(config.CACHE_DIR) / "lemmas"
+
+    entries = []
+    total = 0
+    try:
+        model_dirs = [entry.path for entry in os.scandir(root) if entry.is_dir()]
+    except OSError:
+        return 0
+    for model_dir in model_dirs:
+        try:
+            with os.scandir(model_dir) as it:
+                for entry in it:
+                    if not entry.name.endswith(".json"):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        except OSError:
+            continue
+
+    if total <= max_bytes:
+        return total
+
+    # Les plus anciennes d'abord
+    target_bytes = max_bytes * _EVICTION_TARGET_RATIO
+    entries.sort()
+    for _, size, file_path in entries:
+        try:
+            os.remove(file_path)
+        except OSError:
+            continue
+        total -= size
+        if total <= target_bytes:
+            break
+
+    return total
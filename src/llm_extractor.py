@@ -3,11 +3,16 @@ Module d'extraction de lemmes via LLaVA (Ollama).
 Analyse les images de plantes et extrait des lemmes descriptifs.
 """
 
-import base64
+import asyncio
+import json
+import threading
+from concurrent.futures import Future
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, Iterator, List, Optional, Union
 import re
 from unidecode import unidecode
+from src.config import config
+from src import image_store
 
 try:
     import ollama
@@ -16,6 +21,41 @@ except ImportError:
     ollama = None
 
 
+# Images lues et encodées d'avance, en plus de celles en cours d'inférence (traitement par lot)
+_PREFETCH_IMAGES = 2
+
+# Lignes d'explication à ignorer dans une réponse texte (un seul scan, insensible à la casse)
+_EXPLANATION_RE = re.compile(r"exemple|règle|note|\*\*|--", re.IGNORECASE)
+
+# Motifs de _normalize_lemma (compilés une fois, hors de la boucle de parsing)
+_RE_STRIP = re.compile(r'[^\w\s_-]')
+_RE_UND = re.compile(r'_+')
+# Espaces et tirets remplacés par des underscores
+_SEPARATOR_TABLE = {ord(' '): '_', ord('-'): '_'}
+# Même suppression que _RE_STRIP pour une chaîne ASCII, fusionnée avec les séparateurs
+_ASCII_STRIP_TABLE = {
+    **{i: None for i in range(128) if _RE_STRIP.match(chr(i))},
+    **_SEPARATOR_TABLE
+}
+
+
+class ExtractionCancelled(Exception):
+    """Extraction abandonnée : le lot a été annulé avant l'envoi de la requête."""
+
+
+def _raise_if_cancelled(cancel_event: Optional[threading.Event]):
+    """Lève ExtractionCancelled si l'événement d'annulation est levé."""
+    if cancel_event is not None and cancel_event.is_set():
+        raise ExtractionCancelled("Extraction annulée")
+
+
+async def _close_async_client(client):
+    """Ferme les connexions HTTP d'un ollama.AsyncClient (méthode absente des anciennes versions)."""
+    close = getattr(client, 'close', None)
+    if close is not None:
+        await close()
+
+
 class LLMExtractor:
     """
     Extracteur de lemmes utilisant LLaVA via Ollama.
@@ -82,23 +122,136 @@ Ordre: plante, relation, probleme, symptomes, etat_foliaire, morphologie
 Lemmes:
 """
 
-    def __init__(self, ollama_url: str, model: str = "llava:13b"):
+    # Prompt du mode structuré : mêmes consignes, sortie JSON imposée par STRUCTURED_SCHEMA
+    STRUCTURED_PROMPT = EXTRACTION_PROMPT.split("=== FORMAT DE SORTIE ===")[0] + """=== FORMAT DE SORTIE ===
+Reponds UNIQUEMENT en JSON avec les champs: plante, relation, probleme, attributs (liste de lemmes).
+"""
+
+    # Schéma JSON transmis à Ollama (paramètre format) : la génération est contrainte
+    # par grammaire, la réponse est directement du JSON valide
+    STRUCTURED_SCHEMA = {
+        "type": "object",
+        "properties": {
+            "plante": {"type": "string", "enum": ["corn", "onion", "tomato"]},
+            "relation": {
+                "type": "string",
+                "enum": ["has_disease", "has_infestation", "has_health_status"]
+            },
+            "probleme": {"type": "string"},
+            "attributs": {"type": "array", "items": {"type": "string"}}
+        },
+        "required": ["plante", "relation", "probleme", "attributs"]
+    }
+
+    def __init__(self, ollama_url: str, model: str = "llava:13b", structured: bool = False):
         """
         Initialise l'extracteur LLM.
 
         Args:
             ollama_url: URL du serveur Ollama
             model: Nom du modèle à utiliser
+            structured: Demander une sortie JSON contrainte par STRUCTURED_SCHEMA
         """
         if ollama is None:
             raise ImportError("Le module ollama est requis. Installez-le avec: pip install ollama")
 
         self.ollama_url = ollama_url
         self.model = model
+        self.structured = structured
         self.client = ollama.Client(host=ollama_url)
 
+        # Paramètres de requête pré-construits par mode (seule l'image change d'un appel à l'autre).
+        # keep_alive garde le modèle chargé entre les images, et le préfixe de prompt
+        # identique permet à Ollama de réutiliser son cache KV.
+        self._request_templates = {}
+        for mode in (False, True):
+            template = {
+                'model': model,
+                'prompt': self.STRUCTURED_PROMPT if mode else self.EXTRACTION_PROMPT,
+                'options': {
+                    'temperature': 0.3,  # Faible pour plus de cohérence
+                    'top_p': 0.9,
+                },
+                'keep_alive': config.OLLAMA_KEEP_ALIVE,
+            }
+            if config.LLAVA_NUM_PREDICT > 0:
+                # Plafond optionnel : le prompt demande une analyse avant la ligne de lemmes,
+                # une valeur trop basse coupe la réponse avant la sortie
+                template['options']['num_predict'] = config.LLAVA_NUM_PREDICT
+            if mode:
+                template['format'] = self.STRUCTURED_SCHEMA
+            self._request_templates[mode] = template
+
         print(f"🤖 LLM Extractor initialisé: {model} @ {ollama_url}")
 
+    def close(self):
+        """Ferme la connexion HTTP persistante du client Ollama."""
+        close = getattr(self.client, 'close', None)
+        if close is not None:
+            close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def list_available_models(self) -> List[str]:
+        """
+        Liste les modèles installés sur le serveur Ollama.
+
+        Returns:
+            Noms des modèles disponibles
+
+        Raises:
+            Exception: Erreur de connexion au serveur Ollama
+        """
+        response = self.client.list()
+
+        # Le client Ollama retourne un objet ListResponse avec un attribut 'models'
+        if hasattr(response, 'models'):
+            models_list = response.models
+        elif isinstance(response, dict):
+            models_list = response.get('models', [])
+        else:
+            models_list = response
+
+        # Extraire les noms de modèles
+        available_models = []
+        for model in models_list:
+            if hasattr(model, 'model'):
+                # C'est un objet Model avec un attribut 'model'
+                available_models.append(model.model)
+            elif hasattr(model, 'name'):
+                available_models.append(model.name)
+            elif isinstance(model, dict):
+                model_name = model.get('model') or model.get('name') or model.get('id', '')
+                if model_name:
+                    available_models.append(model_name)
+            elif isinstance(model, str):
+                available_models.append(model)
+
+        return available_models
+
+    @staticmethod
+    def is_model_in(model: str, available_models: List[str]) -> bool:
+        """
+        Indique si un modèle figure parmi les modèles disponibles (avec ou sans tag).
+
+        Args:
+            model: Nom du modèle recherché
+            available_models: Noms retournés par list_available_models
+
+        Returns:
+            bool: True si le modèle est disponible
+        """
+        model_base = model.split(':')[0]
+        for available in available_models:
+            available_base = available.split(':')[0]
+            if model == available or model_base == available_base:
+                return True
+        return False
+
     def check_model_availability(self) -> bool:
         """
         Vérifie que le modèle LLaVA est disponible.
@@ -107,38 +260,12 @@ Lemmes:
             bool: True si le modèle est disponible
         """
         try:
-            response = self.client.list()
-
-            # Le client Ollama retourne un objet ListResponse avec un attribut 'models'
-            if hasattr(response, 'models'):
-                models_list = response.models
-            elif isinstance(response, dict):
-                models_list = response.get('models', [])
-            else:
-                models_list = response
-
-            # Extraire les noms de modèles
-            available_models = []
-            for model in models_list:
-                if hasattr(model, 'model'):
-                    # C'est un objet Model avec un attribut 'model'
-                    available_models.append(model.model)
-                elif hasattr(model, 'name'):
-                    available_models.append(model.name)
-                elif isinstance(model, dict):
-                    model_name = model.get('model') or model.get('name') or model.get('id', '')
-                    if model_name:
-                        available_models.append(model_name)
-                elif isinstance(model, str):
-                    available_models.append(model)
+            available_models = self.list_available_models()
 
             # Vérifier si le modèle est disponible (avec ou sans tag)
-            model_base = self.model.split(':')[0]
-            for available in available_models:
-                available_base = available.split(':')[0]
-                if self.model == available or model_base == available_base:
-                    print(f"✅ Modèle {self.model} disponible")
-                    return True
+            if self.is_model_in(self.model, available_models):
+                print(f"✅ Modèle {self.model} disponible")
+                return True
 
             print(f"⚠️  Modèle {self.model} non trouvé.")
             print(f"   Modèles disponibles: {', '.join(available_models)}")
@@ -151,49 +278,43 @@ Lemmes:
             traceback.print_exc()
             return False
 
-    def extract_lemmas(self, image_path: str, max_retries: int = 3) -> List[str]:
+    def extract_lemmas(
+        self,
+        image_path: str,
+        max_retries: int = 3,
+        structured: Optional[bool] = None
+    ) -> List[str]:
         """
         Extrait les lemmes descriptifs d'une image de plante.
 
         Args:
             image_path: Chemin vers l'image
             max_retries: Nombre maximum de tentatives
+            structured: Mode sortie JSON pour cet appel (défaut: valeur de l'instance)
 
         Returns:
             Liste de lemmes normalisés
         """
+        if structured is None:
+            structured = self.structured
         image_path = Path(image_path)
-
-        if not image_path.exists():
-            raise FileNotFoundError(f"Image introuvable: {image_path}")
-
-        # Encoder l'image en base64
-        try:
-            with open(image_path, 'rb') as img_file:
-                image_data = base64.b64encode(img_file.read()).decode('utf-8')
-        except Exception as e:
-            raise RuntimeError(f"Erreur lors de la lecture de l'image: {e}")
+        image_data = self._encode_image(image_path)
 
         # Tenter l'extraction avec retry
         for attempt in range(max_retries):
             try:
                 print(f"🔍 Analyse de {image_path.name}... (tentative {attempt + 1}/{max_retries})")
 
-                response = self.client.generate(
-                    model=self.model,
-                    prompt=self.EXTRACTION_PROMPT,
-                    images=[image_data],
-                    options={
-                        'temperature': 0.3,  # Faible pour plus de cohérence
-                        'top_p': 0.9,
-                    }
-                )
-
-                # Extraire le texte de la réponse
-                response_text = response.get('response', '')
+                # Réponse en streaming : fragments accumulés puis joints une seule fois
+                fragments = []
+                chunk = {}
+                for chunk in self.client.generate(stream=True, **self._generate_kwargs(image_data, structured)):
+                    fragments.append(chunk.get('response', ''))
+                response_text = ''.join(fragments)
+                self._warn_if_truncated(chunk)
 
                 # Parser et normaliser les lemmes
-                lemmas = self._parse_llava_response(response_text)
+                lemmas = self._parse_response(response_text, structured)
 
                 if lemmas:
                     print(f"✅ {len(lemmas)} lemmes extraits de {image_path.name}")
@@ -202,27 +323,198 @@ Lemmes:
                     print(f"⚠️  Aucun lemme extrait (tentative {attempt + 1})")
 
             except Exception as e:
-                error_msg = str(e)
                 print(f"❌ Erreur lors de l'extraction (tentative {attempt + 1}): {e}")
+                self._check_memory_error(e)
+
+                if attempt == max_retries - 1:
+                    raise
+
+        return []
+
+    async def extract_lemmas_async(
+        self,
+        image_path: str,
+        max_retries: int = 3,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        structured: Optional[bool] = None,
+        prefetch: Optional[asyncio.Semaphore] = None,
+        client=None,
+        cancel_event: Optional[threading.Event] = None
+    ) -> List[str]:
+        """
+        Version asynchrone de extract_lemmas (client ollama.AsyncClient).
+
+        La lecture et l'encodage de l'image se font dans un thread : pendant
+        l'inférence d'une image, les suivantes sont déjà chargées.
 
-                # Détecter erreur de mémoire insuffisante
-                if "system memory" in error_msg.lower() and "available" in error_msg.lower():
-                    print(f"\n⚠️  MÉMOIRE INSUFFISANTE!")
-                    print(f"   Le modèle {self.model} nécessite plus de RAM que disponible.")
-                    print(f"   💡 Solutions:")
-                    print(f"      1. Sélectionnez 'llava:7b' dans l'interface (4-5 GB)")
-                    print(f"      2. Ou 'llama3.2-vision:latest' (7-8 GB)")
-                    print(f"      3. Ou augmentez la RAM Docker dans Docker Desktop\n")
-                    raise RuntimeError(
-                        f"Mémoire insuffisante pour {self.model}. "
-                        f"Veuillez sélectionner un modèle plus petit: llava:7b (4GB) ou llama3.2-vision (7-8GB)"
-                    )
+        Args:
+            image_path: Chemin vers l'image
+            max_retries: Nombre maximum de tentatives
+            semaphore: Sémaphore limitant le nombre de requêtes simultanées
+            structured: Mode sortie JSON pour cet appel (défaut: valeur de l'instance)
+            prefetch: Sémaphore limitant le nombre d'images chargées en mémoire à la fois
+            client: ollama.AsyncClient partagé (traitement par lot) ; sinon un client
+                est créé puis fermé pour cet appel
+            cancel_event: Événement d'annulation du lot, vérifié avant chaque requête
+
+        Returns:
+            Liste de lemmes normalisés
+        """
+        if prefetch is not None:
+            async with prefetch:
+                return await self.extract_lemmas_async(image_path, max_retries, semaphore, structured,
+                                                       client=client, cancel_event=cancel_event)
+
+        if client is None:
+            client = ollama.AsyncClient(host=self.ollama_url)
+            try:
+                return await self.extract_lemmas_async(image_path, max_retries, semaphore, structured,
+                                                       client=client, cancel_event=cancel_event)
+            finally:
+                await _close_async_client(client)
+
+        if structured is None:
+            structured = self.structured
+        image_path = Path(image_path)
+        image_data = await asyncio.to_thread(self._encode_image, image_path)
+
+        for attempt in range(max_retries):
+            try:
+                print(f"🔍 Analyse de {image_path.name}... (tentative {attempt + 1}/{max_retries})")
+
+                _raise_if_cancelled(cancel_event)
+                if semaphore is not None:
+                    async with semaphore:
+                        _raise_if_cancelled(cancel_event)
+                        response_text = await self._generate_streamed(client, image_data, structured)
+                else:
+                    response_text = await self._generate_streamed(client, image_data, structured)
+
+                lemmas = self._parse_response(response_text, structured)
+
+                if lemmas:
+                    print(f"✅ {len(lemmas)} lemmes extraits de {image_path.name}")
+                    return lemmas
+                else:
+                    print(f"⚠️  Aucun lemme extrait (tentative {attempt + 1})")
+
+            except ExtractionCancelled:
+                raise
+            except Exception as e:
+                print(f"❌ Erreur lors de l'extraction (tentative {attempt + 1}): {e}")
+                self._check_memory_error(e)
 
                 if attempt == max_retries - 1:
                     raise
 
         return []
 
+    async def _generate_streamed(self, client, image_data: str, structured: bool) -> str:
+        """
+        Appelle generate en streaming sur un client asynchrone.
+
+        Args:
+            client: Instance de ollama.AsyncClient
+            image_data: Image encodée en base64
+            structured: Mode sortie JSON
+
+        Returns:
+            Texte complet de la réponse
+        """
+        fragments = []
+        chunk = {}
+        async for chunk in await client.generate(stream=True, **self._generate_kwargs(image_data, structured)):
+            fragments.append(chunk.get('response', ''))
+        self._warn_if_truncated(chunk)
+        return ''.join(fragments)
+
+    @staticmethod
+    def _warn_if_truncated(last_chunk) -> None:
+        """Signale une réponse coupée par num_predict (la ligne de lemmes peut manquer)."""
+        if last_chunk.get('done_reason') == 'length':
+            print(f"⚠️  Réponse tronquée à {config.LLAVA_NUM_PREDICT} tokens (LLAVA_NUM_PREDICT) : "
+                  f"lemmes possiblement manquants")
+
+    def _encode_image(self, image_path: Path) -> str:
+        """
+        Lit une image, la réduit à MAX_IMAGE_EDGE et l'encode en base64 (via le cache image_store).
+
+        Args:
+            image_path: Chemin vers l'image
+
+        Returns:
+            Image encodée en base64
+        """
+        if not image_path.exists():
+            raise FileNotFoundError(f"Image introuvable: {image_path}")
+
+        try:
+            entry = image_store.load(str(image_path))
+            return entry.payload
+        except Exception as e:
+            raise RuntimeError(f"Erreur lors de la lecture de l'image: {e}")
+
+    def _generate_kwargs(self, image_data: str, structured: bool) -> dict:
+        """Construit les paramètres de la requête generate d'Ollama."""
+        return {**self._request_templates[bool(structured)], 'images': [image_data]}
+
+    def _check_memory_error(self, error: Exception):
+        """
+        Détecte une erreur de mémoire insuffisante d'Ollama et lève une erreur explicite.
+
+        Args:
+            error: Exception levée par le client Ollama
+        """
+        error_msg = str(error)
+        if "system memory" in error_msg.lower() and "available" in error_msg.lower():
+            print(f"\n⚠️  MÉMOIRE INSUFFISANTE!")
+            print(f"   Le modèle {self.model} nécessite plus de RAM que disponible.")
+            print(f"   💡 Solutions:")
+            print(f"      1. Sélectionnez 'llava:7b' dans l'interface (4-5 GB)")
+            print(f"      2. Ou 'llama3.2-vision:latest' (7-8 GB)")
+            print(f"      3. Ou augmentez la RAM Docker dans Docker Desktop\n")
+            raise RuntimeError(
+                f"Mémoire insuffisante pour {self.model}. "
+                f"Veuillez sélectionner un modèle plus petit: llava:7b (4GB) ou llama3.2-vision (7-8GB)"
+            )
+
+    def _parse_response(self, response: str, structured: bool) -> List[str]:
+        """
+        Parse la réponse selon le mode (JSON structuré ou liste de lemmes texte).
+
+        Args:
+            response: Texte de réponse brut
+            structured: Réponse attendue en JSON
+
+        Returns:
+            Liste de lemmes normalisés
+        """
+        if structured:
+            lemmas = self._parse_structured_response(response)
+            if lemmas:
+                return lemmas
+        return self._parse_llava_response(response)
+
+    def _parse_structured_response(self, response: str) -> List[str]:
+        """
+        Parse une réponse JSON conforme à STRUCTURED_SCHEMA.
+
+        Args:
+            response: Texte JSON brut
+
+        Returns:
+            Liste de lemmes normalisés (vide si la réponse n'est pas du JSON exploitable)
+        """
+        try:
+            data = json.loads(response)
+            raw_lemmas = [data.get('plante'), data.get('relation'), data.get('probleme')]
+            raw_lemmas.extend(data.get('attributs') or [])
+        except (ValueError, TypeError, AttributeError):
+            return []
+
+        normalized = (self._normalize_lemma(lemma) for lemma in raw_lemmas if isinstance(lemma, str))
+        return list(dict.fromkeys(lemma for lemma in normalized if len(lemma) > 1))
+
     def _parse_llava_response(self, response: str) -> List[str]:
         """
         Parse la réponse de LLaVA et extrait les lemmes.
@@ -246,43 +538,23 @@ Lemmes:
 
         # Supprimer les explications et garder uniquement les lemmes
         # Les lemmes peuvent être sur plusieurs lignes, on les récupère tous
-        lines = response.split('\n')
-
-        # Concaténer toutes les lignes qui contiennent des lemmes (séparés par des virgules)
-        lemmas_text = ""
-        for line in lines:
-            line = line.strip()
-            # Ignorer les lignes vides ou les lignes qui semblent être des explications
-            if line and ',' in line:
-                # Ajouter cette ligne aux lemmes
-                lemmas_text += line + ","
-            elif line and not any(keyword in line.lower() for keyword in ['exemple', 'règle', 'note', '**', '--']):
-                # Ligne sans virgule mais qui pourrait contenir des lemmes
-                lemmas_text += line + ","
-
-        # Si aucune ligne avec virgule trouvée, prendre toute la réponse
-        if not lemmas_text.strip():
-            lemmas_text = response
+        lines = (line.strip() for line in response.split('\n'))
+
+        # Lignes de lemmes : avec virgules, ou sans virgule mais pas une explication
+        # (lignes vides ignorées ; liste jointe en une fois plutôt que concaténée)
+        kept = [line for line in lines if line and (',' in line or not _EXPLANATION_RE.search(line))]
+
+        # Si aucune ligne retenue, prendre toute la réponse
+        lemmas_text = ','.join(kept) if kept else response
 
         # Diviser par virgules
         raw_lemmas = [l.strip() for l in lemmas_text.split(',')]
 
-        # Normaliser chaque lemme
-        lemmas = []
-        for lemma in raw_lemmas:
-            normalized = self._normalize_lemma(lemma)
-            if normalized and len(normalized) > 1:  # Ignorer les lemmes trop courts
-                lemmas.append(normalized)
+        # Normaliser chaque lemme (les lemmes trop courts sont ignorés)
+        normalized = map(self._normalize_lemma, raw_lemmas)
 
-        # Dédupliquer en préservant l'ordre
-        seen = set()
-        unique_lemmas = []
-        for lemma in lemmas:
-            if lemma not in seen:
-                seen.add(lemma)
-                unique_lemmas.append(lemma)
-
-        return unique_lemmas
+        # Dédupliquer en préservant l'ordre (dict : ordre d'insertion conservé)
+        return list(dict.fromkeys(lemma for lemma in normalized if len(lemma) > 1))
 
     @staticmethod
     def _normalize_lemma(lemma: str) -> str:
@@ -295,46 +567,175 @@ Lemmes:
         Returns:
             Lemme normalisé
         """
-        # Retirer les caractères spéciaux (sauf underscores)
-        lemma = re.sub(r'[^\w\s_-]', '', lemma)
+        if lemma.isascii():
+            # Cas courant : caractères spéciaux retirés et séparateurs remplacés en une passe
+            lemma = lemma.translate(_ASCII_STRIP_TABLE).lower()
+        else:
+            # Retirer les caractères spéciaux (sauf underscores)
+            lemma = _RE_STRIP.sub('', lemma)
 
-        # Convertir en minuscules
-        lemma = lemma.lower()
+            # Convertir en minuscules
+            lemma = lemma.lower()
 
-        # Retirer les accents
-        lemma = unidecode(lemma)
+            # Retirer les accents (une chaîne devenue ASCII n'en a pas : unidecode inutile)
+            if not lemma.isascii():
+                lemma = unidecode(lemma)
 
-        # Remplacer espaces et tirets par underscores
-        lemma = lemma.replace(' ', '_')
-        lemma = lemma.replace('-', '_')
+            # Remplacer espaces et tirets par underscores
+            lemma = lemma.translate(_SEPARATOR_TABLE)
 
         # Supprimer les underscores multiples
-        lemma = re.sub(r'_+', '_', lemma)
+        if '__' in lemma:
+            lemma = _RE_UND.sub('_', lemma)
 
         # Retirer underscores en début/fin
         lemma = lemma.strip('_')
 
         return lemma
 
-    def batch_extract(self, image_paths: List[str]) -> dict:
+    async def batch_extract_async(
+        self,
+        image_paths: List[str],
+        max_concurrency: int = 4,
+        structured: Optional[bool] = None,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        on_result: Optional[Callable[[int, Union[List[str], Exception]], None]] = None,
+        cancel_event: Optional[threading.Event] = None
+    ) -> List[Union[List[str], Exception]]:
         """
-        Extrait les lemmes de plusieurs images.
+        Extrait les lemmes de plusieurs images en parallèle.
+
+        Les requêtes sont envoyées simultanément à Ollama, dans la limite de
+        max_concurrency (à aligner sur OLLAMA_NUM_PARALLEL côté serveur).
+        Les images suivantes (au plus _PREFETCH_IMAGES) sont lues et encodées
+        pendant l'inférence en cours.
 
         Args:
             image_paths: Liste de chemins d'images
+            max_concurrency: Nombre maximum de requêtes simultanées
+            structured: Mode sortie JSON pour ce lot (défaut: valeur de l'instance)
+            on_progress: Fonction appelée à chaque image terminée (succès ou erreur),
+                avec (nombre d'images terminées, nombre total)
+            on_result: Fonction appelée à chaque image terminée, avec (indice dans
+                image_paths, lemmes extraits ou exception levée)
+            cancel_event: Événement d'annulation : une fois levé, les images restantes
+                ne sont plus envoyées à Ollama (ExtractionCancelled en résultat)
 
         Returns:
-            Dictionnaire {nom_image: liste_lemmes}
+            Liste alignée sur image_paths: lemmes extraits ou exception levée
         """
-        results = {}
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        prefetch = asyncio.Semaphore(max(1, max_concurrency) + _PREFETCH_IMAGES)
+        total = len(image_paths)
+        done = 0
+
+        async def extract_one(index: int, path: str) -> Union[List[str], Exception]:
+            nonlocal done
+            try:
+                outcome = await self.extract_lemmas_async(path, semaphore=semaphore, structured=structured,
+                                                          prefetch=prefetch, client=client,
+                                                          cancel_event=cancel_event)
+            except Exception as e:
+                # Exception renvoyée comme résultat (même contrat que return_exceptions=True)
+                outcome = e
+
+            # Compteur partagé sans verrou : les tâches tournent dans la même boucle
+            done += 1
+            if on_progress is not None:
+                on_progress(done, total)
+            if on_result is not None:
+                on_result(index, outcome)
+            return outcome
+
+        # Un seul client (pool de connexions HTTP) pour tout le lot
+        client = ollama.AsyncClient(host=self.ollama_url)
+        try:
+            return await asyncio.gather(
+                *(extract_one(index, path) for index, path in enumerate(image_paths)),
+                return_exceptions=True
+            )
+        finally:
+            await _close_async_client(client)
+
+    def iter_batch_extract(
+        self,
+        image_paths: List[str],
+        max_concurrency: int = 4,
+        structured: Optional[bool] = None
+    ) -> Iterator[Union[List[str], Exception]]:
+        """
+        Extrait les lemmes de plusieurs images et les renvoie au fur et à mesure, dans l'ordre.
+
+        Pipeline en deux étages : les requêtes à Ollama tournent dans un thread
+        d'arrière-plan (batch_extract_async) pendant que l'appelant traite les
+        images déjà extraites (classification, génération des schémas).
 
-        for i, image_path in enumerate(image_paths, 1):
-            print(f"\n📸 Image {i}/{len(image_paths)}")
+        Args:
+            image_paths: Liste de chemins d'images
+            max_concurrency: Nombre maximum de requêtes simultanées
+            structured: Mode sortie JSON pour ce lot (défaut: valeur de l'instance)
+
+        Yields:
+            Lemmes extraits ou exception levée, dans l'ordre de image_paths
+        """
+        # Un Future par image, résolu dès que son extraction se termine
+        futures: List[Future] = [Future() for _ in image_paths]
+        # Levé quand l'appelant abandonne le générateur (bouton Stop, client déconnecté)
+        cancelled = threading.Event()
+
+        def on_result(index: int, outcome: Union[List[str], Exception]):
+            futures[index].set_result(outcome)
+
+        def run_batch():
+            error: Exception = ExtractionCancelled("Extraction interrompue")
             try:
-                lemmas = self.extract_lemmas(image_path)
-                results[Path(image_path).name] = lemmas
+                asyncio.run(self.batch_extract_async(image_paths, max_concurrency, structured,
+                                                     on_result=on_result, cancel_event=cancelled))
             except Exception as e:
-                print(f"❌ Erreur pour {image_path}: {e}")
+                # Échec global du lot (client Ollama indisponible...) : chaque image reçoit l'erreur
+                error = e
+            finally:
+                # Aucun Future ne doit rester en attente, même sur BaseException
+                for future in futures:
+                    if not future.done():
+                        future.set_result(error)
+
+        threading.Thread(target=run_batch, name="llm-batch-extract", daemon=True).start()
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            cancelled.set()
+
+    def batch_extract(
+        self,
+        image_paths: List[str],
+        max_concurrency: int = 4,
+        structured: Optional[bool] = None
+    ) -> dict:
+        """
+        Extrait les lemmes de plusieurs images.
+
+        Args:
+            image_paths: Liste de chemins d'images
+            max_concurrency: Nombre maximum de requêtes simultanées
+            structured: Mode sortie JSON pour ce lot (défaut: valeur de l'instance)
+
+        Returns:
+            Dictionnaire {nom_image: liste_lemmes}
+        """
+        print(f"\n📸 Analyse de {len(image_paths)} images ({max_concurrency} en parallèle)")
+        outcomes = asyncio.run(self.batch_extract_async(
+            image_paths, max_concurrency, structured,
+            on_progress=lambda done, total: print(f"   📊 {done}/{total} images analysées", flush=True)
+        ))
+
+        results = {}
+        for image_path, outcome in zip(image_paths, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"❌ Erreur pour {image_path}: {outcome}")
                 results[Path(image_path).name] = []
+            else:
+                results[Path(image_path).name] = outcome
 
         return results
@@ -66,6 +66,6 @@ class Link:
 
     def __repr__(self) -> str:
         """Représentation string du Link."""
-        return (f"Link({self.hub_source_key[:8]}... "
+        return (f"Link({self.hub_source_key:.8}... "
                 f"--[{self.relation_type}]--> "
-                f"{self.hub_target_key[:8]}...)")
+                f"{self.hub_target_key:.8}...)")
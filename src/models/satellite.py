@@ -82,4 +82,4 @@ class Satellite:
     def __repr__(self) -> str:
         """Représentation string du Satellite."""
         return (f"Satellite({self.attribute_name}='{self.attribute_value}', "
-                f"hub={self.hub_key[:8]}...)")
+                f"hub={self.hub_key:.8}...)")
@@ -4,16 +4,21 @@ Extrait les concepts, relations et attributs depuis le fichier TTL.
 """
 
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
+import hashlib
+import os
+import pickle
+import tempfile
 import rdflib
 from rdflib import Graph, Namespace, RDF, RDFS, OWL
 from unidecode import unidecode
+from src.config import config
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class OntologyConcept:
-    """Représente un concept (classe ou instance) de l'ontologie."""
+    """Représente un concept (classe ou instance) de l'ontologie (immuable, partagé entre requêtes)."""
     uri: str
     label: str
     label_normalized: str
@@ -26,7 +31,7 @@ class OntologyConcept:
     lemma: str = ""  # Lemme standardisé pour l'extraction
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class OntologyRelation:
     """Représente une relation (ObjectProperty) de l'ontologie."""
     uri: str
@@ -40,7 +45,7 @@ class OntologyRelation:
     lemma: str = ""
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class OntologyAttribute:
     """Représente un attribut (DatatypeProperty) de l'ontologie."""
     uri: str
@@ -85,8 +90,16 @@ class OntologyLoader:
             raise FileNotFoundError(f"Fichier ontologie introuvable: {self.ontology_path}")
 
         try:
-            self.graph.parse(self.ontology_path, format="turtle")
-            print(f"[OK] Ontologie chargee: {len(self.graph)} triplets")
+            # Signature relevée avant le parsing : un fichier modifié pendant celui-ci invalide le cache
+            signature = self._source_signature()
+            cached_graph = self._read_graph_cache(signature)
+            if cached_graph is not None:
+                self.graph = cached_graph
+                print(f"[OK] Ontologie chargee depuis le cache: {len(self.graph)} triplets")
+            else:
+                self.graph.parse(self.ontology_path, format="turtle")
+                print(f"[OK] Ontologie chargee: {len(self.graph)} triplets")
+                self._write_graph_cache(signature)
 
             # Déterminer le namespace principal (supporte # et /)
             for subj, pred, obj in self.graph:
@@ -105,6 +118,65 @@ class OntologyLoader:
         except Exception as e:
             raise RuntimeError(f"Erreur lors du chargement de l'ontologie: {e}")
 
+    def _graph_cache_path(self) -> Path:
+        """Retourne le chemin du graphe sérialisé (clé: chemin absolu du fichier TTL)."""
+        path_hash = hashlib.blake2b(str(self.ontology_path.resolve()).encode('utf-8'), digest_size=8).hexdigest()
+        return Path(config.CACHE_DIR) / "ontologies" / f"{self.ontology_path.stem}-{path_hash}.graph.pkl"
+
+    def _source_signature(self) -> Tuple[int, int]:
+        """Retourne la signature du fichier TTL: (st_mtime_ns, st_size)."""
+        stat = self.ontology_path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_graph_cache(self, signature: Tuple[int, int]) -> Optional[Graph]:
+        """
+        Charge le graphe depuis le cache pickle si sa signature correspond exactement au fichier TTL.
+
+        Le fichier de cache contient deux pickles : la signature du TTL source, puis le graphe
+        (le graphe n'est désérialisé que si la signature correspond).
+
+        Args:
+            signature: Signature actuelle du fichier TTL (_source_signature)
+
+        Returns:
+            Graphe RDF, ou None si le cache est absent, périmé ou illisible
+        """
+        cache_path = self._graph_cache_path()
+        try:
+            with open(cache_path, 'rb') as f:
+                if pickle.load(f) != signature:
+                    return None
+                graph = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+        return graph if isinstance(graph, Graph) else None
+
+    def _write_graph_cache(self, signature: Tuple[int, int]):
+        """
+        Enregistre le graphe parsé en pickle, précédé de la signature du TTL (écriture atomique).
+
+        Un échec n'empêche jamais le chargement : le cache est simplement ignoré.
+
+        Args:
+            signature: Signature du fichier TTL parsé (_source_signature)
+        """
+        cache_path = self._graph_cache_path()
+        tmp_path = None
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(signature, f, protocol=5)
+                pickle.dump(self.graph, f, protocol=5)
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            print(f"[WARN] Ecriture du cache d'ontologie impossible: {e}")
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+
     @staticmethod
     def _normalize_label(label: str) -> str:
         """
@@ -430,11 +502,19 @@ class OntologyLoader:
         relations = self.get_all_relations()
         attributes = self.get_all_attributes()
 
+        # Comptage des classes et individus en un seul parcours
+        n_classes = n_individuals = 0
+        for concept in concepts.values():
+            if concept.concept_type == "class":
+                n_classes += 1
+            elif concept.concept_type == "individual":
+                n_individuals += 1
+
         return {
             "total_triples": len(self.graph),
             "concepts": len(concepts),
-            "classes": len([c for c in concepts.values() if c.concept_type == "class"]),
-            "individuals": len([c for c in concepts.values() if c.concept_type == "individual"]),
+            "classes": n_classes,
+            "individuals": n_individuals,
             "relations": len(relations),
             "attributes": len(attributes)
         }
@@ -8,13 +8,65 @@ Ontologie O = (C, R, A) où:
 - A = ensemble des attributs avec labels
 """
 
-from typing import List, Tuple, Dict, Optional, Set
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, FrozenSet, List, Tuple, Dict, Optional, Set
+import numpy as np
 from src.ontology_loader import OntologyLoader, OntologyConcept, OntologyRelation, OntologyAttribute
 from src.similarity_calculator import SimilarityCalculator
 from src.models.hub import Hub
 from src.models.link import Link
 from src.models.satellite import Satellite
 
+# Meilleurs matchs d'un lemme inconnu: (hub, score_hub, satellite, score_satellite)
+LemmaMatch = Tuple[Optional[str], float, Optional[str], float]
+# Matrice de scores: {lemme inconnu: LemmaMatch}, indépendante des seuils
+ScoreMatrix = Dict[str, LemmaMatch]
+
+
+class _DegradedResult(Exception):
+    """Résultat calculé pendant un échec des embeddings : renvoyé sans être mis en cache."""
+
+    def __init__(self, result):
+        super().__init__()
+        self.result = result
+
+
+def _lru_cache_unless_degraded(fn: Callable, maxsize: int, failures: Callable[[], int]) -> Callable:
+    """
+    lru_cache qui ne mémorise pas les résultats calculés pendant un échec des embeddings.
+
+    lru_cache ne met pas en cache une exception : un résultat dégradé (scores
+    sémantiques de repli) est levé depuis la fonction cachée puis renvoyé à l'appelant.
+
+    Args:
+        fn: Fonction à mettre en cache
+        maxsize: Taille du cache LRU
+        failures: Compteur d'échecs des embeddings (comparé avant et après l'appel)
+
+    Returns:
+        Fonction cachée (avec cache_info et cache_clear)
+    """
+    def compute(*args):
+        before = failures()
+        result = fn(*args)
+        if failures() != before:
+            raise _DegradedResult(result)
+        return result
+
+    cached = lru_cache(maxsize=maxsize)(compute)
+
+    def call(*args):
+        try:
+            return cached(*args)
+        except _DegradedResult as degraded:
+            return degraded.result
+
+    call.cache_info = cached.cache_info
+    call.cache_clear = cached.cache_clear
+    return call
+
 
 class OntologyMatcher:
     """
@@ -27,55 +79,58 @@ class OntologyMatcher:
     - SATELLITE: Attributs descriptifs (symptomes, etat_foliaire, morphologie)
     """
 
-    # Vocabulaire contrôlé pour classification directe
-    PLANTES = {'corn', 'onion', 'tomato', 'mais', 'oignon', 'tomate'}
+    # Vocabulaire contrôlé pour classification directe (frozenset : constant, partagé entre instances)
+    PLANTES = frozenset({'corn', 'onion', 'tomato', 'mais', 'oignon', 'tomate'})
 
-    MALADIES = {
+    MALADIES = frozenset({
         'helminthosporiose', 'rouille', 'fusariose', 'curvulariose', 'striure', 'virose',
         'alternariose', 'mildiou', 'pourriture_blanche', 'bacteriose', 'bacterial_wilt',
         'virus_tylcv', 'stress_abiotique'
-    }
+    })
 
-    RAVAGEURS = {
+    RAVAGEURS = frozenset({
         'foreur_tige', 'chenille_legionnaire', 'puceron', 'cicadelle',
         'thrips', 'mouche_oignon', 'chenille', 'nematode',
         'aleurode', 'acarien', 'mineuse', 'noctuelle'
-    }
+    })
 
-    RELATIONS = {'has_disease', 'has_infestation', 'has_health_status'}
+    RELATIONS = frozenset({'has_disease', 'has_infestation', 'has_health_status'})
 
-    SYMPTOMES = {
+    SYMPTOMES = frozenset({
         'chlorose', 'necrose', 'fletrissement', 'tache', 'lesion', 'pourriture',
         'deformation', 'mosaique', 'galerie', 'perforation', 'miellat', 'striure',
         'galle', 'nanisme', 'toile', 'morsure'
-    }
+    })
 
-    ETAT_FOLIAIRE = {
+    ETAT_FOLIAIRE = frozenset({
         'saine', 'malade', 'fletrie', 'seche', 'tachetee', 'chlorotique', 'necrotique',
         'perforee', 'enroulee', 'turgescente', 'cassante', 'mourante', 'morte',
         'brulee', 'decoloree', 'rougie', 'tordue', 'froissee', 'tombante', 'dressee',
         'aplatie', 'ratatinee', 'dechiree', 'striee', 'marbree', 'poudreuse',
         'collante', 'fumagine', 'entoilee', 'minee', 'jeune', 'mature', 'senescente'
-    }
+    })
 
-    MORPHOLOGIE_COULEUR = {
+    MORPHOLOGIE_COULEUR = frozenset({
         'vert_fonce', 'vert_clair', 'vert_jaunatre', 'jaune', 'brun', 'vert_bleuatre',
         'vert_grisatre', 'vert', 'rouge', 'orange', 'noir', 'blanc'
-    }
+    })
 
-    MORPHOLOGIE_FORME = {
+    MORPHOLOGIE_FORME = frozenset({
         'lineaire_lanceolee', 'tubulaire_cylindrique', 'composee_imparipennee',
         'simple', 'composee', 'simple_tubulaire', 'ovale', 'lanceolee'
-    }
+    })
 
-    MORPHOLOGIE_TEXTURE = {
+    MORPHOLOGIE_TEXTURE = frozenset({
         'lisse', 'rugueuse', 'cireuse', 'creuse', 'pubescente', 'glanduleuse',
         'lisse_cireuse', 'legerement_rugueuse'
-    }
+    })
 
-    MORPHOLOGIE_NERVATION = {
+    MORPHOLOGIE_NERVATION = frozenset({
         'nervation_parallele', 'nervation_reticulee', 'parallele', 'reticulee'
-    }
+    })
+
+    # Types de satellites rattachés au hub maladie/ravageur (les autres vont au hub plante)
+    DISEASE_SAT_TYPES = frozenset({'symptome'})
 
     def __init__(
         self,
@@ -103,6 +158,15 @@ class OntologyMatcher:
         # Construire les ensembles combinés
         self._build_vocabulary_sets()
 
+        # Caches des scores (indépendants des seuils), sauf ceux calculés sans
+        # embeddings (échec transitoire d'Ollama) : matrices par ensemble de lemmes,
+        # meilleurs matchs par lemme inconnu (réutilisés d'une image à l'autre)
+        embedding_failures = lambda: self.similarity_calc.embedding_failures
+        self._compute_scores_cached = _lru_cache_unless_degraded(self._compute_scores, 32, embedding_failures)
+        self._match_unknown_lemma_cached = _lru_cache_unless_degraded(
+            self._match_unknown_lemma, 4096, embedding_failures
+        )
+
         print(f"[ONTO] Ontologie O = (C={len(self.C)}, R={len(self.R)}, A={len(self.A)})")
         print(f"   Seuils: θc={thresholds.get('entities', 0.75)}, θr={thresholds.get('relations', 0.70)}, θa={thresholds.get('attributes', 0.65)}")
         print(f"   Vocabulaire: Hubs={len(self.hub_vocabulary)}, Links={len(self.link_vocabulary)}, Satellites={len(self.satellite_vocabulary)}")
@@ -134,20 +198,20 @@ class OntologyMatcher:
         # Enrichir depuis l'ontologie (optionnel)
         self._enrich_from_ontology()
 
-        # Mapping pour type d'attribut satellite
-        self.satellite_type_map: Dict[str, str] = {}
-        for lemma in self.SYMPTOMES:
-            self.satellite_type_map[lemma] = 'symptome'
-        for lemma in self.ETAT_FOLIAIRE:
-            self.satellite_type_map[lemma] = 'etat_foliaire'
-        for lemma in self.MORPHOLOGIE_COULEUR:
-            self.satellite_type_map[lemma] = 'couleur'
-        for lemma in self.MORPHOLOGIE_FORME:
-            self.satellite_type_map[lemma] = 'forme'
-        for lemma in self.MORPHOLOGIE_TEXTURE:
-            self.satellite_type_map[lemma] = 'texture'
-        for lemma in self.MORPHOLOGIE_NERVATION:
-            self.satellite_type_map[lemma] = 'nervation'
+        # Mapping pour type d'attribut satellite et index de classification :
+        # parties statiques construites à l'import, complétées par les relations de l'ontologie
+        self.satellite_type_map: Dict[str, str] = dict(_STATIC_SATELLITE_TYPE_MAP)
+        self._lemma_index: Dict[str, Tuple[str, str]] = dict(_STATIC_LEMMA_INDEX)
+        for lemma in self.link_vocabulary - self.RELATIONS:
+            # Une relation enrichie ne prime que sur les satellites (priorité hub > link > satellite)
+            if self._lemma_index.get(lemma, ('unknown', None))[0] != 'hub':
+                self._lemma_index[lemma] = ('link', 'relation')
+
+        # Listes figées pour le matching par similarité (évite list(set) à chaque appel)
+        self._hub_terms: List[str] = list(self.hub_vocabulary)
+        self._satellite_terms: List[str] = list(self.satellite_vocabulary)
+        # Vocabulaire unique Hubs puis Satellites : un seul calcul de scores par lemme inconnu
+        self._match_terms: List[str] = self._hub_terms + self._satellite_terms
 
     def _enrich_from_ontology(self):
         """Enrichit le vocabulaire depuis l'ontologie."""
@@ -167,59 +231,16 @@ class OntologyMatcher:
         Returns:
             Tuple (categorie, sous_type) où catégorie est 'hub', 'link', 'satellite' ou 'unknown'
         """
-        lemma_lower = lemma.lower().strip()
-
-        # Vérifier si c'est une plante
-        if lemma_lower in self.PLANTES:
-            return ('hub', 'plante')
-
-        # Vérifier si c'est une maladie
-        if lemma_lower in self.MALADIES:
-            return ('hub', 'maladie')
-
-        # Vérifier si c'est un ravageur
-        if lemma_lower in self.RAVAGEURS:
-            return ('hub', 'ravageur')
-
-        # Vérifier si c'est une relation
-        if lemma_lower in self.RELATIONS or lemma_lower in self.link_vocabulary:
-            return ('link', 'relation')
-
-        # Vérifier si c'est un symptome
-        if lemma_lower in self.SYMPTOMES:
-            return ('satellite', 'symptome')
-
-        # Vérifier si c'est un état foliaire
-        if lemma_lower in self.ETAT_FOLIAIRE:
-            return ('satellite', 'etat_foliaire')
-
-        # Vérifier si c'est une couleur
-        if lemma_lower in self.MORPHOLOGIE_COULEUR:
-            return ('satellite', 'couleur')
+        return self._lemma_index.get(lemma.lower().strip(), ('unknown', None))
 
-        # Vérifier si c'est une forme
-        if lemma_lower in self.MORPHOLOGIE_FORME:
-            return ('satellite', 'forme')
-
-        # Vérifier si c'est une texture
-        if lemma_lower in self.MORPHOLOGIE_TEXTURE:
-            return ('satellite', 'texture')
-
-        # Vérifier si c'est une nervation
-        if lemma_lower in self.MORPHOLOGIE_NERVATION:
-            return ('satellite', 'nervation')
-
-        # Lemme non reconnu
-        return ('unknown', None)
-
-    def _find_best_match(self, lemma: str, vocabulary: Set[str], threshold: float) -> Tuple[Optional[str], float]:
+    def _find_best_match(self, lemma: str, vocabulary: List[str], threshold: float) -> Tuple[Optional[str], float]:
         """
         Trouve le meilleur match dans un vocabulaire par similarité.
         Utilise le calculateur de similarité optimisé avec batch processing.
 
         Args:
             lemma: Lemme à matcher
-            vocabulary: Ensemble de vocabulaire
+            vocabulary: Liste des termes du vocabulaire
             threshold: Seuil de similarité
 
         Returns:
@@ -231,14 +252,16 @@ class OntologyMatcher:
         # Utiliser la méthode optimisée du calculateur
         return self.similarity_calc.find_best_match(
             lemma.lower(),
-            list(vocabulary),
+            vocabulary,
             threshold
         )
 
     def classify_lemmas(
         self,
         lemmas: List[str],
-        image_source: str
+        image_source: str,
+        thresholds: Optional[Dict[str, float]] = None,
+        scores: Optional[ScoreMatrix] = None
     ) -> Tuple[List[Hub], List[Link], List[Satellite]]:
         """
         Classifie les lemmes en Hubs, Links et Satellites.
@@ -251,6 +274,8 @@ class OntologyMatcher:
         Args:
             lemmas: Liste des lemmes extraits par le LLM
             image_source: Source de l'image
+            thresholds: Seuils {θc, θr, θa} pour cet appel (défaut: seuils de l'instance)
+            scores: Matrice de scores déjà calculée par compute_scores (sinon calculée)
 
         Returns:
             Tuple (hubs_list, links_list, satellites_list)
@@ -267,9 +292,19 @@ class OntologyMatcher:
         probleme_hub = None
         relation_lemma = None
 
+        # Classification directe, puis matching par similarité des lemmes inconnus
+        # en parallèle (appels d'embeddings Ollama en mode semantic/hybrid)
+        classifications = [self._classify_lemma(lemma) for lemma in lemmas]
+        if scores is None:
+            # Classification déjà faite ci-dessus : pas de second passage par compute_scores
+            unknown = frozenset(
+                lemma for lemma, (category, _) in zip(lemmas, classifications) if category == 'unknown'
+            )
+            scores = self._compute_scores_cached(unknown)
+        unknown_matches = self.apply_thresholds(scores, thresholds)
+
         # Phase 1: Classification directe de chaque lemme
-        for lemma in lemmas:
-            category, sub_type = self._classify_lemma(lemma)
+        for lemma, (category, sub_type) in zip(lemmas, classifications):
 
             if category == 'hub':
                 if sub_type == 'plante':
@@ -307,7 +342,9 @@ class OntologyMatcher:
 
             else:
                 # Lemme non reconnu - tenter match par similarité
-                self._classify_unknown_lemma(lemma, hubs_list, satellites_list, image_source)
+                self._classify_unknown_lemma(
+                    lemma, hubs_list, satellites_list, image_source, unknown_matches.get(lemma), thresholds
+                )
 
         # Phase 2: Créer les Links entre Hubs
         if plante_hub and probleme_hub:
@@ -339,15 +376,13 @@ class OntologyMatcher:
         # Symptomes → hub maladie/ravageur (décrivent le problème)
         # Morphologie + état foliaire → hub plante (décrivent la plante)
         final_satellites: List[Satellite] = []
-        DISEASE_SAT_TYPES = {'symptome'}
-        PLANT_SAT_TYPES = {'etat_foliaire', 'couleur', 'forme', 'texture', 'nervation', 'description'}
 
         for sat_data in satellites_list:
             if isinstance(sat_data, tuple):
                 lemma, attr_type = sat_data
 
                 # Déterminer le hub parent selon le type d'attribut
-                if attr_type in DISEASE_SAT_TYPES and probleme_hub:
+                if attr_type in self.DISEASE_SAT_TYPES and probleme_hub:
                     parent_hub = probleme_hub
                 elif plante_hub:
                     parent_hub = plante_hub
@@ -369,21 +404,141 @@ class OntologyMatcher:
 
         return hubs_list, links_list, final_satellites
 
+    def compute_scores(self, lemmas: List[str]) -> ScoreMatrix:
+        """
+        Calcule les meilleurs matchs Hub et Satellite des lemmes non reconnus.
+
+        Les scores ne dépendent pas des seuils : un changement de seuils n'impose
+        que apply_thresholds. Résultat mis en cache par ensemble de lemmes.
+
+        Args:
+            lemmas: Liste des lemmes extraits par le LLM
+
+        Returns:
+            Matrice de scores {lemme inconnu: (hub, score_hub, satellite, score_satellite)}
+        """
+        unknown = frozenset(lemma for lemma in lemmas if self._classify_lemma(lemma)[0] == 'unknown')
+        return self._compute_scores_cached(unknown)
+
+    def _compute_scores(self, unknown: FrozenSet[str]) -> ScoreMatrix:
+        """
+        Calcule la matrice de scores d'un ensemble de lemmes inconnus (un seul calcul matriciel
+        si l'algorithme est vectorisé, sinon un lemme par thread).
+
+        Args:
+            unknown: Lemmes non reconnus
+
+        Returns:
+            Matrice de scores
+        """
+        unique_lemmas = sorted(unknown)
+        if len(unique_lemmas) < 2:
+            return {lemma: self._match_unknown_lemma_cached(lemma) for lemma in unique_lemmas}
+
+        # Algorithmes vectorisés : tous les lemmes contre tout le vocabulaire en un seul calcul
+        scores = self.similarity_calc.score_matrix([lemma.lower() for lemma in unique_lemmas], self._match_terms)
+        if scores is not None:
+            return {lemma: self._split_best_matches(row) for lemma, row in zip(unique_lemmas, scores)}
+
+        max_workers = min(len(unique_lemmas), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return dict(zip(unique_lemmas, executor.map(self._match_unknown_lemma_cached, unique_lemmas)))
+
+    def _match_unknown_lemma(self, lemma: str) -> LemmaMatch:
+        """
+        Cherche le meilleur terme Hub et le meilleur terme Satellite, sans seuil.
+
+        Args:
+            lemma: Lemme non reconnu
+
+        Returns:
+            Tuple (meilleur_hub, score_hub, meilleur_satellite, score_satellite)
+        """
+        scores = self.similarity_calc.score_all(lemma.lower(), self._match_terms)
+        if scores is None:
+            # Algorithme sans version vectorisée : un scan par vocabulaire
+            best_hub, hub_score = self._find_best_match(lemma, self._hub_terms, 0.0)
+            best_sat, sat_score = self._find_best_match(lemma, self._satellite_terms, 0.0)
+            return best_hub, hub_score, best_sat, sat_score
+
+        return self._split_best_matches(scores)
+
+    def _split_best_matches(self, scores: np.ndarray) -> LemmaMatch:
+        """
+        Meilleur terme Hub et meilleur terme Satellite d'un vecteur de scores sur _match_terms.
+
+        Args:
+            scores: Scores d'un lemme alignés sur _match_terms
+
+        Returns:
+            Tuple (meilleur_hub, score_hub, meilleur_satellite, score_satellite)
+        """
+        num_hub_terms = len(self._hub_terms)
+        best_hub, hub_score = _best_term(scores[:num_hub_terms], self._hub_terms)
+        best_sat, sat_score = _best_term(scores[num_hub_terms:], self._satellite_terms)
+        return best_hub, hub_score, best_sat, sat_score
+
+    def cache_info(self) -> Dict[str, tuple]:
+        """
+        Statistiques des caches de scores (diagnostic).
+
+        Returns:
+            Dictionnaire {nom du cache: CacheInfo(hits, misses, maxsize, currsize)}
+        """
+        return {
+            "scores": self._compute_scores_cached.cache_info(),
+            "lemmas": self._match_unknown_lemma_cached.cache_info()
+        }
+
+    def apply_thresholds(
+        self,
+        scores: ScoreMatrix,
+        thresholds: Optional[Dict[str, float]] = None
+    ) -> ScoreMatrix:
+        """
+        Applique les seuils à une matrice de scores.
+
+        Un lemme est rattaché au Hub si son score atteint θc, sinon au Satellite
+        si son score atteint θa (même ordre de priorité que le matching direct).
+
+        Args:
+            scores: Matrice de scores calculée par compute_scores
+            thresholds: Seuils {θc, θr, θa} (défaut: seuils de l'instance)
+
+        Returns:
+            Matrice filtrée: termes sous le seuil remplacés par (None, 0.0)
+        """
+        thresholds = thresholds if thresholds is not None else self.thresholds
+        theta_c = thresholds.get("entities", 0.75)
+        theta_a = thresholds.get("attributes", 0.65)
+
+        matches = {}
+        for lemma, (best_hub, hub_score, best_sat, sat_score) in scores.items():
+            if best_hub and hub_score >= theta_c:
+                matches[lemma] = (best_hub, hub_score, None, 0.0)
+            elif best_sat and sat_score >= theta_a:
+                matches[lemma] = (None, 0.0, best_sat, sat_score)
+            else:
+                matches[lemma] = (None, 0.0, None, 0.0)
+        return matches
+
     def _classify_unknown_lemma(
         self,
         lemma: str,
         hubs_list: List[Hub],
         satellites_list: List,
-        image_source: str
+        image_source: str,
+        match: Optional[LemmaMatch] = None,
+        thresholds: Optional[Dict[str, float]] = None
     ):
         """
         Tente de classifier un lemme non reconnu par similarité.
         """
-        theta_c = self.thresholds.get("entities", 0.75)
-        theta_a = self.thresholds.get("attributes", 0.65)
+        if match is None:
+            match = self.apply_thresholds({lemma: self._match_unknown_lemma_cached(lemma)}, thresholds)[lemma]
+        best_hub, hub_score, best_sat, sat_score = match
 
         # Essayer de matcher avec le vocabulaire Hub
-        best_hub, hub_score = self._find_best_match(lemma, self.hub_vocabulary, theta_c)
         if best_hub:
             # Déterminer le type
             if best_hub in self.PLANTES:
@@ -405,7 +560,6 @@ class OntologyMatcher:
             return
 
         # Essayer de matcher avec le vocabulaire Satellite
-        best_sat, sat_score = self._find_best_match(lemma, self.satellite_vocabulary, theta_a)
         if best_sat:
             attr_type = self.satellite_type_map.get(best_sat, 'attribut')
             satellites_list.append((lemma, attr_type))
@@ -417,3 +571,62 @@ class OntologyMatcher:
             satellites_list.append((lemma, 'description'))
             print(f"   SATELLITE (générique): {lemma}")
 
+
+def _best_term(scores: np.ndarray, terms: List[str]) -> Tuple[Optional[str], float]:
+    """
+    Premier meilleur terme d'un vecteur de scores (même règle que find_best_match, seuil 0).
+
+    Args:
+        scores: Scores alignés sur terms
+        terms: Termes du vocabulaire
+
+    Returns:
+        Tuple (meilleur_terme, score) ou (None, 0.0)
+    """
+    if not terms:
+        return None, 0.0
+    idx = int(np.argmax(scores))
+    score = float(scores[idx])
+    if score > 0.0:
+        return terms[idx], score
+    return None, 0.0
+
+
+def _build_static_indexes() -> Tuple[Dict[str, Tuple[str, str]], Dict[str, str]]:
+    """
+    Construit à l'import les index issus du vocabulaire contrôlé d'OntologyMatcher.
+
+    Returns:
+        Tuple (index lemme -> (catégorie, sous_type), mapping lemme -> type de satellite)
+    """
+    satellite_groups = (
+        (OntologyMatcher.SYMPTOMES, 'symptome'),
+        (OntologyMatcher.ETAT_FOLIAIRE, 'etat_foliaire'),
+        (OntologyMatcher.MORPHOLOGIE_COULEUR, 'couleur'),
+        (OntologyMatcher.MORPHOLOGIE_FORME, 'forme'),
+        (OntologyMatcher.MORPHOLOGIE_TEXTURE, 'texture'),
+        (OntologyMatcher.MORPHOLOGIE_NERVATION, 'nervation'),
+    )
+
+    # Index construit dans l'ordre de priorité (le premier vocabulaire qui contient le lemme l'emporte)
+    lemma_index: Dict[str, Tuple[str, str]] = {}
+    for vocabulary, classification in (
+        (OntologyMatcher.PLANTES, ('hub', 'plante')),
+        (OntologyMatcher.MALADIES, ('hub', 'maladie')),
+        (OntologyMatcher.RAVAGEURS, ('hub', 'ravageur')),
+        (OntologyMatcher.RELATIONS, ('link', 'relation')),
+        *((vocabulary, ('satellite', attr_type)) for vocabulary, attr_type in satellite_groups),
+    ):
+        for lemma in vocabulary:
+            lemma_index.setdefault(lemma, classification)
+
+    # Mapping satellite : le dernier groupe qui contient le lemme l'emporte
+    satellite_type_map: Dict[str, str] = {}
+    for vocabulary, attr_type in satellite_groups:
+        for lemma in vocabulary:
+            satellite_type_map[lemma] = attr_type
+
+    return lemma_index, satellite_type_map
+
+
+_STATIC_LEMMA_INDEX, _STATIC_SATELLITE_TYPE_MAP = _build_static_indexes()
@@ -0,0 +1,129 @@
+"""
+Stockage SQLite des schémas Data Vault du traitement par lot.
+Les schémas sont sérialisés sur disque au lieu de rester en mémoire : un lot de
+plusieurs milliers d'images ne sature pas la RAM et reste exportable après un
+redémarrage de l'application.
+"""
+
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterator, List, Mapping, Tuple
+from src.datavault_generator import DataVaultSchema
+
+
+class SchemaStore:
+    """
+    Dictionnaire {nom_image: DataVaultSchema} adossé à une table SQLite.
+
+    Les derniers schémas lus ou écrits sont gardés dans un cache mémoire LRU.
+    Utilisable depuis plusieurs threads (accès sérialisés par un verrou).
+    """
+
+    def __init__(self, db_path: str, cache_size: int = 32):
+        """
+        Ouvre (ou crée) la base de schémas.
+
+        Args:
+            db_path: Chemin du fichier SQLite
+            cache_size: Nombre de schémas gardés en mémoire
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.cache_size = cache_size
+
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, DataVaultSchema]" = OrderedDict()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS schemas ("
+            "name TEXT PRIMARY KEY, pickle BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _remember(self, name: str, schema: DataVaultSchema):
+        """Place un schéma en tête du cache mémoire (éviction LRU)."""
+        self._cache[name] = schema
+        self._cache.move_to_end(name)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def __setitem__(self, name: str, schema: DataVaultSchema):
+        self.update({name: schema})
+
+    def update(self, schemas: Mapping[str, DataVaultSchema]):
+        """
+        Enregistre plusieurs schémas en une seule transaction.
+
+        Args:
+            schemas: Dictionnaire {nom_image: schéma}
+        """
+        if not schemas:
+            return
+
+        now = time.time()
+        rows = [
+            (name, pickle.dumps(schema, protocol=pickle.HIGHEST_PROTOCOL), now)
+            for name, schema in schemas.items()
+        ]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO schemas (name, pickle, created_at) VALUES (?, ?, ?)",
+                    rows
+                )
+            for name, schema in schemas.items():
+                self._remember(name, schema)
+
+    def __getitem__(self, name: str) -> DataVaultSchema:
+        with self._lock:
+            schema = self._cache.get(name)
+            if schema is not None:
+                self._cache.move_to_end(name)
+                return schema
+
+            row = self._conn.execute("SELECT pickle FROM schemas WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                raise KeyError(name)
+            schema = pickle.loads(row[0])
+            self._remember(name, schema)
+            return schema
+
+    def __contains__(self, name: object) -> bool:
+        with self._lock:
+            if name in self._cache:
+                return True
+            return self._conn.execute("SELECT 1 FROM schemas WHERE name = ?", (name,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM schemas").fetchone()[0]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def keys(self) -> List[str]:
+        """Retourne les noms d'images, dans l'ordre d'insertion."""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT name FROM schemas ORDER BY rowid")]
+
+    def items(self) -> Iterator[Tuple[str, DataVaultSchema]]:
+        """Parcourt les schémas un par un (un seul schéma désérialisé à la fois)."""
+        for name in self.keys():
+            yield name, self[name]
+
+    def clear(self):
+        """Supprime tous les schémas."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM schemas")
+            self._cache.clear()
+
+    def close(self):
+        """Ferme la connexion SQLite."""
+        with self._lock:
+            self._conn.close()
@@ -4,30 +4,91 @@ Combine similarité lexicale (Jaro-Winkler) et sémantique (embeddings).
 Supporte l'accélération GPU via CuPy si disponible.
 """
 
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Set
+from bisect import bisect_right
 from collections import Counter
 from functools import lru_cache
+from pathlib import Path
+import hashlib
+import os
+import re
+import tempfile
 import numpy as np
 from unidecode import unidecode
 import jellyfish
 import requests
+from requests.adapters import HTTPAdapter
+from src.config import config
+from src.jaro_numba import HAVE_NUMBA, jaro_winkler_matrix
 
-# Tentative d'importation de CuPy pour l'accélération GPU
+
+# Tentative d'importation de RapidFuzz (Jaro-Winkler natif C++, scans en lot)
+try:
+    from rapidfuzz import fuzz as rf_fuzz, process as rf_process
+    from rapidfuzz.distance import JaroWinkler as RFJaroWinkler
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    rf_fuzz = None
+    rf_process = None
+    RFJaroWinkler = None
+    RAPIDFUZZ_AVAILABLE = False
+
+# Tentative d'importation de SimSIMD (cosinus int8 SIMD, optionnel via SIMILARITY_INT8)
 try:
-    import cupy as cp
-    GPU_AVAILABLE = True
+    import simsimd
+    SIMSIMD_AVAILABLE = True
 except ImportError:
-    cp = None
-    GPU_AVAILABLE = False
+    simsimd = None
+    SIMSIMD_AVAILABLE = False
+
+# Noyau Jaro-Winkler (mêmes scores que jellyfish, RapidFuzz étant plus rapide)
+_jaro_winkler = RFJaroWinkler.similarity if RAPIDFUZZ_AVAILABLE else jellyfish.jaro_winkler_similarity
+
+
+@lru_cache(maxsize=1)
+def _load_cupy():
+    """
+    Importe CuPy à la première demande d'accélération GPU.
+
+    L'import de CuPy (initialisation CUDA) est coûteux : il n'est plus payé
+    à l'import du module lorsque le GPU n'est pas utilisé.
+
+    Returns:
+        Module cupy, ou None s'il n'est pas installé
+    """
+    try:
+        import cupy
+        return cupy
+    except ImportError:
+        return None
+
+
+def __getattr__(name: str):
+    """Résout paresseusement GPU_AVAILABLE et cp (compatibilité avec les imports existants)."""
+    if name == "GPU_AVAILABLE":
+        return _load_cupy() is not None
+    if name == "cp":
+        return _load_cupy()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Table de normalisation : accents du vocabulaire (français) et séparateurs en un seul translate
+_FOLD_TABLE = str.maketrans({
+    **{accented: plain for plain, accents in (
+        ('a', 'àâäáãå'), ('c', 'ç'), ('e', 'éèêë'), ('i', 'îïíì'),
+        ('n', 'ñ'), ('o', 'ôöóòõ'), ('u', 'ùûüú'), ('y', 'ÿý')
+    ) for accented in accents},
+    'œ': 'oe', 'æ': 'ae', '_': ' ', '-': ' '
+})
 
 
 @lru_cache(maxsize=1024)
 def _normalize_cached(s: str) -> str:
-    """Normalise une chaîne avec cache LRU."""
-    s = s.lower()
-    s = unidecode(s)
-    s = s.replace('_', ' ').replace('-', ' ')
-    return ' '.join(s.split()).strip()
+    """Normalise une chaîne avec cache LRU (unidecode seulement pour les caractères hors table)."""
+    s = s.lower().translate(_FOLD_TABLE)
+    if not s.isascii():
+        s = unidecode(s).translate(_FOLD_TABLE)
+    return ' '.join(s.split())
 
 
 @lru_cache(maxsize=512)
@@ -37,6 +98,99 @@ def _get_ngrams_cached(text: str, n: int = 2) -> tuple:
     return tuple(padded[i:i+n] for i in range(len(padded) - n + 1))
 
 
+@lru_cache(maxsize=32)
+def _build_ngram_index(terms: tuple, n: int = 2) -> Dict[str, tuple]:
+    """
+    Construit un index inversé n-gram -> indices des termes (avec cache LRU).
+
+    Args:
+        terms: Termes ontologiques (tuple, pour être hachable)
+        n: Taille des n-grams
+
+    Returns:
+        Dictionnaire {n-gram: tuple d'indices dans terms}
+    """
+    index: Dict[str, list] = {}
+    for i, term in enumerate(terms):
+        for ngram in set(_get_ngrams_cached(_normalize_cached(term), n)):
+            index.setdefault(ngram, []).append(i)
+    return {ngram: tuple(ids) for ngram, ids in index.items()}
+
+
+@lru_cache(maxsize=8)
+def _build_bonus_index(term_norms: tuple) -> tuple:
+    """
+    Construit les index des bonus lexicaux (préfixe commun, inclusion) sur des termes normalisés.
+
+    Args:
+        term_norms: Termes déjà normalisés (tuple, pour être hachable)
+
+    Returns:
+        Tuple (préfixe de 3 caractères -> indices, terme -> indices, longueurs de
+        termes présentes, termes joints par \\x00, position de début de chaque terme)
+    """
+    by_prefix: Dict[str, list] = {}
+    by_term: Dict[str, list] = {}
+    for j, term in enumerate(term_norms):
+        if not term:
+            continue
+        by_term.setdefault(term, []).append(j)
+        if len(term) >= 3:
+            by_prefix.setdefault(term[:3], []).append(j)
+
+    starts = []
+    position = 0
+    for term in term_norms:
+        starts.append(position)
+        position += len(term) + 1
+
+    return (
+        {prefix: tuple(ids) for prefix, ids in by_prefix.items()},
+        {term: tuple(ids) for term, ids in by_term.items()},
+        sorted({len(term) for term in by_term}),
+        "\x00".join(term_norms),
+        starts
+    )
+
+
+def _inclusion_matches(lemma_norm: str, term_norms: tuple) -> Set[int]:
+    """
+    Indices des termes contenus dans le lemme ou qui le contiennent (s1 in s2 or s2 in s1).
+
+    Recherche en code natif (str.find sur les termes joints, dictionnaire des
+    sous-chaînes) au lieu d'un test par paire.
+
+    Args:
+        lemma_norm: Lemme normalisé (non vide)
+        term_norms: Termes normalisés
+
+    Returns:
+        Ensemble d'indices dans term_norms
+    """
+    _, by_term, term_lengths, joined, starts = _build_bonus_index(term_norms)
+    matches: Set[int] = set()
+
+    # Termes contenus dans le lemme : sous-chaînes du lemme de longueur existante
+    size = len(lemma_norm)
+    for length in term_lengths:
+        if length > size:
+            break
+        for start in range(size - length + 1):
+            ids = by_term.get(lemma_norm[start:start + length])
+            if ids:
+                matches.update(ids)
+
+    # Termes qui contiennent le lemme : occurrences dans la chaîne jointe
+    position = joined.find(lemma_norm)
+    while position != -1:
+        j = bisect_right(starts, position) - 1
+        if position + size <= starts[j] + len(term_norms[j]):
+            matches.add(j)
+        position = joined.find(lemma_norm, position + 1)
+
+    return matches
+
+
 class SimilarityCalculator:
     """
     Calculateur de similarité hybride (lexicale + sémantique).
@@ -56,32 +210,51 @@ class SimilarityCalculator:
         Args:
             embedding_model: Nom du modèle d'embeddings dans Ollama
             ollama_base_url: URL de base d'Ollama
-            algorithm: Algorithme à utiliser ("lexical", "semantic", "hybrid", "jaro_winkler", "cosine", "jaro_cosine")
+            algorithm: Algorithme à utiliser ("lexical", "semantic", "hybrid", "jaro_winkler", "cosine",
+                "jaro_cosine", "token_ratio")
             use_gpu: Utiliser le GPU si disponible (CuPy)
         """
         self.embedding_model_name = embedding_model
         self.ollama_base_url = ollama_base_url
-        self.embeddings_endpoint = f"{ollama_base_url}/api/embeddings"
+        # API batch d'Ollama : plusieurs textes encodés en une seule requête
+        self.embeddings_endpoint = f"{ollama_base_url}/api/embed"
         self.algorithm = algorithm
-        self.use_gpu = use_gpu and GPU_AVAILABLE
+        self._cp = _load_cupy() if use_gpu else None
+        self.use_gpu = self._cp is not None
+        # Cosinus sur embeddings quantifiés int8 (SimSIMD), sinon produit matriciel float32
+        self.use_int8 = config.SIMILARITY_INT8 and SIMSIMD_AVAILABLE
 
         print(f"[EMB] Modele d'embeddings Ollama: {embedding_model}")
         print(f"[ALG] Algorithme de similarite: {algorithm}")
 
         # Afficher le statut GPU
         if self.use_gpu:
-            gpu_info = cp.cuda.runtime.getDeviceProperties(0)
+            gpu_info = self._cp.cuda.runtime.getDeviceProperties(0)
             gpu_name = gpu_info['name'].decode('utf-8') if isinstance(gpu_info['name'], bytes) else gpu_info['name']
             print(f"[GPU] Acceleration GPU activee: {gpu_name}")
-        elif use_gpu and not GPU_AVAILABLE:
+        elif use_gpu:
             print("[GPU] CuPy non disponible - installation: pip install cupy-cuda12x")
             print("[CPU] Utilisation du CPU pour les calculs")
         else:
             print("[CPU] Utilisation du CPU pour les calculs")
 
+        if algorithm == "token_ratio" and not RAPIDFUZZ_AVAILABLE:
+            print("[!] RapidFuzz non disponible - token_ratio remplace par Jaro-Winkler (pip install rapidfuzz)")
+
+        if self.use_int8:
+            print("[INT8] Similarite semantique sur embeddings int8 (SimSIMD)")
+        elif config.SIMILARITY_INT8:
+            print("[INT8] SimSIMD non disponible - installation: pip install simsimd")
+
+        # Session HTTP persistante (keep-alive) partagée par tous les appels d'embeddings
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, config.OLLAMA_NUM_PARALLEL))
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
         # Vérifier la connexion à Ollama
         try:
-            response = requests.get(f"{ollama_base_url}/api/tags", timeout=5)
+            response = self._session.get(f"{ollama_base_url}/api/tags", timeout=5)
             if response.status_code == 200:
                 print("[OK] Connexion a Ollama reussie")
             else:
@@ -91,9 +264,16 @@ class SimilarityCalculator:
 
         # Cache pour les embeddings
         self._embedding_cache: Dict[str, np.ndarray] = {}
+        # Nombre d'appels d'embeddings en échec (les scores calculés entre-temps sont dégradés)
+        self.embedding_failures = 0
+
+        # Matrices d'embeddings normalisées des listes de termes ontologiques
+        self._term_matrix_cache: Dict[tuple, np.ndarray] = {}
+        # Mêmes matrices quantifiées en int8 (si use_int8)
+        self._term_matrix_int8_cache: Dict[tuple, np.ndarray] = {}
 
         # Cache GPU pour les embeddings (si GPU disponible)
-        self._gpu_embedding_cache: Dict[str, 'cp.ndarray'] = {} if self.use_gpu else {}
+        self._gpu_embedding_cache: Dict[str, Any] = {}
 
     def calculate_similarity(self, lemma: str, ontology_term: str) -> float:
         """
@@ -107,9 +287,26 @@ class SimilarityCalculator:
             Score de similarité [0, 1]
         """
         # Normaliser les chaînes
-        lemma_norm = self._normalize_string(lemma)
-        term_norm = self._normalize_string(ontology_term)
+        lemma_norm = _normalize_cached(lemma)
+        term_norm = _normalize_cached(ontology_term)
+
+        return self._score(lemma, ontology_term, lemma_norm, term_norm)
+
+    def _score(self, lemma: str, ontology_term: str, lemma_norm: str, term_norm: str) -> float:
+        """
+        Calcule la similarité à partir des chaînes brutes et déjà normalisées.
+
+        Permet aux boucles de comparaison de normaliser le lemme une seule fois.
+
+        Args:
+            lemma: Lemme extrait par LLaVA
+            ontology_term: Terme de l'ontologie
+            lemma_norm: Lemme normalisé
+            term_norm: Terme normalisé
 
+        Returns:
+            Score de similarité [0, 1]
+        """
         # Correspondance exacte = 1.0
         if lemma_norm == term_norm:
             return 1.0
@@ -134,12 +331,22 @@ class SimilarityCalculator:
         elif self.algorithm == "jaro_cosine":
             # Combinaison Jaro-Winkler + Cosinus (n-grams)
             sim_jw = self._jaro_winkler_similarity(lemma_norm, term_norm)
+            if sim_jw >= 1.0:
+                # Score maximal déjà atteint : cosinus inutile
+                return sim_jw
             sim_cos = self._cosine_ngram_similarity(lemma_norm, term_norm)
             return max(sim_jw, sim_cos)
 
+        elif self.algorithm == "token_ratio":
+            # Ratio pondéré par tokens (permutations et correspondances partielles)
+            return self._token_ratio_similarity(lemma_norm, term_norm)
+
         else:  # "hybrid" par défaut
             # Hybride: maximum des deux
             sim_lex = self._lexical_similarity(lemma_norm, term_norm)
+            if sim_lex >= 1.0:
+                # Score maximal déjà atteint : pas d'appel d'embeddings
+                return sim_lex
             sim_sem = self._semantic_similarity(lemma, ontology_term)
             return max(sim_lex, sim_sem)
 
@@ -158,7 +365,7 @@ class SimilarityCalculator:
             return 0.0
 
         # Calculer Jaro-Winkler
-        jw_score = jellyfish.jaro_winkler_similarity(s1, s2)
+        jw_score = _jaro_winkler(s1, s2)
 
         # Bonus pour préfixe commun (vérifie longueur minimale)
         if len(s1) >= 3 and len(s2) >= 3:
@@ -185,7 +392,25 @@ class SimilarityCalculator:
         if not s1 or not s2:
             return 0.0
 
-        return jellyfish.jaro_winkler_similarity(s1, s2)
+        return _jaro_winkler(s1, s2)
+
+    def _token_ratio_similarity(self, s1: str, s2: str) -> float:
+        """
+        Calcule la similarité WRatio de RapidFuzz (termes composés, mots permutés ou tronqués).
+
+        Args:
+            s1: Première chaîne (normalisée)
+            s2: Deuxième chaîne (normalisée)
+
+        Returns:
+            Score de similarité [0, 1] (Jaro-Winkler si RapidFuzz est absent)
+        """
+        if not s1 or not s2:
+            return 0.0
+
+        if not RAPIDFUZZ_AVAILABLE:
+            return _jaro_winkler(s1, s2)
+        return rf_fuzz.WRatio(s1, s2, processor=None) / 100.0
 
     def _cosine_ngram_similarity(self, s1: str, s2: str, n: int = 2) -> float:
         """
@@ -254,40 +479,287 @@ class SimilarityCalculator:
         Returns:
             Vecteur d'embedding
         """
-        # Vérifier le cache
-        if text in self._embedding_cache:
-            return self._embedding_cache[text]
+        if text not in self._embedding_cache:
+            self.embed_batch([text])
+        # Retourner un vecteur vide en cas d'erreur
+        return self._embedding_cache.get(text, np.zeros(384, dtype=np.float32))
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Récupère les embeddings de plusieurs textes en une seule requête Ollama (avec cache).
+
+        Seuls les textes absents du cache sont envoyés à l'API /api/embed.
+
+        Args:
+            texts: Textes à encoder
+
+        Returns:
+            Matrice (len(texts), D) ; lignes nulles pour les textes vides ou en erreur
+        """
+        missing = [text for text in dict.fromkeys(texts) if text and text not in self._embedding_cache]
+
+        if missing:
+            try:
+                payload = {
+                    "model": self.embedding_model_name,
+                    "input": missing
+                }
+
+                response = self._session.post(
+                    self.embeddings_endpoint,
+                    json=payload,
+                    timeout=60
+                )
+
+                if response.status_code == 200:
+                    embeddings = response.json().get("embeddings", [])
+                    # Mettre en cache
+                    for text, embedding in zip(missing, embeddings):
+                        self._embedding_cache[text] = np.asarray(embedding, dtype=np.float32)
+                else:
+                    print(f"[!] Erreur API Ollama: {response.status_code}")
+
+            except Exception as e:
+                print(f"[!] Erreur lors de l'obtention des embeddings: {e}")
+
+            if any(text not in self._embedding_cache for text in missing):
+                self.embedding_failures += 1
+
+        rows = [self._embedding_cache.get(text) for text in texts]
+        dim = next((row.shape[0] for row in rows if row is not None and row.size), 0)
+        matrix = np.zeros((len(texts), dim), dtype=np.float32)
+        for i, row in enumerate(rows):
+            if row is not None and row.shape[0] == dim:
+                matrix[i] = row
+        return matrix
+
+    @staticmethod
+    def _quantize_int8(matrix: np.ndarray) -> np.ndarray:
+        """Quantifie une matrice de vecteurs unitaires en int8 (échelle 127)."""
+        return np.clip(np.round(np.asarray(matrix, dtype=np.float32) * 127), -128, 127).astype(np.int8)
+
+    def _term_matrix_int8(self, terms: tuple) -> np.ndarray:
+        """Retourne la matrice de termes quantifiée en int8 (avec cache)."""
+        matrix = self._term_matrix_int8_cache.get(terms)
+        if matrix is None:
+            term_matrix = self._term_matrix(terms)
+            matrix = self._quantize_int8(term_matrix)
+            if term_matrix.shape[1]:
+                self._term_matrix_int8_cache[terms] = matrix
+        return matrix
+
+    def _int8_cosine(self, lemma_matrix: np.ndarray, terms: tuple) -> np.ndarray:
+        """
+        Cosinus lemmes × termes sur vecteurs int8 (SimSIMD).
+
+        Args:
+            lemma_matrix: Embeddings normalisés des lemmes (float32)
+            terms: Termes ontologiques
+
+        Returns:
+            Matrice (len(lemmas), len(terms)) de cosinus [-1, 1] ; 0 pour les vecteurs nuls
+        """
+        term_int8 = self._term_matrix_int8(terms)
+        lemma_int8 = self._quantize_int8(lemma_matrix)
+        # SimSIMD retourne la distance cosinus (1 - cos)
+        cos_sim = 1.0 - np.asarray(simsimd.cdist(lemma_int8, term_int8, metric="cosine"), dtype=np.float32)
+        # Embeddings absents (lignes nulles) : cosinus nul comme en float32
+        cos_sim[~lemma_int8.any(axis=1), :] = 0.0
+        cos_sim[:, ~term_int8.any(axis=1)] = 0.0
+        return cos_sim
+
+    @staticmethod
+    def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+        """Normalise chaque ligne d'une matrice (lignes nulles laissées à zéro)."""
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _term_matrix(self, terms: tuple) -> np.ndarray:
+        """
+        Retourne la matrice d'embeddings normalisée d'une liste de termes (avec cache).
+
+        La matrice est stockée en float16 (mémoire et disque) ; le cache disque
+        est relu en mmap au démarrage suivant, sans appel à Ollama.
+
+        Args:
+            terms: Termes ontologiques
+
+        Returns:
+            Matrice (len(terms), D) de vecteurs unitaires (float16)
+        """
+        matrix = self._term_matrix_cache.get(terms)
+        if matrix is None:
+            cache_path = self._term_matrix_path(terms)
+            matrix = self._load_term_matrix(cache_path, len(terms))
+            if matrix is None:
+                matrix = self._normalize_rows(self.embed_batch(list(terms))).astype(np.float16)
+                # Ne pas figer en cache une matrice issue d'un échec de l'API
+                if not matrix.shape[1]:
+                    return matrix
+                self._save_term_matrix(cache_path, matrix)
+            self._term_matrix_cache[terms] = matrix
+        return matrix
+
+    def _term_matrix_path(self, terms: tuple) -> Path:
+        """Chemin du cache disque (clé: modèle d'embedding et liste exacte des termes)."""
+        terms_hash = hashlib.blake2b("\x1f".join(terms).encode('utf-8'), digest_size=16).hexdigest()
+        model_dir = re.sub(r'[^\w.-]', '_', self.embedding_model_name)
+        return Path(config.CACHE_DIR) / "embeddings" / model_dir / f"{terms_hash}.fp16.npy"
 
-        # Appeler l'API Ollama pour obtenir l'embedding
+    @staticmethod
+    def _load_term_matrix(cache_path: Path, n_terms: int) -> Optional[np.ndarray]:
+        """Relit une matrice de termes en mmap (lecture seule), ou None si absente/invalide."""
         try:
-            payload = {
-                "model": self.embedding_model_name,
-                "input": text
-            }
-
-            response = requests.post(
-                self.embeddings_endpoint,
-                json=payload,
-                timeout=30
-            )
+            matrix = np.load(cache_path, mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        if matrix.dtype != np.float16 or matrix.ndim != 2 or matrix.shape[0] != n_terms:
+            return None
+        return matrix
 
-            if response.status_code == 200:
-                result = response.json()
-                embedding = np.array(result.get("embedding", []), dtype=np.float32)
+    @staticmethod
+    def _save_term_matrix(cache_path: Path, matrix: np.ndarray):
+        """Enregistre une matrice de termes en .npy (écriture atomique)."""
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, matrix)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"[!] Ecriture du cache d'embeddings impossible: {e}")
+
+    def similarity_matrix(self, lemmas: List[str], ontology_terms: List[str]) -> np.ndarray:
+        """
+        Calcule toutes les similarités sémantiques lemmes × termes en un produit matriciel.
 
-                # Mettre en cache
-                self._embedding_cache[text] = embedding
+        Args:
+            lemmas: Lemmes à comparer
+            ontology_terms: Termes ontologiques
 
-                return embedding
-            else:
-                print(f"[!] Erreur API Ollama: {response.status_code}")
-                # Retourner un vecteur vide en cas d'erreur
-                return np.zeros(384, dtype=np.float32)
+        Returns:
+            Matrice (len(lemmas), len(ontology_terms)) de similarités [0, 1]
+        """
+        lemma_matrix = self._normalize_rows(self.embed_batch(list(lemmas)))
+        term_matrix = self._term_matrix(tuple(ontology_terms))
 
-        except Exception as e:
-            print(f"[!] Erreur lors de l'obtention de l'embedding: {e}")
-            # Retourner un vecteur vide en cas d'erreur
-            return np.zeros(384, dtype=np.float32)
+        if lemma_matrix.shape[1] == 0 or lemma_matrix.shape[1] != term_matrix.shape[1]:
+            cos_sim = np.zeros((len(lemmas), len(ontology_terms)), dtype=np.float32)
+        elif self.use_int8:
+            cos_sim = self._int8_cosine(lemma_matrix, tuple(ontology_terms))
+        else:
+            # Pas de GEMM float16 dans BLAS : conversion en float32 pour le produit
+            cos_sim = lemma_matrix @ term_matrix.T.astype(np.float32)
+
+        # Normaliser entre 0 et 1 (comme _semantic_similarity)
+        similarities = (cos_sim + 1) / 2
+
+        # Chaînes vides : similarité nulle
+        similarities[[i for i, lemma in enumerate(lemmas) if not lemma], :] = 0.0
+        similarities[:, [j for j, term in enumerate(ontology_terms) if not term]] = 0.0
+
+        return similarities
+
+    def _vector_scores(self, lemma: str, ontology_terms: List[str]) -> np.ndarray:
+        """
+        Scores semantic/hybrid d'un lemme contre tous les termes (embeddings en batch).
+
+        Args:
+            lemma: Lemme à comparer
+            ontology_terms: Liste de termes ontologiques
+
+        Returns:
+            Vecteur de scores aligné sur ontology_terms
+        """
+        scores = self.similarity_matrix([lemma], ontology_terms)[0].astype(np.float64)
+        if self.algorithm == "hybrid":
+            scores = np.maximum(self._lexical_all([lemma], ontology_terms)[0], scores)
+        return self._with_exact_matches(scores, lemma, ontology_terms)
+
+    def _lexical_all(self, lemmas: List[str], ontology_terms: List[str], with_bonus: bool = True) -> np.ndarray:
+        """
+        Calcule la matrice de similarité lexicale lemmes × termes.
+
+        Utilise le noyau Numba compilé si disponible, sinon RapidFuzz (cdist),
+        sinon une boucle Python.
+
+        Args:
+            lemmas: Lemmes à comparer
+            ontology_terms: Termes ontologiques
+            with_bonus: Similarité lexicale avec bonus (sinon Jaro-Winkler pur)
+
+        Returns:
+            Matrice (len(lemmas), len(ontology_terms)) de scores [0, 1]
+        """
+        lemma_norms = [_normalize_cached(lemma) for lemma in lemmas]
+        term_norms = [_normalize_cached(term) for term in ontology_terms]
+
+        if HAVE_NUMBA:
+            return jaro_winkler_matrix(lemma_norms, term_norms, with_bonus)
+
+        if RAPIDFUZZ_AVAILABLE:
+            return self._lexical_all_rapidfuzz(lemma_norms, term_norms, with_bonus)
+
+        kernel = self._lexical_similarity if with_bonus else self._jaro_winkler_similarity
+        scores = np.zeros((len(lemma_norms), len(term_norms)), dtype=np.float64)
+        for i, lemma_norm in enumerate(lemma_norms):
+            for j, term_norm in enumerate(term_norms):
+                scores[i, j] = kernel(lemma_norm, term_norm)
+        return scores
+
+    @staticmethod
+    def _lexical_all_rapidfuzz(lemma_norms: List[str], term_norms: List[str], with_bonus: bool) -> np.ndarray:
+        """
+        Matrice lexicale calculée par RapidFuzz (Jaro-Winkler de toutes les paires en C++).
+
+        Mêmes scores que _lexical_similarity / _jaro_winkler_similarity : seuls
+        les bonus préfixe/inclusion restent appliqués en Python.
+
+        Args:
+            lemma_norms: Lemmes normalisés
+            term_norms: Termes normalisés
+            with_bonus: Appliquer les bonus préfixe/inclusion
+
+        Returns:
+            Matrice (len(lemma_norms), len(term_norms)) de scores [0, 1]
+        """
+        scores = rf_process.cdist(lemma_norms, term_norms, scorer=RFJaroWinkler.similarity,
+                                  dtype=np.float64, workers=-1)
+
+        # Chaîne vide : score nul (comme le noyau Python)
+        for i, lemma_norm in enumerate(lemma_norms):
+            if not lemma_norm:
+                scores[i, :] = 0.0
+        for j, term_norm in enumerate(term_norms):
+            if not term_norm:
+                scores[:, j] = 0.0
+
+        if with_bonus:
+            # Paires éligibles trouvées par index (pas de test par paire lemme × terme)
+            term_tuple = tuple(term_norms)
+            by_prefix = _build_bonus_index(term_tuple)[0]
+            for i, s1 in enumerate(lemma_norms):
+                if not s1:
+                    continue
+                row = scores[i]
+                # Bonus pour préfixe commun (3 premiers caractères identiques)
+                if len(s1) >= 3:
+                    prefix_ids = list(by_prefix.get(s1[:3], ()))
+                    row[prefix_ids] = np.minimum(1.0, row[prefix_ids] * 1.1)
+                # Bonus pour inclusion
+                include_ids = list(_inclusion_matches(s1, term_tuple))
+                row[include_ids] = np.minimum(1.0, row[include_ids] * 1.15)
+        return scores
+
+    @staticmethod
+    def _with_exact_matches(scores: np.ndarray, lemma: str, ontology_terms: List[str]) -> np.ndarray:
+        """Force à 1.0 le score des termes identiques au lemme après normalisation."""
+        lemma_norm = _normalize_cached(lemma)
+        for j, term in enumerate(ontology_terms):
+            if _normalize_cached(term) == lemma_norm:
+                scores[j] = 1.0
+        return scores
 
     def _cosine_similarity(self, v1: np.ndarray, v2: np.ndarray) -> float:
         """
@@ -303,12 +775,12 @@ class SimilarityCalculator:
         """
         if self.use_gpu:
             # Conversion vers GPU
-            v1_gpu = cp.asarray(v1)
-            v2_gpu = cp.asarray(v2)
+            v1_gpu = self._cp.asarray(v1)
+            v2_gpu = self._cp.asarray(v2)
 
-            dot_product = cp.dot(v1_gpu, v2_gpu)
-            norm1 = cp.linalg.norm(v1_gpu)
-            norm2 = cp.linalg.norm(v2_gpu)
+            dot_product = self._cp.dot(v1_gpu, v2_gpu)
+            norm1 = self._cp.linalg.norm(v1_gpu)
+            norm2 = self._cp.linalg.norm(v2_gpu)
 
             if norm1 == 0 or norm2 == 0:
                 return 0.0
@@ -358,10 +830,16 @@ class SimilarityCalculator:
         if self.use_gpu and self.algorithm in ("semantic", "hybrid"):
             return self._batch_similarity_gpu(lemma, ontology_terms)
 
-        # Sinon, calcul séquentiel standard
+        # Sur CPU : embeddings en batch et produit matriciel
+        if self.algorithm in ("semantic", "hybrid"):
+            scores = self._vector_scores(lemma, ontology_terms)
+            return {term: float(score) for term, score in zip(ontology_terms, scores)}
+
+        # Sinon, calcul séquentiel standard (lemme normalisé une seule fois)
+        lemma_norm = _normalize_cached(lemma)
         similarities = {}
         for term in ontology_terms:
-            similarities[term] = self.calculate_similarity(lemma, term)
+            similarities[term] = self._score(lemma, term, lemma_norm, _normalize_cached(term))
         return similarities
 
     def _batch_similarity_gpu(self, lemma: str, ontology_terms: List[str]) -> Dict[str, float]:
@@ -378,8 +856,8 @@ class SimilarityCalculator:
         """
         # Obtenir l'embedding du lemme
         lemma_emb = self._get_embedding(lemma)
-        lemma_gpu = cp.asarray(lemma_emb)
-        lemma_norm = cp.linalg.norm(lemma_gpu)
+        lemma_gpu = self._cp.asarray(lemma_emb)
+        lemma_norm = self._cp.linalg.norm(lemma_gpu)
 
         if lemma_norm == 0:
             return {term: 0.0 for term in ontology_terms}
@@ -391,19 +869,19 @@ class SimilarityCalculator:
             embeddings.append(emb)
 
         # Convertir en matrice GPU
-        embeddings_matrix = cp.asarray(np.array(embeddings, dtype=np.float32))
+        embeddings_matrix = self._cp.asarray(np.array(embeddings, dtype=np.float32))
 
         # Calcul vectorisé des similarités cosinus
         # Normaliser chaque ligne (embedding de terme)
-        norms = cp.linalg.norm(embeddings_matrix, axis=1, keepdims=True)
-        norms = cp.where(norms == 0, 1.0, norms)  # Éviter division par zéro
+        norms = self._cp.linalg.norm(embeddings_matrix, axis=1, keepdims=True)
+        norms = self._cp.where(norms == 0, 1.0, norms)  # Éviter division par zéro
         embeddings_normalized = embeddings_matrix / norms
 
         # Normaliser le lemme
         lemma_normalized = lemma_gpu / lemma_norm
 
         # Produit scalaire vectorisé (similarités cosinus)
-        cos_similarities = cp.dot(embeddings_normalized, lemma_normalized)
+        cos_similarities = self._cp.dot(embeddings_normalized, lemma_normalized)
 
         # Normaliser entre 0 et 1 (comme _semantic_similarity)
         normalized_sims = (cos_similarities + 1) / 2
@@ -413,13 +891,13 @@ class SimilarityCalculator:
 
         # Si hybride, combiner avec similarité lexicale
         similarities = {}
-        lemma_norm_str = self._normalize_string(lemma)
+        lemma_norm_str = _normalize_cached(lemma)
 
         for i, term in enumerate(ontology_terms):
             sem_score = float(results[i])
 
             if self.algorithm == "hybrid":
-                term_norm = self._normalize_string(term)
+                term_norm = _normalize_cached(term)
                 lex_score = self._lexical_similarity(lemma_norm_str, term_norm)
                 similarities[term] = max(lex_score, sem_score)
             else:
@@ -427,6 +905,65 @@ class SimilarityCalculator:
 
         return similarities
 
+    def score_all(self, lemma: str, ontology_terms: List[str]) -> Optional[np.ndarray]:
+        """
+        Scores d'un lemme contre tous les termes, quand l'algorithme se calcule en une passe vectorisée.
+
+        Args:
+            lemma: Lemme à comparer
+            ontology_terms: Liste de termes ontologiques
+
+        Returns:
+            Vecteur de scores aligné sur ontology_terms, ou None si l'algorithme
+            courant n'a pas de version vectorisée (scan terme par terme)
+        """
+        scores = self.score_matrix([lemma], ontology_terms)
+        return None if scores is None else scores[0]
+
+    def score_matrix(self, lemmas: List[str], ontology_terms: List[str]) -> Optional[np.ndarray]:
+        """
+        Scores de plusieurs lemmes contre tous les termes, en un seul calcul matriciel.
+
+        Args:
+            lemmas: Lemmes à comparer
+            ontology_terms: Liste de termes ontologiques
+
+        Returns:
+            Matrice (len(lemmas), len(ontology_terms)) de scores, ou None si
+            l'algorithme courant n'a pas de version vectorisée
+        """
+        if self.algorithm in ("semantic", "hybrid"):
+            # Lemmes vides après normalisation (bruit du LLM) : score nul, sans appel d'embeddings
+            active = [i for i, lemma in enumerate(lemmas) if _normalize_cached(lemma)]
+            if len(active) < len(lemmas):
+                scores = np.zeros((len(lemmas), len(ontology_terms)), dtype=np.float64)
+                if active:
+                    scores[active] = self.score_matrix([lemmas[i] for i in active], ontology_terms)
+                return scores
+
+            scores = self.similarity_matrix(lemmas, ontology_terms).astype(np.float64)
+            if self.algorithm == "hybrid":
+                scores = np.maximum(self._lexical_all(lemmas, ontology_terms), scores)
+        elif HAVE_NUMBA and (self.algorithm == "lexical" or
+                             (self.algorithm == "jaro_winkler" and not RAPIDFUZZ_AVAILABLE)):
+            scores = self._lexical_all(lemmas, ontology_terms, self.algorithm == "lexical")
+        elif self.algorithm == "token_ratio" and RAPIDFUZZ_AVAILABLE:
+            # WRatio renvoie des scores 0-100 : ramenés sur [0, 1]
+            scores = rf_process.cdist(
+                [_normalize_cached(lemma) for lemma in lemmas],
+                [_normalize_cached(term) for term in ontology_terms],
+                scorer=rf_fuzz.WRatio,
+                processor=None,
+                dtype=np.float64,
+                workers=-1
+            ) / 100.0
+        else:
+            return None
+
+        for row, lemma in zip(scores, lemmas):
+            self._with_exact_matches(row, lemma, ontology_terms)
+        return scores
+
     def find_best_match(self, lemma: str, ontology_terms: list, threshold: float = 0.0) -> tuple:
         """
         Trouve le meilleur match pour un lemme.
@@ -444,9 +981,59 @@ class SimilarityCalculator:
 
         best_term = None
         best_score = 0.0
+        lemma_norm = _normalize_cached(lemma)
+        if not lemma_norm:
+            # Rien à comparer : aucun parcours du vocabulaire
+            return None, 0.0
+
+        if self.algorithm == "token_ratio" and RAPIDFUZZ_AVAILABLE:
+            # Seuil transmis en 0-100 : RapidFuzz écarte les candidats sans calcul complet
+            match = rf_process.extractOne(
+                lemma_norm,
+                [_normalize_cached(term) for term in ontology_terms],
+                scorer=rf_fuzz.WRatio,
+                processor=None,
+                score_cutoff=threshold * 100.0
+            )
+            if match is None or match[1] <= 0.0:
+                return None, 0.0
+            return ontology_terms[match[2]], match[1] / 100.0
+
+        scores = self.score_all(lemma, ontology_terms)
+        if scores is not None:
+            # Tous les scores en une passe vectorisée ; argmax = premier meilleur terme
+            idx = int(np.argmax(scores))
+            score = float(scores[idx])
+            if score > 0.0 and score >= threshold:
+                return ontology_terms[idx], score
+            return None, 0.0
+
+        if self.algorithm == "jaro_winkler" and RAPIDFUZZ_AVAILABLE:
+            # Scan complet en code natif (premier meilleur score conservé, comme la boucle)
+            match = rf_process.extractOne(
+                lemma_norm,
+                [_normalize_cached(term) for term in ontology_terms],
+                scorer=RFJaroWinkler.similarity,
+                processor=None,
+                score_cutoff=threshold
+            )
+            if match is None or match[1] <= 0.0:
+                return None, 0.0
+            return ontology_terms[match[2]], match[1]
+
+        if self.algorithm == "cosine":
+            # Un terme sans aucun bigramme commun a un cosinus nul : seuls les
+            # candidats de l'index inversé peuvent battre le score initial de 0
+            terms = tuple(ontology_terms)
+            index = _build_ngram_index(terms)
+            candidate_ids = set()
+            for ngram in set(_get_ngrams_cached(lemma_norm)):
+                candidate_ids.update(index.get(ngram, ()))
+            # Conserver l'ordre d'origine pour départager les ex aequo
+            ontology_terms = [terms[i] for i in sorted(candidate_ids)]
 
         for term in ontology_terms:
-            score = self.calculate_similarity(lemma, term)
+            score = self._score(lemma, term, lemma_norm, _normalize_cached(term))
             if score > best_score and score >= threshold:
                 best_score = score
                 best_term = term
@@ -456,6 +1043,8 @@ class SimilarityCalculator:
     def clear_cache(self):
         """Vide le cache des embeddings (CPU et GPU)."""
         self._embedding_cache.clear()
+        self._term_matrix_cache.clear()
+        self._term_matrix_int8_cache.clear()
         if self.use_gpu and self._gpu_embedding_cache:
             self._gpu_embedding_cache.clear()
         print("[CACHE] Cache d'embeddings vide")
@@ -463,3 +1052,13 @@ class SimilarityCalculator:
     def get_cache_size(self) -> int:
         """Retourne la taille du cache."""
         return len(self._embedding_cache)
+
+    def close(self):
+        """Ferme la session HTTP vers Ollama."""
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()